@@ -0,0 +1,4 @@
+ALTER TABLE `vss_summaries`
+	ADD COLUMN `CACHE_ID` INT(11) NULL DEFAULT NULL AFTER `SUMMARY_TEXT`,
+	ADD INDEX `idx_cache_id` (`CACHE_ID`) USING BTREE,
+	ADD CONSTRAINT `vss_summaries_ibfk_2` FOREIGN KEY (`CACHE_ID`) REFERENCES `vss_summary_cache` (`ID`) ON UPDATE RESTRICT ON DELETE SET NULL;
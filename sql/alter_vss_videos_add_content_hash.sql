@@ -0,0 +1,3 @@
+ALTER TABLE `vss_videos`
+	ADD COLUMN `CONTENT_HASH` CHAR(64) NULL DEFAULT NULL COLLATE 'utf8mb4_unicode_ci' AFTER `DURATION`,
+	ADD INDEX `idx_videos_content_hash` (`CONTENT_HASH`) USING BTREE;
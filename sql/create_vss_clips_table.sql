@@ -0,0 +1,22 @@
+CREATE TABLE `vss_clips` (
+	`ID` INT(11) NOT NULL AUTO_INCREMENT,
+	`USER_ID` VARCHAR(50) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`VIDEO_DB_ID` INT(11) NULL DEFAULT NULL,
+	`TITLE` VARCHAR(255) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`FILE_NAME` VARCHAR(255) NULL DEFAULT NULL COLLATE 'utf8mb4_unicode_ci',
+	`CLIP_PATH` VARCHAR(500) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`START_TIME` FLOAT NULL DEFAULT NULL,
+	`END_TIME` FLOAT NULL DEFAULT NULL,
+	`SEARCH_QUERY` TEXT NULL DEFAULT NULL COLLATE 'utf8mb4_unicode_ci',
+	`CREATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp(),
+	`UPDATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+	PRIMARY KEY (`ID`) USING BTREE,
+	UNIQUE INDEX `unique_user_clip` (`USER_ID`, `CLIP_PATH`) USING BTREE,
+	INDEX `idx_clips_video` (`VIDEO_DB_ID`, `USER_ID`) USING BTREE,
+	INDEX `idx_clips_file_name` (`FILE_NAME`) USING BTREE,
+	INDEX `idx_clips_user_created_at` (`USER_ID`, `CREATED_AT`) USING BTREE,
+	CONSTRAINT `vss_clips_ibfk_1` FOREIGN KEY (`USER_ID`) REFERENCES `vss_user` (`ID`) ON UPDATE RESTRICT ON DELETE CASCADE
+)
+COLLATE='utf8mb4_unicode_ci'
+ENGINE=InnoDB
+;
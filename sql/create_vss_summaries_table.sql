@@ -3,6 +3,7 @@ CREATE TABLE `vss_summaries` (
 	`VIDEO_ID` VARCHAR(255) NOT NULL COLLATE 'utf8mb4_unicode_ci',
 	`USER_ID` VARCHAR(255) NOT NULL COLLATE 'utf8mb4_unicode_ci',
 	`SUMMARY_TEXT` LONGTEXT NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`CACHE_ID` INT(11) NULL DEFAULT NULL,
 	`CREATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp(),
 	`UPDATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
 	PRIMARY KEY (`ID`) USING BTREE,
@@ -10,7 +11,9 @@ CREATE TABLE `vss_summaries` (
 	INDEX `idx_user_id` (`USER_ID`) USING BTREE,
 	INDEX `idx_video_id` (`VIDEO_ID`) USING BTREE,
 	INDEX `idx_created_at` (`CREATED_AT`) USING BTREE,
-	CONSTRAINT `vss_summaries_ibfk_1` FOREIGN KEY (`USER_ID`) REFERENCES `vss_user` (`ID`) ON UPDATE RESTRICT ON DELETE CASCADE
+	INDEX `idx_cache_id` (`CACHE_ID`) USING BTREE,
+	CONSTRAINT `vss_summaries_ibfk_1` FOREIGN KEY (`USER_ID`) REFERENCES `vss_user` (`ID`) ON UPDATE RESTRICT ON DELETE CASCADE,
+	CONSTRAINT `vss_summaries_ibfk_2` FOREIGN KEY (`CACHE_ID`) REFERENCES `vss_summary_cache` (`ID`) ON UPDATE RESTRICT ON DELETE SET NULL
 )
 COLLATE='utf8mb4_unicode_ci'
 ENGINE=InnoDB
@@ -0,0 +1,24 @@
+CREATE TABLE `vss_summary_cache` (
+	`ID` INT(11) NOT NULL AUTO_INCREMENT,
+	`CACHE_KEY` CHAR(64) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`CONTENT_KEY` VARCHAR(100) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`MODEL` VARCHAR(255) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`CHUNK_DURATION` INT(11) NOT NULL,
+	`PROMPT_HASH` CHAR(64) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`CAPTION_PROMPT_HASH` CHAR(64) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`AGGREGATION_PROMPT_HASH` CHAR(64) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`PARAMS_HASH` CHAR(64) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`VIA_VIDEO_ID` VARCHAR(255) NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`SUMMARY_TEXT` LONGTEXT NOT NULL COLLATE 'utf8mb4_unicode_ci',
+	`HIT_COUNT` INT(11) NOT NULL DEFAULT 0,
+	`CREATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp(),
+	`UPDATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+	`LAST_HIT_AT` TIMESTAMP NULL DEFAULT NULL,
+	PRIMARY KEY (`ID`) USING BTREE,
+	UNIQUE INDEX `unique_summary_cache_key` (`CACHE_KEY`) USING BTREE,
+	INDEX `idx_summary_cache_content` (`CONTENT_KEY`) USING BTREE,
+	INDEX `idx_summary_cache_via_video` (`VIA_VIDEO_ID`) USING BTREE
+)
+COLLATE='utf8mb4_unicode_ci'
+ENGINE=InnoDB
+;
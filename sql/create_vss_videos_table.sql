@@ -9,6 +9,7 @@ CREATE TABLE `vss_videos` (
 	`WIDTH` INT(11) NULL DEFAULT NULL,
 	`HEIGHT` INT(11) NULL DEFAULT NULL,
 	`DURATION` FLOAT NULL DEFAULT NULL,
+	`CONTENT_HASH` CHAR(64) NULL DEFAULT NULL COLLATE 'utf8mb4_unicode_ci',
 	`CREATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp(),
 	`UPDATED_AT` TIMESTAMP NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
 	PRIMARY KEY (`ID`) USING BTREE,
@@ -19,6 +20,7 @@ CREATE TABLE `vss_videos` (
 	INDEX `idx_videos_user_filename` (`USER_ID`, `FILE_NAME`) USING BTREE,
 	INDEX `idx_videos_created_at` (`CREATED_AT`) USING BTREE,
 	INDEX `idx_videos_via_video_id` (`VIDEO_ID`) USING BTREE,
+	INDEX `idx_videos_content_hash` (`CONTENT_HASH`) USING BTREE,
 	CONSTRAINT `vss_videos_ibfk_1` FOREIGN KEY (`USER_ID`) REFERENCES `vss_user` (`ID`) ON UPDATE RESTRICT ON DELETE CASCADE
 )
 COLLATE='utf8mb4_unicode_ci'
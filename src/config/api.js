@@ -35,7 +35,10 @@ const apiConfig = {
     // 요약 및 검색
     summarize: `${API_BASE_URL}/vss-summarize`,
     query: `${API_BASE_URL}/vss-query`,
+    queryStream: `${API_BASE_URL}/vss-query/stream`,  // SSE (token/done/error)
     generateClips: `${API_BASE_URL}/generate-clips`,
+    generateClipsStream: `${API_BASE_URL}/generate-clips/stream`,  // NDJSON
+    generateClipsJobs: `${API_BASE_URL}/generate-clips/jobs`,  // GET /generate-clips/jobs/{job_id}[/events]
     
     // 요약 결과 저장
     saveSummary: `${API_BASE_URL}/save-summary`,
@@ -46,11 +49,14 @@ const apiConfig = {
     getRecommendedChunkSize: `${API_BASE_URL}/get-recommended-chunk-size`,
     removeMedia: `${API_BASE_URL}/remove-media`,
     deleteClips: `${API_BASE_URL}/delete-clips`,
+    getUserClips: `${API_BASE_URL}/user-clips`,  // GET /user-clips?user_id=...&video_id=...
   },
   
   // 헬퍼 함수
   getVideoUrl: (videoId) => `${apiConfig.endpoints.deleteVideo}/${videoId}`,
   getSummaryUrl: (videoId) => `${apiConfig.endpoints.getSummary}/${videoId}`,
+  getClipJobUrl: (jobId) => `${apiConfig.endpoints.generateClipsJobs}/${jobId}`,
+  getClipJobEventsUrl: (jobId) => `${apiConfig.endpoints.generateClipsJobs}/${jobId}/events`,
 };
 
 export default apiConfig;
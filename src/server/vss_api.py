@@ -6,13 +6,24 @@ import re
 import json
 import time
 import random
+import uuid
 import shutil
+import hashlib
+import bisect
+import heapq
+import math
 import asyncio
+import contextlib
 import smtplib
 import pathlib
+import functools
+import subprocess
 from pathlib import Path
+from collections import OrderedDict, deque
 from typing import Optional, List
 from datetime import datetime, timedelta
+from urllib.parse import quote, unquote, urlsplit
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -25,8 +36,9 @@ import bcrypt
 from fastapi import FastAPI, File, Form, UploadFile, Body, HTTPException, Request, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from fastapi.logger import logger
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from moviepy.video.io.VideoFileClip import VideoFileClip
 
@@ -177,18 +189,887 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 # ============================================================================
 # 전역 변수
 # ============================================================================
-# 전역 aiohttp 세션
-http_session: Optional[aiohttp.ClientSession] = None
-
 # 전역 VSS 클라이언트 (지연 초기화)
 vss_client = None
 
-async def get_session():
-    """전역 aiohttp 세션 가져오기 또는 생성"""
-    global http_session
-    if http_session is None or http_session.closed:
-        http_session = aiohttp.ClientSession()
-    return http_session
+# ============================================================================
+# 업스트림별 HTTP 연결 풀
+# ============================================================================
+# 대용량 업로드가 /models·채팅 같은 짧은 호출의 연결을 점유하지 않도록
+# 업스트림(VIA API / VIA 파일 업로드 / Ollama)마다 별도의 세션과 커넥터를 사용합니다.
+# 각 값은 HTTP_POOL_<이름>_<항목> 환경 변수로 조정할 수 있습니다. (예: HTTP_POOL_VIA_UPLOAD_LIMIT=4)
+HTTP_POOL_DEFAULTS = {
+    # 요약/질의 스트림은 오래 걸리므로 전체 시간 제한 없이 읽기 대기 시간만 제한
+    "via_api": {"limit": 32, "limit_per_host": 16, "keepalive_timeout": 30, "connect_timeout": 5, "read_timeout": 900},
+    "via_upload": {"limit": 8, "limit_per_host": 4, "keepalive_timeout": 15, "connect_timeout": 30, "read_timeout": 600},
+    "ollama": {"limit": 8, "limit_per_host": 8, "keepalive_timeout": 60, "connect_timeout": 5, "read_timeout": 120},
+}
+HTTP_POOL_DNS_CACHE_SECONDS = int(os.getenv("HTTP_POOL_DNS_CACHE_SECONDS", "300"))
+
+
+def _http_pool_config(name):
+    config = {}
+    for key, default in HTTP_POOL_DEFAULTS[name].items():
+        config[key] = int(os.getenv(f"HTTP_POOL_{name.upper()}_{key.upper()}", str(default)))
+    return config
+
+
+class HttpPoolMetrics:
+    """
+    연결 풀 포화 지표 (aiohttp TraceConfig로 수집)
+
+    in_flight는 요청 시작부터 응답 헤더 수신까지, queued는 풀에 빈 연결이 없어 대기 중인 요청 수입니다.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.queue_waits = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        async def on_request_end(session, ctx, params):
+            self.in_flight -= 1
+
+        async def on_request_exception(session, ctx, params):
+            self.in_flight -= 1
+            self.errors += 1
+
+        async def on_connection_queued_start(session, ctx, params):
+            ctx.queued_at = time.monotonic()
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        async def on_connection_queued_end(session, ctx, params):
+            waited = time.monotonic() - ctx.queued_at
+            self.queued -= 1
+            self.queue_waits += 1
+            self.queue_wait_total += waited
+            self.queue_wait_max = max(self.queue_wait_max, waited)
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.connections_reused += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "queue_waits": self.queue_waits,
+            "queue_wait_avg_seconds": self.queue_wait_total / self.queue_waits if self.queue_waits else 0.0,
+            "queue_wait_max_seconds": self.queue_wait_max,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+        }
+
+
+# 풀 이름 → aiohttp 세션 / 지표
+http_sessions = {}
+http_pool_metrics = {name: HttpPoolMetrics() for name in HTTP_POOL_DEFAULTS}
+
+
+async def get_session(pool="via_api"):
+    """업스트림별 aiohttp 세션 가져오기 또는 생성 (via_api / via_upload / ollama)"""
+    session = http_sessions.get(pool)
+    if session is None or session.closed:
+        config = _http_pool_config(pool)
+        connector = aiohttp.TCPConnector(
+            limit=config["limit"],
+            limit_per_host=config["limit_per_host"],
+            keepalive_timeout=config["keepalive_timeout"],
+            ttl_dns_cache=HTTP_POOL_DNS_CACHE_SECONDS,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=config["connect_timeout"],
+                sock_read=config["read_timeout"],
+            ),
+            trace_configs=[http_pool_metrics[pool].trace_config()],
+        )
+        http_sessions[pool] = session
+    return session
+
+
+async def close_sessions():
+    for session in http_sessions.values():
+        if not session.closed:
+            await session.close()
+    http_sessions.clear()
+
+
+def http_pool_stats():
+    stats = {}
+    for name in HTTP_POOL_DEFAULTS:
+        config = _http_pool_config(name)
+        session = http_sessions.get(name)
+        stats[name] = {
+            **http_pool_metrics[name].stats(),
+            "open": session is not None and not session.closed,
+            "limit": config["limit"],
+            "limit_per_host": config["limit_per_host"],
+            "keepalive_timeout": config["keepalive_timeout"],
+            "connect_timeout": config["connect_timeout"],
+            "read_timeout": config["read_timeout"],
+        }
+    return stats
+
+# ============================================================================
+# 업스트림 장애 대응 (서킷 브레이커 / 재시도)
+# ============================================================================
+# 연속 실패가 임계값에 도달하면 회로를 열어 복구 대기 시간 동안 즉시 503을 반환하고,
+# 대기 시간이 지나면 요청 하나만 시험 삼아 통과시켜 복구 여부를 확인합니다.
+UPSTREAM_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5"))
+UPSTREAM_RECOVERY_SECONDS = float(os.getenv("UPSTREAM_RECOVERY_SECONDS", "30"))
+# 멱등 호출 재시도 (지수 백오프 + full jitter)
+UPSTREAM_RETRY_BASE_SECONDS = float(os.getenv("UPSTREAM_RETRY_BASE_SECONDS", "0.5"))
+UPSTREAM_RETRY_MAX_SECONDS = float(os.getenv("UPSTREAM_RETRY_MAX_SECONDS", "5"))
+
+# 작업별 시간 제한 (초)
+VIA_TIMEOUTS = {
+    "models": aiohttp.ClientTimeout(total=10),
+    "recommended_config": aiohttp.ClientTimeout(total=10),
+    "delete_file": aiohttp.ClientTimeout(total=15),
+    "summarize": aiohttp.ClientTimeout(total=int(os.getenv("VIA_SUMMARIZE_TIMEOUT_SECONDS", "1800")), sock_connect=5),
+    # 스트림은 전체 시간 대신 토큰/이벤트 사이 대기 시간으로 판단
+    "summarize_stream": aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=int(os.getenv("VIA_SUMMARIZE_STREAM_IDLE_SECONDS", "900"))),
+    "query_stream": aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=int(os.getenv("VIA_QUERY_STREAM_IDLE_SECONDS", "300"))),
+}
+OLLAMA_TIMEOUT = aiohttp.ClientTimeout(total=60, sock_connect=5)
+
+
+class UpstreamUnavailable(HTTPException):
+    """회로가 열려 업스트림 호출을 생략할 때 발생 (503 + Retry-After)"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(
+            status_code=503,
+            detail=f"{name} 서버가 응답하지 않아 잠시 요청을 중단했습니다. {retry_after}초 후 다시 시도해주세요.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+# 업스트림이 내려갔거나 과부하일 때의 상태 코드 (500은 입력 파일 문제 등도 포함되어 제외)
+UPSTREAM_FAILURE_STATUSES = {502, 503, 504}
+
+
+def is_upstream_failure(error):
+    """업스트림 장애로 볼 오류인지 (연결 오류, 시간 초과, 502/503/504)"""
+    if isinstance(error, UpstreamUnavailable):
+        return False
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, HTTPException) and error.status_code in UPSTREAM_FAILURE_STATUSES
+
+
+class CircuitBreaker:
+    """업스트림별 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self, name, failure_threshold, recovery_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_inflight = False
+        self.rejected = 0
+        self.trips = 0
+
+    def retry_after(self):
+        return max(1, math.ceil(self.opened_at + self.recovery_seconds - time.monotonic()))
+
+    def check(self):
+        """호출 전 확인 (회로가 열려 있으면 UpstreamUnavailable)"""
+        if self.state == "closed":
+            return
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_inflight:
+            self._probe_inflight = True
+            return
+        self.rejected += 1
+        raise UpstreamUnavailable(self.name, self.retry_after())
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"{self.name} 서킷 브레이커 복구")
+        self.state = "closed"
+        self.failures = 0
+        self._probe_inflight = False
+
+    def record_failure(self, error):
+        self.failures += 1
+        self._probe_inflight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                logger.warning(f"{self.name} 서킷 브레이커 열림 ({self.recovery_seconds}초): {error}")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """결과 없이 끝난 호출(소비자 취소 등)의 시험 호출 자리 반납"""
+        self._probe_inflight = False
+
+    def record(self, error):
+        """호출 결과 반영 (4xx 등 업스트림이 응답한 오류는 성공으로 간주)"""
+        if is_upstream_failure(error):
+            self.record_failure(error)
+        elif isinstance(error, (UpstreamUnavailable, AdmissionRejected)):
+            # 업스트림까지 가지 않은 요청
+            self.release()
+        else:
+            self.record_success()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_seconds": self.recovery_seconds,
+            "retry_after": self.retry_after() if self.state == "open" else None,
+            "rejected": self.rejected,
+            "trips": self.trips,
+        }
+
+
+via_breaker = CircuitBreaker("VIA", UPSTREAM_FAILURE_THRESHOLD, UPSTREAM_RECOVERY_SECONDS)
+ollama_breaker = CircuitBreaker("Ollama", UPSTREAM_FAILURE_THRESHOLD, UPSTREAM_RECOVERY_SECONDS)
+
+
+async def call_upstream(breaker, operation, call, retries=0):
+    """
+    브레이커를 거쳐 업스트림 호출 (call: 인자 없는 코루틴 함수)
+
+    retries는 멱등 호출에만 지정합니다. 재시도 사이에는 jitter를 둔 지수 백오프로 대기합니다.
+    """
+    attempt = 0
+    while True:
+        breaker.check()
+        try:
+            result = await call()
+        except Exception as e:
+            breaker.record(e)
+            if not is_upstream_failure(e) or attempt >= retries or breaker.state == "open":
+                raise
+            delay = random.uniform(0, min(UPSTREAM_RETRY_MAX_SECONDS, UPSTREAM_RETRY_BASE_SECONDS * (2 ** attempt)))
+            attempt += 1
+            logger.warning(f"{breaker.name} {operation} 재시도 {attempt}/{retries} ({delay:.2f}초 후): {e}")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # 취소된 호출(중복 업로드 중단 등)은 결과 없이 끝나므로 시험 호출 자리만 반납
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def stream_upstream(breaker, operation, stream):
+    """스트림 응답용 call_upstream (재시도 없음, 스트림이 끝까지 읽히면 성공으로 기록)"""
+    breaker.check()
+    try:
+        async for event in stream:
+            yield event
+    except Exception as e:
+        breaker.record(e)
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    else:
+        breaker.record_success()
+    finally:
+        await stream.aclose()
+
+# ============================================================================
+# VIA GPU 호출 입장 제어 (summarize / query)
+# ============================================================================
+# VIA GPU 서버에 동시에 보내는 summarize/query 호출 수
+VIA_MAX_INFLIGHT = int(os.getenv("VIA_MAX_INFLIGHT", "2"))
+# 빈자리를 기다릴 수 있는 최대 요청 수 (초과 시 즉시 429)
+VIA_MAX_QUEUE = int(os.getenv("VIA_MAX_QUEUE", "16"))
+# 처리 시간 관측값이 없을 때 ETA 계산에 쓰는 호출당 처리 시간 (초)
+VIA_INITIAL_SERVICE_SECONDS = float(os.getenv("VIA_INITIAL_SERVICE_SECONDS", "60"))
+
+
+class AdmissionRejected(HTTPException):
+    """대기열이 가득 차 요청을 받지 않을 때 발생 (429 + Retry-After)"""
+
+    def __init__(self, name, queued, retry_after):
+        super().__init__(
+            status_code=429,
+            detail=f"{name} 요청이 많아 대기열({queued}건)이 가득 찼습니다. 약 {retry_after}초 후 다시 시도해주세요.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class AdmissionController:
+    """
+    동시 실행 수 제한 + 순서대로 처리하는 제한된 대기열
+
+    대기 중인 요청에는 on_queue(position, eta_seconds) 콜백으로 순번과 예상 대기 시간을 알리고,
+    실행 자리를 얻으면 position=0으로 한 번 더 알립니다.
+    ETA는 최근 호출 처리 시간의 지수 이동 평균으로 계산한 대략적인 값입니다.
+    """
+
+    def __init__(self, name, max_inflight, max_queue, initial_service_seconds):
+        self.name = name
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max_queue
+        self.avg_service_seconds = initial_service_seconds
+        self.inflight = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.queued_total = 0
+        self.wait_total = 0.0
+
+    def eta(self, position):
+        # 앞선 요청들이 max_inflight개씩 처리된다고 가정
+        return math.ceil(position / self.max_inflight) * self.avg_service_seconds
+
+    def _notify(self):
+        for position, (_, on_queue) in enumerate(self.waiters, start=1):
+            if on_queue is not None:
+                on_queue(position, round(self.eta(position), 1))
+
+    async def _acquire(self, on_queue):
+        if self.inflight < self.max_inflight and not self.waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return
+        self.check()
+
+        waiter = (asyncio.get_running_loop().create_future(), on_queue)
+        self.waiters.append(waiter)
+        self.queued_total += 1
+        queued_at = time.monotonic()
+        self._notify()
+        try:
+            await waiter[0]
+        except BaseException:
+            if waiter[0].done() and not waiter[0].cancelled():
+                # 자리를 넘겨받은 직후 취소됨 → 다음 대기자에게 넘김
+                self._release()
+            else:
+                self.waiters.remove(waiter)
+                self._notify()
+            raise
+        self.wait_total += time.monotonic() - queued_at
+        if on_queue is not None:
+            on_queue(0, 0)  # 대기 종료, 실행 시작
+
+    def _release(self):
+        while self.waiters:
+            future, _ = self.waiters.popleft()
+            if not future.done():
+                # 실행 수는 그대로 두고 자리를 다음 대기자에게 넘김
+                future.set_result(None)
+                self.admitted += 1
+                self._notify()
+                return
+        self.inflight -= 1
+
+    def check(self):
+        """대기열이 가득 찼으면 바로 AdmissionRejected (자리를 예약하지는 않음)"""
+        if self.inflight >= self.max_inflight and len(self.waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, len(self.waiters), max(1, math.ceil(self.eta(len(self.waiters) + 1))))
+
+    @contextlib.asynccontextmanager
+    async def slot(self, on_queue=None):
+        """실행 자리 하나를 얻을 때까지 대기 (대기열이 가득 차면 AdmissionRejected)"""
+        await self._acquire(on_queue)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * (time.monotonic() - started)
+            self._release()
+
+    def stats(self):
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "queued": len(self.waiters),
+            "max_queue": self.max_queue,
+            "avg_service_seconds": round(self.avg_service_seconds, 2),
+            "next_eta_seconds": round(self.eta(len(self.waiters) + 1), 1) if self.inflight >= self.max_inflight else 0,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queued_total": self.queued_total,
+            "avg_wait_seconds": self.wait_total / self.queued_total if self.queued_total else 0.0,
+        }
+
+
+async def admitted_stream(controller, stream, on_queue=None):
+    """스트림을 다 읽을 때까지 실행 자리 하나를 점유"""
+    async with controller.slot(on_queue):
+        try:
+            async for event in stream:
+                yield event
+        finally:
+            await stream.aclose()
+
+
+via_admission = AdmissionController("VIA", VIA_MAX_INFLIGHT, VIA_MAX_QUEUE, VIA_INITIAL_SERVICE_SECONDS)
+
+# ============================================================================
+# 동일 요청 합치기 (진행 중인 VIA 호출 공유)
+# ============================================================================
+# 같은 동영상·프롬프트·샘플링 파라미터로 진행 중인 summarize/query 호출이 있으면
+# 새로 보내지 않고 그 결과(스트림이면 이벤트 전체)를 함께 받습니다.
+
+
+def canonical_request_key(operation, body):
+    """요청 본문(동영상 ID, 모델, 프롬프트, 샘플링 파라미터)을 정규화한 해시 키"""
+    payload = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return f"{operation}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class _SharedCall:
+    """결과 하나를 여러 대기자가 공유하는 호출"""
+
+    def __init__(self):
+        self.task = None
+        self.waiters = 0
+        self.listeners = []
+        self.last_queue = None
+
+    def on_queue(self, position, eta_seconds):
+        # 대기열 순번을 모든 대기자에게 전달
+        self.last_queue = (position, eta_seconds)
+        for listener in list(self.listeners):
+            listener(position, eta_seconds)
+
+
+class _SharedStream:
+    """이벤트 스트림 하나를 여러 구독자가 처음부터 재생하며 공유"""
+
+    def __init__(self):
+        self.task = None
+        self.events = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def _append(self, event):
+        self.events.append(event)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def on_queue(self, position, eta_seconds):
+        # 대기열 순번도 스트림 이벤트로 전달
+        self._append({"type": "queued", "position": position, "eta_seconds": eta_seconds})
+
+    async def run(self, stream):
+        try:
+            async for event in stream:
+                self._append(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self.events):
+                # 구독자가 이벤트를 수정해도 다른 구독자에게 영향이 없도록 복사본 전달
+                yield dict(self.events[index])
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class InflightCoalescer:
+    """진행 중인 동일 요청을 하나의 업스트림 호출로 합침 (모든 대기자가 떠나면 호출 취소)"""
+
+    def __init__(self):
+        self.calls = {}
+        self.streams = {}
+        self.started = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _forget(registry, key, shared):
+        if registry.get(key) is shared:
+            del registry[key]
+
+    async def run(self, key, call, on_queue=None):
+        """call(on_queue)의 결과를 같은 key의 대기자들과 공유"""
+        shared = self.calls.get(key)
+        if shared is None:
+            shared = _SharedCall()
+            shared.task = asyncio.create_task(call(shared.on_queue))
+            shared.task.add_done_callback(lambda task: self._forget(self.calls, key, shared))
+            self.calls[key] = shared
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"진행 중인 동일 VIA 요청에 합류합니다: {key[:32]}")
+        if on_queue is not None:
+            shared.listeners.append(on_queue)
+            if shared.last_queue is not None:
+                on_queue(*shared.last_queue)
+        shared.waiters += 1
+        try:
+            return await asyncio.shield(shared.task)
+        finally:
+            shared.waiters -= 1
+            if on_queue is not None:
+                shared.listeners.remove(on_queue)
+            if shared.waiters == 0 and not shared.task.done():
+                self._forget(self.calls, key, shared)
+                shared.task.cancel()
+
+    async def stream(self, key, open_stream):
+        """open_stream(on_queue)이 반환하는 스트림을 같은 key의 구독자들과 공유"""
+        shared = self.streams.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            shared.task = asyncio.create_task(shared.run(open_stream(shared.on_queue)))
+            shared.task.add_done_callback(lambda task: self._forget(self.streams, key, shared))
+            self.streams[key] = shared
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"진행 중인 동일 VIA 스트림에 합류합니다: {key[:32]}")
+        shared.subscribers += 1
+        try:
+            async for event in shared.subscribe():
+                yield event
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.task.done():
+                self._forget(self.streams, key, shared)
+                shared.task.cancel()
+
+    def stats(self):
+        return {
+            "inflight_calls": len(self.calls),
+            "inflight_streams": len(self.streams),
+            "waiters": sum(shared.waiters for shared in self.calls.values())
+                       + sum(shared.subscribers for shared in self.streams.values()),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+via_inflight = InflightCoalescer()
+
+# ============================================================================
+# VIA 모델 레지스트리
+# ============================================================================
+# 조회한 모델 이름을 보관할 시간 (초)
+VIA_MODEL_TTL_SECONDS = int(os.getenv("VIA_MODEL_TTL_SECONDS", "300"))
+# VIA 재시작으로 모델이 바뀌었는지 백그라운드에서 확인하는 주기 (초, 0이면 사용 안 함)
+VIA_MODEL_REFRESH_INTERVAL_SECONDS = int(os.getenv("VIA_MODEL_REFRESH_INTERVAL_SECONDS", "60"))
+
+
+class ModelRegistry:
+    """
+    VIA /models 조회 결과 캐시
+
+    TTL 안에서는 캐시된 모델 이름을 바로 반환하고, 만료 후 동시에 들어온 요청들은
+    진행 중인 조회 하나를 공유합니다.
+    """
+
+    def __init__(self, models_endpoint, ttl):
+        self.models_endpoint = models_endpoint
+        self.ttl = ttl
+        self.model = None
+        self.fetched_at = 0.0
+        self._inflight = None
+        self.hits = 0
+        self.fetches = 0
+        self.changes = 0
+
+    async def _fetch(self):
+        # 멱등 조회이므로 일시적 오류는 재시도
+        return await call_upstream(via_breaker, "models", self._fetch_once, retries=2)
+
+    async def _fetch_once(self):
+        session = await get_session()
+        try:
+            async with session.get(self.models_endpoint, timeout=VIA_TIMEOUTS["models"]) as resp:
+                if resp.status >= 400:
+                    raise HTTPException(status_code=502, detail=f"VIA /models returned status {resp.status}")
+                try:
+                    resp_json = await resp.json()
+                except Exception as e:
+                    raise HTTPException(status_code=502, detail=f"VIA /models returned invalid JSON: {str(e)}")
+                if not resp_json.get("data") or len(resp_json["data"]) == 0:
+                    raise HTTPException(status_code=502, detail="VIA 서버에서 모델을 찾을 수 없습니다.")
+                return resp_json["data"][0]["id"]
+        except HTTPException:
+            raise
+        except aiohttp.ClientError as e:
+            logger.error(f"VIA 서버 연결 오류: {e}")
+            raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
+        except Exception as e:
+            logger.error(f"VIA 서버 모델 조회 중 오류: {e}")
+            raise HTTPException(status_code=502, detail=f"VIA 서버 모델 조회 중 오류가 발생했습니다: {str(e)}")
+
+    async def _fetch_and_store(self):
+        self.fetches += 1
+        model = await self._fetch()
+        if self.model is not None and model != self.model:
+            self.changes += 1
+            logger.info(f"VIA 모델 변경 감지: {self.model} → {model}")
+        self.model = model
+        self.fetched_at = time.monotonic()
+        return model
+
+    async def refresh(self):
+        """캐시와 관계없이 다시 조회 (진행 중인 조회가 있으면 그 결과를 공유)"""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch_and_store())
+            self._inflight.add_done_callback(self._clear_inflight)
+        return await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, task):
+        self._inflight = None
+        if not task.cancelled():
+            task.exception()  # 대기자가 없을 때 "Task exception was never retrieved" 방지
+
+    async def get(self):
+        """현재 VIA 모델 이름"""
+        if self.model is not None and time.monotonic() - self.fetched_at < self.ttl:
+            self.hits += 1
+            return self.model
+        return await self.refresh()
+
+    def invalidate(self):
+        self.fetched_at = 0.0
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "age_seconds": time.monotonic() - self.fetched_at if self.model is not None else None,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "changes": self.changes,
+        }
+
+
+via_model_registry = ModelRegistry(VIA_SERVER_URL + "/models", VIA_MODEL_TTL_SECONDS)
+via_model_refresh_task = None
+
+
+async def via_model_refresher():
+    """VIA 재시작 등으로 모델이 바뀌면 요청 전에 반영되도록 주기적으로 갱신"""
+    while True:
+        await asyncio.sleep(VIA_MODEL_REFRESH_INTERVAL_SECONDS)
+        try:
+            await via_model_registry.refresh()
+        except HTTPException as e:
+            logger.warning(f"VIA 모델 백그라운드 갱신 실패: {e.detail}")
+        except Exception as e:
+            logger.warning(f"VIA 모델 백그라운드 갱신 실패: {e}")
+
+# ============================================================================
+# VIA 업로드 중복 제거 (내용 해시 → VIA 파일 ID)
+# ============================================================================
+# 같은 바이트의 동영상은 사용자와 관계없이 VIA에 한 번만 업로드합니다.
+# 메모리 맵에 없으면 vss_videos.CONTENT_HASH로 기존 VIDEO_ID를 찾습니다.
+via_file_ids_by_hash = {}
+
+
+def lookup_via_file_id(content_hash):
+    """내용 해시로 이미 업로드된 VIA 파일 ID 조회 (없으면 None)"""
+    via_file_id = via_file_ids_by_hash.get(content_hash)
+    if via_file_id:
+        return via_file_id
+    try:
+        cursor.execute(
+            """SELECT VIDEO_ID FROM vss_videos
+               WHERE CONTENT_HASH = ? AND VIDEO_ID IS NOT NULL
+               ORDER BY ID DESC LIMIT 1""",
+            (content_hash,)
+        )
+        row = cursor.fetchone()
+    except Exception as e:
+        logger.warning(f"내용 해시로 VIA 파일 ID 조회 실패: {e}")
+        return None
+    if row and row[0]:
+        via_file_ids_by_hash[content_hash] = row[0]
+        return row[0]
+    return None
+
+
+def forget_via_file_ids(via_file_ids):
+    """VIA에서 삭제된 파일 ID를 중복 제거 맵에서 제거"""
+    removed = set(via_file_ids)
+    for content_hash in [h for h, via_file_id in via_file_ids_by_hash.items() if via_file_id in removed]:
+        del via_file_ids_by_hash[content_hash]
+
+
+# ============================================================================
+# 요약 캐시 (내용 해시 + 프롬프트 + 파라미터 → 요약)
+# ============================================================================
+# 같은 바이트·프롬프트·chunk_duration·모델·샘플링 파라미터의 요약은 사용자와 관계없이 재사용합니다.
+# VIA 질의 컨텍스트는 VIA 파일 ID에 묶여 있으므로 VIA_VIDEO_ID가 같을 때만 캐시 적중으로 봅니다.
+# 사용자별 요약(vss_summaries)은 CACHE_ID로 캐시 항목을 가리킵니다.
+_SUMMARY_CACHE_KEY_EXCLUDED = {
+    "id", "stream", "stream_options", "model", "chunk_duration",
+    "prompt", "caption_summarization_prompt", "summary_aggregation_prompt",
+}
+# 저장 형식이 바뀌면 올려서 이전 항목을 적중 대상에서 제외
+# (2: 스트림 요약이 구간 요약 표 대신 최종 요약만 저장)
+SUMMARY_CACHE_KEY_VERSION = 2
+
+
+def _sha256_json(value):
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def content_key_for_via_id(via_video_id):
+    """VIA 파일 ID의 동영상 내용 키 (내용 해시를 모르면 "via:<ID>")"""
+    for content_hash, via_file_id in via_file_ids_by_hash.items():
+        if via_file_id == via_video_id:
+            return content_hash
+    try:
+        cursor.execute(
+            """SELECT CONTENT_HASH FROM vss_videos
+               WHERE VIDEO_ID = ? AND CONTENT_HASH IS NOT NULL
+               LIMIT 1""",
+            (via_video_id,)
+        )
+        row = cursor.fetchone()
+    except Exception as e:
+        logger.warning(f"VIA 파일 ID로 내용 해시 조회 실패: {e}")
+        row = None
+    if row and row[0]:
+        return row[0]
+    return f"via:{via_video_id}"
+
+
+def summary_cache_fields(body):
+    """summarize 요청 본문에서 캐시 키 구성 요소 계산"""
+    params = {key: value for key, value in body.items() if key not in _SUMMARY_CACHE_KEY_EXCLUDED}
+    fields = {
+        "content_key": content_key_for_via_id(body["id"]),
+        "model": str(body["model"]),
+        "chunk_duration": int(body["chunk_duration"]),
+        "prompt_hash": _sha256_json(body["prompt"]),
+        "caption_prompt_hash": _sha256_json(body["caption_summarization_prompt"]),
+        "aggregation_prompt_hash": _sha256_json(body["summary_aggregation_prompt"]),
+        "params_hash": _sha256_json(params),
+    }
+    fields["cache_key"] = _sha256_json({**fields, "version": SUMMARY_CACHE_KEY_VERSION})
+    return fields
+
+
+def lookup_summary_cache(fields, via_video_id):
+    """캐시된 요약 조회 → (cache_id, 요약) 또는 None"""
+    try:
+        cursor.execute(
+            "SELECT ID, SUMMARY_TEXT, VIA_VIDEO_ID FROM vss_summary_cache WHERE CACHE_KEY = ?",
+            (fields["cache_key"],)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if row[2] != via_video_id:
+            # 내용은 같지만 다른 VIA 파일 → 이 파일에는 질의 컨텍스트가 없으므로 다시 요약
+            logger.info(f"요약 캐시 VIA 파일 불일치: cached={row[2]}, requested={via_video_id}")
+            return None
+        cursor.execute(
+            """UPDATE vss_summary_cache
+               SET HIT_COUNT = HIT_COUNT + 1, LAST_HIT_AT = CURRENT_TIMESTAMP, UPDATED_AT = UPDATED_AT
+               WHERE ID = ?""",
+            (row[0],)
+        )
+        conn.commit()
+    except mariadb.Error as e:
+        logger.warning(f"요약 캐시 조회 중 데이터베이스 오류: {e}")
+        return None
+    logger.info(f"요약 캐시 적중: cache_id={row[0]}, VIA_VIDEO_ID={via_video_id}")
+    return row[0], row[1]
+
+
+def store_summary_cache(fields, via_video_id, summary_text):
+    """요약을 캐시에 저장하고 cache_id 반환 (실패 시 None)"""
+    try:
+        cursor.execute(
+            """INSERT INTO vss_summary_cache
+               (CACHE_KEY, CONTENT_KEY, MODEL, CHUNK_DURATION, PROMPT_HASH, CAPTION_PROMPT_HASH,
+                AGGREGATION_PROMPT_HASH, PARAMS_HASH, VIA_VIDEO_ID, SUMMARY_TEXT)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON DUPLICATE KEY UPDATE
+               VIA_VIDEO_ID = VALUES(VIA_VIDEO_ID),
+               SUMMARY_TEXT = VALUES(SUMMARY_TEXT),
+               UPDATED_AT = CURRENT_TIMESTAMP""",
+            (
+                fields["cache_key"], fields["content_key"], fields["model"], fields["chunk_duration"],
+                fields["prompt_hash"], fields["caption_prompt_hash"], fields["aggregation_prompt_hash"],
+                fields["params_hash"], via_video_id, summary_text,
+            )
+        )
+        conn.commit()
+        cursor.execute("SELECT ID FROM vss_summary_cache WHERE CACHE_KEY = ?", (fields["cache_key"],))
+        row = cursor.fetchone()
+    except mariadb.Error as e:
+        logger.error(f"요약 캐시 저장 중 데이터베이스 오류: {e}")
+        return None
+    return row[0] if row else None
+
+
+def save_user_summary(via_video_id, user_id, summary_text, cache_id=None):
+    """사용자별 요약(vss_summaries) 저장 또는 갱신"""
+    cursor.execute(
+        """INSERT INTO vss_summaries (VIDEO_ID, USER_ID, SUMMARY_TEXT, CACHE_ID)
+           VALUES (?, ?, ?, ?)
+           ON DUPLICATE KEY UPDATE
+           SUMMARY_TEXT = VALUES(SUMMARY_TEXT),
+           CACHE_ID = VALUES(CACHE_ID),
+           UPDATED_AT = CURRENT_TIMESTAMP""",
+        (via_video_id, user_id, summary_text, cache_id)
+    )
+    conn.commit()
+
 
 class VSS:
     """Wrapper to call VSS REST APIs"""
@@ -216,22 +1097,24 @@ class VSS:
             return text
 
     async def get_model(self):
-        session = await get_session()
-        try:
-            async with session.get(self.models_endpoint, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                json_data = await self.check_response(resp)
-                try:
-                    return json_data["data"][0]["id"]  # get configured model name
-                except Exception as e:
-                    raise HTTPException(status_code=502, detail=f"Invalid response from VIA /models: {e}")
-        except Exception as e:
-            # Raise HTTPException so FastAPI returns a proper error response (and CORS headers)
-            raise HTTPException(status_code=502, detail=f"Failed to reach VIA server for models: {e}")
+        # 모델 레지스트리 캐시 사용 (동시 요청은 하나의 /models 조회를 공유)
+        return await via_model_registry.get()
 
-    async def upload_video(self, video_path):
-        session = await get_session()
-        data = aiohttp.FormData()
-        
+    async def upload_video(self, video_path, content_hash=None):
+        # 같은 내용이 이미 업로드되어 있으면 기존 VIA 파일 ID 재사용
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(file_content_hash, video_path)
+        via_file_id = lookup_via_file_id(content_hash)
+        if via_file_id:
+            logger.info(f"동일한 내용의 업로드 재사용: {video_path} → {via_file_id}")
+            return via_file_id
+
+        via_file_id = await self._upload_file(video_path)
+        if via_file_id:
+            via_file_ids_by_hash[content_hash] = via_file_id
+        return via_file_id
+
+    async def _upload_file(self, video_path):
         # 파일을 스트리밍 방식으로 전송 (메모리에 전체 로드하지 않음)
         # 파일 핸들을 직접 전달하여 메모리 효율성 향상
         file_handle = open(video_path, "rb")
@@ -240,28 +1123,46 @@ class VSS:
             file_size = os.path.getsize(video_path)
             logger.info(f"Uploading video file: {video_path} (size: {file_size / (1024*1024):.2f} MB)")
             
-            data.add_field("file", file_handle, filename=f"file_{self.f_count}")
-            data.add_field("purpose", "vision")
-            data.add_field("media_type", "video")
-            
             # 타임아웃 설정: 큰 파일 업로드를 위해 충분한 시간 할당
             # 파일 크기에 따라 동적으로 타임아웃 계산 (최소 60초, 최대 600초)
             timeout_seconds = max(60, min(600, int(file_size / (1024 * 1024) * 10)))  # 1MB당 10초, 최소 60초, 최대 600초
-            
-            async with session.post(
-                self.files_endpoint, 
-                data=data,
-                timeout=aiohttp.ClientTimeout(total=timeout_seconds)
-            ) as response:
-                self.f_count += 1
-                json_data = await self.check_response(response)
-                return json_data.get("id")  # return uploaded file id
+            return await self._post_file(file_handle, aiohttp.ClientTimeout(total=timeout_seconds))
         finally:
             # 파일 핸들 닫기
             file_handle.close()
 
-    async def summarize_video(self, file_id, prompt, cs_prompt, sa_prompt, chunk_duration, model, num_frames_per_chunk, frame_width, frame_height, top_k, top_p, temperature, max_new_tokens, seed, batch_size, rag_batch_size, rag_top_k, summarize_top_p, summarize_temperature, summarize_max_tokens, chat_top_p, chat_temperature, chat_max_tokens, notification_top_p, notification_temperature, notification_max_tokens, enable_audio):
-        body = {
+    async def upload_stream(self, chunks):
+        """
+        비동기 청크 스트림을 그대로 VIA에 업로드합니다. (전체 크기를 미리 알 수 없어 chunked 전송)
+        전체 시간 제한 대신 청크 사이 대기 시간으로 연결 끊김을 판단합니다.
+        """
+        return await self._post_file(chunks, aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=600))
+
+    async def _post_file(self, source, timeout):
+        session = await get_session("via_upload")
+        data = aiohttp.FormData()
+        data.add_field("file", source, filename=f"file_{self.f_count}")
+        data.add_field("purpose", "vision")
+        data.add_field("media_type", "video")
+
+        async def post():
+            async with session.post(
+                self.files_endpoint, 
+                data=data,
+                timeout=timeout
+            ) as response:
+                self.f_count += 1
+                if response.status >= 500:
+                    error_text = await response.text()
+                    raise HTTPException(status_code=response.status, detail=f"VIA 서버 파일 업로드 오류: {error_text}")
+                json_data = await self.check_response(response)
+                return json_data.get("id")  # return uploaded file id
+
+        # 업로드 본문(파일/스트림)은 다시 보낼 수 없으므로 재시도하지 않음
+        return await call_upstream(via_breaker, "upload", post)
+
+    def _summarize_body(self, file_id, prompt, cs_prompt, sa_prompt, chunk_duration, model, num_frames_per_chunk, frame_width, frame_height, top_k, top_p, temperature, max_new_tokens, seed, batch_size, rag_batch_size, rag_top_k, summarize_top_p, summarize_temperature, summarize_max_tokens, chat_top_p, chat_temperature, chat_max_tokens, notification_top_p, notification_temperature, notification_max_tokens, enable_audio):
+        return {
             "id": file_id,
             "prompt": prompt,
             "caption_summarization_prompt": cs_prompt,
@@ -292,39 +1193,176 @@ class VSS:
             "enable_audio": enable_audio,
         }
 
+    async def _raise_summarize_error(self, response):
+        error_text = await response.text()
+        logger.error(f"VIA 서버 summarize_video 오류 (HTTP {response.status}): {error_text}")
+        
+        # GStreamer 에러인 경우 더 명확한 메시지 제공
+        if "gst-stream-error" in error_text or "qtdemux" in error_text or "not-negotiated" in error_text:
+            error_msg = (
+                "동영상 파일 처리 중 오류가 발생했습니다. "
+                "가능한 원인:\n"
+                "1. 손상된 동영상 파일\n"
+                "2. 지원하지 않는 코덱 또는 포맷\n"
+                "3. 파일이 완전히 업로드되지 않음\n"
+                "4. 파일 메타데이터 문제\n\n"
+                f"VIA 서버 오류: {error_text}"
+            )
+            raise HTTPException(status_code=500, detail=error_msg)
+        else:
+            raise HTTPException(status_code=response.status, detail=f"VIA 서버 summarize_video 오류: {error_text}")
+
+    async def summarize_video(self, file_id, prompt, cs_prompt, sa_prompt, chunk_duration, model, num_frames_per_chunk, frame_width, frame_height, top_k, top_p, temperature, max_new_tokens, seed, batch_size, rag_batch_size, rag_top_k, summarize_top_p, summarize_temperature, summarize_max_tokens, chat_top_p, chat_temperature, chat_max_tokens, notification_top_p, notification_temperature, notification_max_tokens, enable_audio, on_queue=None):
+        body = self._summarize_body(file_id, prompt, cs_prompt, sa_prompt, chunk_duration, model, num_frames_per_chunk, frame_width, frame_height, top_k, top_p, temperature, max_new_tokens, seed, batch_size, rag_batch_size, rag_top_k, summarize_top_p, summarize_temperature, summarize_max_tokens, chat_top_p, chat_temperature, chat_max_tokens, notification_top_p, notification_temperature, notification_max_tokens, enable_audio)
+        # 같은 요청이 진행 중이면 그 결과를 공유
+        key = canonical_request_key("summarize", body)
+        return await via_inflight.run(key, lambda shared_on_queue: self._summarize_once(body, shared_on_queue), on_queue)
+
+    async def _summarize_once(self, body, on_queue):
+        session = await get_session()
+
+        async def post():
+            # GPU 서버 동시 실행 수 제한 (자리가 없으면 대기열에서 순서 대기)
+            async with via_admission.slot(on_queue):
+                async with session.post(self.summarize_endpoint, json=body, timeout=VIA_TIMEOUTS["summarize"]) as response:
+                    # 에러 응답 처리
+                    if response.status != 200:
+                        await self._raise_summarize_error(response)
+                    
+                    # check response
+                    json_data = await self.check_response(response)
+                    if isinstance(json_data, dict):
+                        # 구간당 처리 시간 학습 (추천 chunk_size 로컬 추정용)
+                        chunk_size_advisor.observe_usage(body["chunk_duration"], json_data.get("usage"))
+                    if isinstance(json_data, dict) and "choices" in json_data:
+                        message_content = json_data["choices"][0]["message"]["content"]
+                        return message_content
+                    else:
+                        # JSON이 아니거나 에러일 때는 원본 텍스트 또는 에러 메시지 반환
+                        return json_data
+
+        return await call_upstream(via_breaker, "summarize", post)
+
+    async def summarize_video_cached(self, *args, on_queue=None):
+        """
+        요약 캐시를 먼저 확인하고 없으면 summarize_video 호출 (인자는 summarize_video와 같음)
+
+        반환: (요약, cache_id, 캐시 적중 여부)
+        """
+        body = self._summarize_body(*args)
+        fields = summary_cache_fields(body)
+        hit = lookup_summary_cache(fields, body["id"])
+        if hit:
+            return hit[1], hit[0], True
+        summary = await self.summarize_video(*args, on_queue=on_queue)
+        cache_id = None
+        if isinstance(summary, str) and summary.strip():
+            cache_id = store_summary_cache(fields, body["id"], summary)
+        return summary, cache_id, False
+
+    async def summarize_video_stream_cached(self, *args, tools=None):
+        """
+        summarize_video_stream 이벤트에 마지막 {"type": "cache", "cache_id", "cached"} 이벤트를 더해 반환
+
+        캐시 적중이면 VIA를 호출하지 않고 저장된 최종 요약을 구간 요약 하나로 보냅니다.
+        알림(tools)이 있으면 알림 이벤트를 다시 받아야 하므로 캐시를 쓰지 않습니다.
+        """
+        if tools:
+            async for event in self.summarize_video_stream(*args, tools=tools):
+                yield event
+            return
+
+        body = self._summarize_body(*args)
+        fields = summary_cache_fields(body)
+        hit = lookup_summary_cache(fields, body["id"])
+        if hit:
+            yield {"type": "caption", "content": hit[1], "start_offset": None, "end_offset": None}
+            yield {"type": "cache", "cache_id": hit[0], "cached": True}
+            return
+
+        # 마지막 finish_reason=stop 이벤트가 VIA의 최종 요약(비스트림 응답과 같은 내용)이므로 그것만 저장
+        # (구간 요약 표를 저장하면 같은 cache_key를 쓰는 비스트림 요약이 표를 받게 됨)
+        summary = ""
+        async for event in self.summarize_video_stream(*args):
+            if event["type"] == "caption":
+                summary = event["content"]
+            yield event
+        cache_id = store_summary_cache(fields, body["id"], summary) if summary.strip() else None
+        yield {"type": "cache", "cache_id": cache_id, "cached": False}
+
+    def summarize_video_stream(self, *args, tools=None):
+        """
+        VIA /summarize를 스트림 모드로 호출하고 도착하는 이벤트를 순서대로 반환 (인자는 summarize_video와 같음)
+
+        - {"type": "queued", "position", "eta_seconds"}: VIA 실행 대기열 순번 (0이면 실행 시작)
+        - {"type": "caption", "content", "start_offset", "end_offset"}: 구간 요약(finish_reason=stop)
+        - {"type": "alert", "name", "detected_events", "offset", "details"}: 알림(tool_calls)
+        - {"type": "usage", "usage": {...}}
+
+        같은 요청이 진행 중이면 그 스트림을 처음부터 함께 받습니다.
+        """
+        body = self._summarize_body(*args)
+        body["stream"] = True
+        body["stream_options"] = {"include_usage": True}
+        if tools:
+            body["tools"] = tools
+        return via_inflight.stream(
+            canonical_request_key("summarize_stream", body),
+            lambda on_queue: stream_upstream(
+                via_breaker, "summarize",
+                admitted_stream(via_admission, self._summarize_video_stream(body), on_queue),
+            ),
+        )
+
+    async def _summarize_video_stream(self, body):
         session = await get_session()
-        async with session.post(self.summarize_endpoint, json=body) as response:
-            # 에러 응답 처리
+        async with session.post(self.summarize_endpoint, json=body, timeout=VIA_TIMEOUTS["summarize_stream"]) as response:
             if response.status != 200:
-                error_text = await response.text()
-                logger.error(f"VIA 서버 summarize_video 오류 (HTTP {response.status}): {error_text}")
-                
-                # GStreamer 에러인 경우 더 명확한 메시지 제공
-                if "gst-stream-error" in error_text or "qtdemux" in error_text or "not-negotiated" in error_text:
-                    error_msg = (
-                        "동영상 파일 처리 중 오류가 발생했습니다. "
-                        "가능한 원인:\n"
-                        "1. 손상된 동영상 파일\n"
-                        "2. 지원하지 않는 코덱 또는 포맷\n"
-                        "3. 파일이 완전히 업로드되지 않음\n"
-                        "4. 파일 메타데이터 문제\n\n"
-                        f"VIA 서버 오류: {error_text}"
-                    )
-                    raise HTTPException(status_code=500, detail=error_msg)
-                else:
-                    raise HTTPException(status_code=response.status, detail=f"VIA 서버 summarize_video 오류: {error_text}")
-            
-            # check response
-            json_data = await self.check_response(response)
-            if isinstance(json_data, dict) and "choices" in json_data:
-                message_content = json_data["choices"][0]["message"]["content"]
-                return message_content
-            else:
-                # JSON이 아니거나 에러일 때는 원본 텍스트 또는 에러 메시지 반환
-                return json_data
+                await self._raise_summarize_error(response)
 
-    async def query_video(self, video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query):
-        
+            captions = 0
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    return
+                try:
+                    json_data = json.loads(payload)
+                except json.JSONDecodeError:
+                    logger.warning(f"VIA summarize 스트림 청크 파싱 실패: {payload[:200]}")
+                    continue
+                if not isinstance(json_data, dict):
+                    continue
+
+                media_info = json_data.get("media_info") or {}
+                for choice in json_data.get("choices") or []:
+                    message = choice.get("message") or choice.get("delta") or {}
+                    finish_reason = choice.get("finish_reason")
+                    if finish_reason == "tool_calls":
+                        for tool_call in message.get("tool_calls") or []:
+                            alert = tool_call.get("alert") or {}
+                            yield {
+                                "type": "alert",
+                                "name": alert.get("name"),
+                                "detected_events": alert.get("detectedEvents") or [],
+                                "offset": alert.get("offset"),
+                                "details": alert.get("details"),
+                            }
+                    elif finish_reason == "stop" and message.get("content"):
+                        captions += 1
+                        yield {
+                            "type": "caption",
+                            "content": message["content"],
+                            "start_offset": media_info.get("start_offset"),
+                            "end_offset": media_info.get("end_offset"),
+                        }
+                if json_data.get("usage"):
+                    chunk_size_advisor.observe_usage(body["chunk_duration"], json_data["usage"], captions)
+                    yield {"type": "usage", "usage": json_data["usage"]}
+
+    def _query_body(self, video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query):
         body = {
             "id": video_id,
             "model": model,
@@ -339,21 +1377,86 @@ class VSS:
             "highlight": False,
         }
         body["messages"] = [{"content": str(query), "role": "user"}]
+        return body
+
+    @staticmethod
+    def _query_chunk_events(json_data):
+        # OpenAI 호환 청크(delta) 또는 단일 응답(message)에서 토큰/usage 추출
+        if not isinstance(json_data, dict):
+            return
+        for choice in json_data.get("choices") or []:
+            delta = choice.get("delta") or choice.get("message") or {}
+            content = delta.get("content")
+            if content:
+                yield {"content": content}
+        if json_data.get("usage"):
+            yield {"usage": json_data["usage"]}
+
+    def query_video_stream(self, video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query):
+        """
+        VIA 질의 응답을 SSE 청크 단위로 읽어 {"content": 토큰} / {"usage": {...}} 이벤트를 순서대로 반환
+
+        VIA 실행 대기 중에는 {"type": "queued", "position", "eta_seconds"} 이벤트가 섞여 나오며,
+        같은 질의가 진행 중이면 그 스트림을 처음부터 함께 받습니다.
+        """
+        body = self._query_body(video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query)
+        return via_inflight.stream(
+            canonical_request_key("query", body),
+            lambda on_queue: stream_upstream(
+                via_breaker, "query",
+                admitted_stream(via_admission, self._query_video_stream(body), on_queue),
+            ),
+        )
+
+    async def _query_video_stream(self, body):
         session = await get_session()
-        async with session.post(self.query_endpoint, json=body) as response:
-            json_data = await self.check_response(response)
-            
-            # 오류 응답 처리
+        async with session.post(self.query_endpoint, json=body, timeout=VIA_TIMEOUTS["query_stream"]) as response:
+            logger.debug(f"Response Status Code: {response.status}")
             if response.status != 200:
-                error_msg = json_data if isinstance(json_data, str) else str(json_data)
+                error_msg = await response.text()
+                logger.error(f"서버 에러: {response.status}, {error_msg}")
                 raise HTTPException(status_code=response.status, detail=f"VIA 서버 query_video 오류: {error_msg}")
-            
-            # 정상 응답 처리
-            if isinstance(json_data, dict) and "choices" in json_data:
-                message_content = json_data["choices"][0]["message"]["content"]
-                return message_content
-            else:
-                raise HTTPException(status_code=502, detail=f"VIA 서버 응답 형식 오류: {json_data}")
+
+            # 스트리밍을 지원하지 않는 서버는 단일 JSON 문서로 응답
+            if response.content_type == "application/json":
+                json_data = await response.json()
+                events = list(self._query_chunk_events(json_data))
+                if not any("content" in event for event in events):
+                    raise HTTPException(status_code=502, detail=f"VIA 서버 응답 형식 오류: {json_data}")
+                for event in events:
+                    yield event
+                return
+
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                # 빈 줄(이벤트 구분), 주석(: keep-alive), event:/id: 필드는 건너뜀
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    return
+                try:
+                    json_data = json.loads(payload)
+                except json.JSONDecodeError:
+                    logger.warning(f"VIA 스트림 청크 파싱 실패: {payload[:200]}")
+                    continue
+                if isinstance(json_data, dict) and json_data.get("error"):
+                    raise HTTPException(status_code=502, detail=f"VIA 서버 query_video 오류: {json_data['error']}")
+                for event in self._query_chunk_events(json_data):
+                    yield event
+
+    async def query_video(self, video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query, on_queue=None):
+        # 스트림 토큰을 모아 전체 답변 반환
+        parts = []
+        async for event in self.query_video_stream(video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query):
+            if event.get("type") == "queued":
+                if on_queue is not None:
+                    on_queue(event["position"], event["eta_seconds"])
+            elif "content" in event:
+                parts.append(event["content"])
+        if not parts:
+            raise HTTPException(status_code=502, detail="VIA 서버 응답 형식 오류: 응답 내용이 비어 있습니다.")
+        return "".join(parts)
 
 # ============================================================================
 # 상수 정의
@@ -495,16 +1598,168 @@ def parse_timestamps(timestamp_text: str, video_duration: float):
     return merged
 
 
+# ============================================================================
+# 추천 chunk_size (VIA /recommended_config 캐시 + 로컬 추정)
+# ============================================================================
+# VIA 추천값은 (동영상 길이 구간, 목표 응답 시간, 이벤트 길이)별로 TTL 동안 캐시합니다.
+# summarize 응답의 usage.query_processing_time으로 chunk_size별 구간당 처리 시간을 학습해
+# 관측이 충분하면 VIA 호출 없이 고르고, VIA를 쓸 수 없으면 관측값(없으면 사전값)으로 고릅니다.
+CHUNK_SIZE_CACHE_TTL_SECONDS = int(os.getenv("CHUNK_SIZE_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+# 동영상 길이 구간 폭 (0.1이면 길이가 10%씩 커지는 등비 구간)
+CHUNK_SIZE_LENGTH_BUCKET_RATIO = float(os.getenv("CHUNK_SIZE_LENGTH_BUCKET_RATIO", "0.1"))
+# summarize 관측값이 이만큼 쌓이면 VIA 호출 없이 로컬 추정값 사용
+CHUNK_SIZE_LOCAL_MIN_OBSERVATIONS = int(os.getenv("CHUNK_SIZE_LOCAL_MIN_OBSERVATIONS", "8"))
+# 관측값이 없을 때의 구간당 처리 시간 사전값: 고정 비용 + chunk 1초당 비용 (초)
+CHUNK_SIZE_PRIOR_BASE_SECONDS = float(os.getenv("CHUNK_SIZE_PRIOR_BASE_SECONDS", "4"))
+CHUNK_SIZE_PRIOR_PER_SECOND = float(os.getenv("CHUNK_SIZE_PRIOR_PER_SECOND", "0.1"))
+
+
+class ChunkSizeAdvisor:
+    """
+    추천 chunk_size 계산
+
+    1. 캐시된 VIA 추천값 (길이 구간·목표 파라미터별, TTL)
+    2. 관측값이 충분하면 로컬 추정 (VIA 호출 없음)
+    3. VIA /recommended_config
+    4. VIA 실패 시 로컬 추정
+
+    로컬 추정은 구간당 처리 시간 = base + per_second × chunk_size 모델로 전체 처리 시간
+    (구간 수 × 구간당 처리 시간)을 예측하고, 목표 응답 시간 안에 끝나는 가장 작은 chunk_size를 고릅니다.
+    """
+
+    def __init__(self, ttl, bucket_ratio, min_observations, prior_base, prior_per_second, ewma_alpha=0.3):
+        self.ttl = ttl
+        self.bucket_ratio = bucket_ratio
+        self.min_observations = min_observations
+        self.prior_base = prior_base
+        self.prior_per_second = prior_per_second
+        self.ewma_alpha = ewma_alpha
+        self.cache = {}  # (길이 구간, 목표 응답 시간, 이벤트 길이) → (chunk_size, 조회 시각)
+        self.per_chunk_seconds = {}  # chunk_size → 구간당 처리 시간 (지수 이동 평균)
+        self.observations = 0
+        self.hits = 0
+        self.fetches = 0
+        self.local = 0
+        self.fallbacks = 0
+
+    def _bucket(self, video_length):
+        return int(math.log(max(video_length, 1.0)) / math.log1p(self.bucket_ratio))
+
+    def observe_usage(self, chunk_duration, usage, chunks=None):
+        """summarize 응답 usage로 구간당 처리 시간 기록"""
+        if not isinstance(usage, dict):
+            return
+        processing_time = usage.get("query_processing_time")
+        chunks = usage.get("total_chunks_processed") or chunks
+        if not chunk_duration or not chunks or not isinstance(processing_time, (int, float)) or processing_time <= 0:
+            return
+        per_chunk = processing_time / chunks
+        previous = self.per_chunk_seconds.get(chunk_duration)
+        if previous is None:
+            self.per_chunk_seconds[chunk_duration] = per_chunk
+        else:
+            self.per_chunk_seconds[chunk_duration] = previous + self.ewma_alpha * (per_chunk - previous)
+        self.observations += 1
+
+    def cost_model(self):
+        """관측값에 최소제곱으로 맞춘 (base, per_second)"""
+        points = list(self.per_chunk_seconds.items())
+        if not points:
+            return self.prior_base, self.prior_per_second
+        if len(points) == 1:
+            # chunk_size 하나만 관측했으면 사전값의 모양은 유지하고 크기만 맞춤
+            size, seconds = points[0]
+            scale = seconds / (self.prior_base + self.prior_per_second * size)
+            return self.prior_base * scale, self.prior_per_second * scale
+        mean_x = sum(size for size, _ in points) / len(points)
+        mean_y = sum(seconds for _, seconds in points) / len(points)
+        variance = sum((size - mean_x) ** 2 for size, _ in points)
+        per_second = max(0.0, sum((size - mean_x) * (seconds - mean_y) for size, seconds in points) / variance)
+        return max(0.0, mean_y - per_second * mean_x), per_second
+
+    def estimate(self, video_length, target_response_time, usecase_event_duration):
+        """CHUNK_SIZES 중 예측 처리 시간이 목표 안에 드는 가장 작은 값 (없으면 예측 시간이 가장 짧은 값)"""
+        base, per_second = self.cost_model()
+        sizes = sorted(value for _, value in CHUNK_SIZES if value > 0)
+        candidates = []
+        for size in sizes:
+            # 이벤트 길이보다 짧은 구간은 제외, 동영상 전체를 덮는 크기보다 큰 구간은 의미 없음
+            if size < min(usecase_event_duration, video_length):
+                continue
+            candidates.append(size)
+            if size >= video_length:
+                break
+        if not candidates:
+            candidates = sizes[-1:]
+
+        def predicted(size):
+            return math.ceil(video_length / size) * (base + per_second * size)
+
+        for size in candidates:
+            if predicted(size) <= target_response_time:
+                return size
+        return min(candidates, key=predicted)
+
+    async def recommend(self, video_length, target_response_time, usecase_event_duration, fetch):
+        """추천 chunk_size (fetch: VIA 추천값을 반환하는 코루틴 함수, 실패 시 0 또는 예외)"""
+        key = (self._bucket(video_length), int(target_response_time), int(usecase_event_duration))
+        cached = self.cache.get(key)
+        if cached and time.monotonic() - cached[1] < self.ttl:
+            self.hits += 1
+            return cached[0]
+        if self.observations >= self.min_observations:
+            self.local += 1
+            return self.estimate(video_length, target_response_time, usecase_event_duration)
+
+        self.fetches += 1
+        try:
+            chunk_size = await fetch()
+        except Exception as e:
+            logger.warning(f"Failed to get recommended chunk size from backend: {e}")
+            chunk_size = 0
+        if chunk_size > 0:
+            chunk_size = get_closest_chunk_size(CHUNK_SIZES, chunk_size)
+            self.cache[key] = (chunk_size, time.monotonic())
+            return chunk_size
+
+        # VIA가 추천값을 주지 못하면 로컬 추정값 사용
+        self.fallbacks += 1
+        return self.estimate(video_length, target_response_time, usecase_event_duration)
+
+    def stats(self):
+        base, per_second = self.cost_model()
+        return {
+            "cached_entries": len(self.cache),
+            "ttl_seconds": self.ttl,
+            "observations": self.observations,
+            "per_chunk_seconds": {str(size): round(seconds, 3) for size, seconds in sorted(self.per_chunk_seconds.items())},
+            "cost_model": {"base_seconds": round(base, 3), "per_second": round(per_second, 4)},
+            "local_model_active": self.observations >= self.min_observations,
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "local": self.local,
+            "fallbacks": self.fallbacks,
+        }
+
+
+chunk_size_advisor = ChunkSizeAdvisor(
+    CHUNK_SIZE_CACHE_TTL_SECONDS,
+    CHUNK_SIZE_LENGTH_BUCKET_RATIO,
+    CHUNK_SIZE_LOCAL_MIN_OBSERVATIONS,
+    CHUNK_SIZE_PRIOR_BASE_SECONDS,
+    CHUNK_SIZE_PRIOR_PER_SECOND,
+)
+
+
 async def get_recommended_chunk_size(video_length):
     """
-    aiohttp를 사용하여 비동기 방식으로 API 호출
+    aiohttp를 사용하여 비동기 방식으로 API 호출 (ChunkSizeAdvisor 캐시/로컬 추정 경유)
     """
     # In seconds:
     target_response_time = DEFAULT_VIA_TARGET_RESPONSE_TIME
     usecase_event_duration = DEFAULT_VIA_TARGET_USECASE_EVENT_DURATION
-    recommended_chunk_size = 0
 
-    try:
+    async def fetch():
         session = await get_session()
         async with session.post(
             VIA_SERVER_URL + "/recommended_config",
@@ -513,543 +1768,2085 @@ async def get_recommended_chunk_size(video_length):
                 "target_response_time": int(target_response_time),
                 "usecase_event_duration": int(usecase_event_duration),
             },
-            timeout=aiohttp.ClientTimeout(total=10)
+            timeout=VIA_TIMEOUTS["recommended_config"]
         ) as response:
+            if response.status in UPSTREAM_FAILURE_STATUSES:
+                raise HTTPException(status_code=response.status, detail="VIA /recommended_config 호출 실패")
             if response.status < 400:
                 # Success response from API:
                 resp_json = await response.json()
-                recommended_chunk_size = int(resp_json.get("chunk_size", 0))
-    except Exception as e:
-        logger.warning(f"Failed to get recommended chunk size from backend: {e}")
-    
-    if recommended_chunk_size == 0:
-        # API fail to provide non-zero chunk size
-        # Choose the largest chunk-size in favor of quick VIA execution
-        recommended_chunk_size = video_length
-    
-    return get_closest_chunk_size(CHUNK_SIZES, recommended_chunk_size)
+                return int(resp_json.get("chunk_size", 0))
+            return 0
 
-# ============================================================================
-# 요청/응답 모델 정의
-# ============================================================================
-class RecommendedChunkSizeRequest(BaseModel):
-    video_length: float
+    # 회로가 열려 있으면 바로 실패하고 로컬 추정값 사용
+    return await chunk_size_advisor.recommend(
+        video_length,
+        target_response_time,
+        usecase_event_duration,
+        lambda: call_upstream(via_breaker, "recommended_config", fetch, retries=1),
+    )
 
 # ============================================================================
-# 헬스체크 엔드포인트 (Railway 헬스체크용)
+# 클립 추출 엔진 (FFmpeg)
 # ============================================================================
-@app.get("/")
-async def root():
-    """루트 엔드포인트 - Railway 헬스체크용"""
-    return {"status": "ok", "message": "VSS API is running"}
+# FFmpeg/FFprobe 실행 파일 경로 (Dockerfile에서 ffmpeg 패키지 설치)
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
 
-@app.get("/health")
-async def health_check():
-    """헬스체크 엔드포인트"""
-    try:
-        # 데이터베이스 연결 확인
-        test_conn = db_pool.get_connection(timeout=2)
-        test_conn.ping()
-        db_pool.return_connection(test_conn)
-        db_status = "connected"
-    except Exception as e:
-        db_status = f"disconnected: {str(e)}"
-    
-    return {
-        "status": "ok",
-        "database": db_status,
-        "timestamp": datetime.now().isoformat()
-    }
+# 클립 추출 모드
+# - fast: 구간을 키프레임 경계로 넓혀서 스트림 복사 (재인코딩 없음)
+# - exact: 구간 양 끝의 불완전한 GOP만 재인코딩하고 나머지는 스트림 복사
+CLIP_EXTRACT_MODE = os.getenv("CLIP_EXTRACT_MODE", "fast").lower()
 
-@app.post("/get-recommended-chunk-size")
-async def get_recommended_chunk_size_endpoint(request: RecommendedChunkSizeRequest):
+# 키프레임 탐색 시 구간 앞뒤로 더 읽을 여유 시간 (초)
+KEYFRAME_PROBE_MARGIN = 30.0
+
+# 부동소수점 비교 오차 허용값 (초)
+CLIP_TIME_EPSILON = 0.001
+
+
+def _run_media_command(args):
+    """FFmpeg/FFprobe 명령 실행 후 표준 출력 반환 (실패 시 RuntimeError)"""
+    result = subprocess.run(args, capture_output=True, text=True)
+    if result.returncode != 0:
+        stderr = (result.stderr or "").strip()[-1000:]
+        raise RuntimeError(f"{os.path.basename(args[0])} 실행 실패 (code {result.returncode}): {stderr}")
+    return result.stdout
+
+
+def probe_media_info(video_path):
     """
-    동영상 길이를 받아서 추천 chunk_size를 반환하는 엔드포인트
+    FFprobe로 동영상 길이와 첫 번째 비디오 스트림의 코덱을 조회합니다.
+
+    Returns:
+        dict: {"duration": float, "codec": str | None}
     """
+    output = _run_media_command([
+        FFPROBE_BINARY, "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "format=duration:stream=codec_name",
+        "-of", "json",
+        str(video_path),
+    ])
+    info = json.loads(output or "{}")
+    streams = info.get("streams") or []
     try:
-        # 입력 검증
-        if request.video_length <= 0:
-            raise HTTPException(status_code=400, detail="동영상 길이는 0보다 커야 합니다.")
-        if request.video_length > 86400:  # 24시간 초과
-            raise HTTPException(status_code=400, detail="동영상 길이는 24시간(86400초)을 초과할 수 없습니다.")
-        
-        recommended_chunk_size = await get_recommended_chunk_size(request.video_length)
-        return {"recommended_chunk_size": recommended_chunk_size, "video_length": request.video_length}
-    except HTTPException:
-        raise
-    except ValueError as e:
-        logger.error(f"입력 값 오류: {e}")
-        raise HTTPException(status_code=400, detail=f"잘못된 입력 값입니다: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error getting recommended chunk size: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"추천 chunk size 조회 중 오류가 발생했습니다: {str(e)}")
+        duration = float(info.get("format", {}).get("duration") or 0)
+    except (TypeError, ValueError):
+        duration = 0.0
+    return {
+        "duration": duration,
+        "codec": streams[0].get("codec_name") if streams else None,
+    }
+
 
-async def remove_all_media(session: aiohttp.ClientSession, media_ids):
+def probe_keyframes(video_path, ranges=None):
     """
-    VIA 서버에서 여러 미디어 파일을 삭제하는 함수
-    vss-summarize.py의 remove_all_media 함수를 참고하여 구현
+    FFprobe 패킷 스캔으로 키프레임 시간 목록을 조회합니다 (디코딩 없음).
+
+    Args:
+        video_path: 동영상 파일 경로
+        ranges: [(start, end), ...] 구간 목록. 주어지면 해당 구간 주변만 읽습니다.
+
+    Returns:
+        List[float]: 정렬된 키프레임 시간 (초)
     """
-    for media_id in media_ids:
+    args = [
+        FFPROBE_BINARY, "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "compact=p=0",
+    ]
+    if ranges:
+        intervals = ",".join(
+            f"{max(0.0, start - KEYFRAME_PROBE_MARGIN):.3f}%{end + KEYFRAME_PROBE_MARGIN:.3f}"
+            for start, end in ranges
+        )
+        args += ["-read_intervals", intervals]
+    args.append(str(video_path))
+
+    keyframes = set()
+    for line in _run_media_command(args).splitlines():
+        fields = dict(part.split("=", 1) for part in line.strip().split("|") if "=" in part)
+        if "K" not in fields.get("flags", ""):
+            continue
         try:
-            async with session.delete(VIA_SERVER_URL + "/files/" + media_id) as resp:
-                if resp.status >= 400:
-                    logger.warning(f"Failed to delete media {media_id}: HTTP {resp.status}")
-                else:
-                    logger.info(f"Successfully deleted media {media_id}")
-        except Exception as e:
-            logger.error(f"Error deleting media {media_id}: {e}")
+            keyframes.add(float(fields["pts_time"]))
+        except (KeyError, ValueError):
+            continue
+    return sorted(keyframes)
 
-class RemoveMediaRequest(BaseModel):
-    media_ids: List[str]
 
-@app.post("/remove-media")
-async def remove_media_endpoint(request: RemoveMediaRequest):
+def snap_range_to_keyframes(keyframes, start_time, end_time, duration):
     """
-    VIA 서버에서 미디어 파일들을 삭제하는 엔드포인트
+    (start, end) 구간을 감싸는 키프레임 경계를 이진 탐색으로 찾습니다.
+
+    Returns:
+        tuple: (start 이하의 마지막 키프레임, end 이상의 첫 키프레임 또는 동영상 끝)
     """
-    try:
-        # 입력 검증
-        if not request.media_ids or len(request.media_ids) == 0:
-            raise HTTPException(status_code=400, detail="삭제할 미디어 ID 목록이 필요합니다.")
-        
-        session = await get_session()
-        await remove_all_media(session, request.media_ids)
-        return {"success": True, "message": f"Deleted {len(request.media_ids)} media file(s)"}
-    except HTTPException:
-        raise
-    except aiohttp.ClientError as e:
-        logger.error(f"VIA 서버 연결 오류: {e}")
-        raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error removing media: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"미디어 삭제 중 오류가 발생했습니다: {str(e)}")
+    i = bisect.bisect_right(keyframes, start_time + CLIP_TIME_EPSILON) - 1
+    snapped_start = keyframes[i] if i >= 0 else 0.0
+    j = bisect.bisect_left(keyframes, end_time - CLIP_TIME_EPSILON)
+    snapped_end = keyframes[j] if j < len(keyframes) else duration
+    return snapped_start, max(snapped_end, end_time)
 
-@app.post("/generate-clips")
-async def generate_clips(
-    request: Request,
-    files: List[UploadFile] = File(None),
-    prompt: str = Form(...),
-    user_id: Optional[str] = Form(None),
-    video_ids: Optional[str] = Form(None)  # JSON 문자열로 전달: {"filename1": video_id1, "filename2": video_id2}
-):
+
+def _stream_copy_args(video_path, start_time, end_time, output_path, extra=None):
+    """키프레임에서 시작하는 구간을 재인코딩 없이 복사하는 FFmpeg 인자"""
+    return [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start_time:.3f}",
+        "-i", str(video_path),
+        "-t", f"{end_time - start_time:.3f}",
+        "-map", "0:v:0", "-c", "copy", "-an",
+        "-avoid_negative_ts", "make_zero",
+        *(extra or []),
+        str(output_path),
+    ]
+
+
+def _reencode_args(video_path, start_time, end_time, output_path, extra=None):
+    """구간을 libx264로 재인코딩하는 FFmpeg 인자"""
+    return [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start_time:.3f}",
+        "-i", str(video_path),
+        "-t", f"{end_time - start_time:.3f}",
+        "-map", "0:v:0", "-an",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+        *(extra or []),
+        str(output_path),
+    ]
+
+
+def _build_clip_plan(video_path, output_path, start_time, end_time, keyframes, duration, codec, mode):
     """
-    동영상에서 클립 생성 엔드포인트
+    클립 추출에 필요한 FFmpeg 명령 목록과 실제 클립 구간을 계산합니다.
+
+    Returns:
+        tuple: (명령 목록, 병합할 중간 파일 목록, 실제 시작 시간, 실제 끝 시간)
     """
-    try:
-        # 입력 검증
-        if not prompt or not prompt.strip():
-            raise HTTPException(status_code=400, detail="검색어(prompt)를 입력해주세요.")
-        
-        prompt = prompt.strip()
-        
-        # 클립 저장 디렉토리 생성
-        try:
-            os.makedirs("./clips", exist_ok=True)
-        except OSError as e:
-            logger.error(f"클립 디렉토리 생성 실패: {e}")
-            raise HTTPException(status_code=500, detail="클립 저장 디렉토리를 생성할 수 없습니다.")
-        
-        # 오래된 클립 파일 정리 (24시간 이상 된 파일만 삭제)
-        try:
-            current_time = time.time()
-            clips_dir = Path("./clips")
-            if clips_dir.exists():
-                for existing_file in os.listdir("./clips"):
-                    file_path = os.path.join("./clips", existing_file)
-                    try:
-                        if os.path.isfile(file_path):
-                            # 파일 수정 시간 확인
-                            file_mtime = os.path.getmtime(file_path)
-                            # 24시간(86400초) 이상 된 파일만 삭제
-                            if current_time - file_mtime > 86400:
-                                os.remove(file_path)
-                                logger.info(f"Deleted old clip: {file_path}")
-                    except OSError as e:
-                        logger.warning(f"오래된 클립 파일 삭제 실패 {file_path}: {e}")
-                    except Exception as e:
-                        logger.error(f"Error deleting old clip {file_path}: {e}")
-        except OSError as e:
-            logger.warning(f"클립 디렉토리 접근 실패: {e}")
-        except Exception as e:
-            logger.warning(f"Error cleaning old clips: {e}")
+    if mode == "fast" and keyframes:
+        clip_start, clip_end = snap_range_to_keyframes(keyframes, start_time, end_time, duration)
+        return (
+            [_stream_copy_args(video_path, clip_start, clip_end, output_path, ["-movflags", "+faststart"])],
+            [],
+            clip_start,
+            clip_end,
+        )
 
-        global vss_client
+    # exact 모드: [start, k1) 재인코딩 + [k1, k2) 스트림 복사 + [k2, end) 재인코딩
+    # H.264가 아니면 복사 구간과 이어 붙일 수 없으므로 전체 재인코딩
+    inner = [k for k in keyframes if start_time - CLIP_TIME_EPSILON <= k <= end_time + CLIP_TIME_EPSILON]
+    if codec != "h264" or len(inner) < 2:
+        return (
+            [_reencode_args(video_path, start_time, end_time, output_path, ["-movflags", "+faststart"])],
+            [],
+            start_time,
+            end_time,
+        )
 
-        # 파일 목록 초기화
-        upload_list = []
-        if files:
-            upload_list.extend(files)
+    k1, k2 = inner[0], inner[-1]
+    to_annexb = ["-bsf:v", "h264_mp4toannexb", "-f", "mpegts"]
+    commands = []
+    parts = []
+    segments = [
+        (start_time, k1, _reencode_args),
+        (k1, k2, _stream_copy_args),
+        (k2, end_time, _reencode_args),
+    ]
+    for index, (seg_start, seg_end, builder) in enumerate(segments):
+        if seg_end - seg_start <= CLIP_TIME_EPSILON:
+            continue
+        part_path = f"{output_path}.part{index}.ts"
+        commands.append(builder(video_path, seg_start, seg_end, part_path, to_annexb))
+        parts.append(part_path)
 
-        if not upload_list:
-            raise HTTPException(status_code=400, detail="No file provided")
+    commands.append([
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+        "-i", "concat:" + "|".join(parts),
+        "-c", "copy", "-movflags", "+faststart",
+        str(output_path),
+    ])
+    return commands, parts, start_time, end_time
 
-        # 임시 디렉토리 생성
-        try:
-            os.makedirs("./tmp", exist_ok=True)
-        except OSError as e:
-            logger.error(f"임시 디렉토리 생성 실패: {e}")
-            raise HTTPException(status_code=500, detail="임시 디렉토리를 생성할 수 없습니다.")
-        
-        # video_ids 파싱 (JSON 문자열)
-        video_id_map = {}
-        if video_ids and user_id:
-            try:
-                video_id_map = json.loads(video_ids) if isinstance(video_ids, str) else video_ids
-            except:
-                video_id_map = {}
-        
-        for upfile in upload_list:
-            file_path = os.path.basename(upfile.filename)
-            tmp_path = f"./tmp/{file_path}"
 
-            # VIA 서버 클라이언트 초기화 및 모델 조회
-            if vss_client is None:
-                vss_client = VSS(VIA_SERVER_URL)
-            
-            try:
-                if not vss_client.model:
-                    vss_client.model = await vss_client.get_model()
-                model = vss_client.model
-            except HTTPException:
-                raise
-            except Exception as e:
-                raise HTTPException(status_code=502, detail=f"Failed to contact VIA server: {e}")
+def extract_clip(video_path, output_path, start_time, end_time, keyframes, duration, codec=None, mode=None):
+    """
+    FFmpeg로 클립을 추출합니다.
 
-            # 업로드용 임시 파일 실제 저장 (기존 누락으로 인해 FileNotFoundError / 빈 처리 발생 가능)
+    fast 모드는 키프레임 경계로 넓힌 구간을 스트림 복사하고, exact 모드는 경계 GOP만
+    재인코딩합니다. 어느 모드든 실패하면 구간 전체를 재인코딩합니다.
+
+    Returns:
+        tuple: 클립에 실제로 담긴 (start_time, end_time)
+    """
+    mode = (mode or CLIP_EXTRACT_MODE).lower()
+    commands, parts, clip_start, clip_end = _build_clip_plan(
+        video_path, output_path, start_time, end_time, keyframes, duration, codec, mode
+    )
+    try:
+        for args in commands:
+            _run_media_command(args)
+    except RuntimeError as e:
+        logger.warning(f"클립 {mode} 추출 실패, 전체 재인코딩으로 대체합니다: {e}")
+        _run_media_command(_reencode_args(video_path, start_time, end_time, output_path, ["-movflags", "+faststart"]))
+        clip_start, clip_end = start_time, end_time
+    finally:
+        for part_path in parts:
             try:
-                with open(tmp_path, "wb") as buffer:
-                    shutil.copyfileobj(upfile.file, buffer)
-            except OSError as e:
-                logger.error(f"임시 파일 저장 실패: {tmp_path}, 오류: {e}")
-                raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
-            except Exception as e:
-                logger.error(f"파일 저장 중 예상치 못한 오류: {e}")
-                raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
+                os.remove(part_path)
+            except OSError:
+                pass
+    return clip_start, clip_end
 
-            logger.info(f"Uploaded video saved to {tmp_path}")
+# ============================================================================
+# 키프레임 인덱스 (업로드 시 1회 생성)
+# ============================================================================
+# 동영상별 키프레임/GOP 테이블 사이드카 저장 위치 (vss_videos.ID 기준 파일명)
+# /video-files로 공개되는 videos_dir 밖에 저장
+keyframe_index_dir = Path(os.getenv("KEYFRAME_INDEX_DIR", "./keyframes"))
+# 이전 버전의 사이드카 위치 (시작 시 keyframe_index_dir로 이동)
+_legacy_keyframe_index_dir = videos_dir / ".keyframes"
+
+# 메모리 캐시: {vss_videos.ID: 인덱스 dict}
+keyframe_index_cache = {}
+
+
+def _keyframe_index_path(video_db_id):
+    return keyframe_index_dir / f"{int(video_db_id)}.json"
+
+
+def build_keyframe_index(file_path: str, video_db_id: int):
+    """
+    동영상 전체를 FFprobe로 한 번 스캔하여 키프레임 시간 테이블을 사이드카로 저장합니다.
+    (백그라운드 작업)
+    """
+    try:
+        if not os.path.exists(file_path):
+            logger.warning(f"키프레임 인덱스 생성 대상 파일이 없음: {file_path}")
+            return None
+
+        media_info = probe_media_info(file_path)
+        keyframes = probe_keyframes(file_path)
+        index = {
+            "video_id": int(video_db_id),
+            "file_name": os.path.basename(file_path),
+            "file_size": os.path.getsize(file_path),
+            "duration": media_info["duration"],
+            "codec": media_info["codec"],
+            "times": keyframes,
+        }
+
+        keyframe_index_dir.mkdir(parents=True, exist_ok=True)
+        index_path = _keyframe_index_path(video_db_id)
+        tmp_index_path = index_path.with_suffix(".json.tmp")
+        with open(tmp_index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_index_path, index_path)
+
+        keyframe_index_cache[int(video_db_id)] = index
+        logger.info(f"키프레임 인덱스 생성 완료: ID {video_db_id}, 키프레임 {len(index['times'])}개")
+        return index
+    except Exception as e:
+        logger.warning(f"키프레임 인덱스 생성 실패 (ID: {video_db_id}): {e}")
+        return None
+
+
+def load_keyframe_index(video_db_id, file_path=None):
+    """
+    저장된 키프레임 인덱스를 조회합니다. 없거나 원본 파일 크기와 맞지 않으면 None을 반환합니다.
+    """
+    if video_db_id is None:
+        return None
+    try:
+        video_db_id = int(video_db_id)
+    except (TypeError, ValueError):
+        return None
+
+    index = keyframe_index_cache.get(video_db_id)
+    if index is None:
+        index_path = _keyframe_index_path(video_db_id)
+        if not index_path.exists():
+            return None
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"키프레임 인덱스 읽기 실패 (ID: {video_db_id}): {e}")
+            return None
+        # 이전 버전 사이드카의 바이트 오프셋은 사용하지 않으므로 메모리에 두지 않음
+        index.pop("offsets", None)
+        keyframe_index_cache[video_db_id] = index
+
+    # 파일이 교체된 경우 인덱스 무효
+    if file_path is not None:
+        try:
+            if os.path.getsize(file_path) != index.get("file_size"):
+                return None
+        except OSError:
+            return None
+    return index
+
+
+def migrate_legacy_keyframe_indexes():
+    """videos_dir 아래에 있던 이전 사이드카를 공개되지 않는 디렉토리로 이동"""
+    if not _legacy_keyframe_index_dir.is_dir():
+        return
+    keyframe_index_dir.mkdir(parents=True, exist_ok=True)
+    moved = 0
+    for index_path in _legacy_keyframe_index_dir.glob("*.json"):
+        target = keyframe_index_dir / index_path.name
+        try:
+            if target.exists():
+                index_path.unlink()
+            else:
+                shutil.move(str(index_path), str(target))
+                moved += 1
+        except OSError as e:
+            logger.warning(f"키프레임 인덱스 이동 실패 {index_path}: {e}")
+    try:
+        _legacy_keyframe_index_dir.rmdir()
+    except OSError:
+        pass
+    logger.info(f"이전 위치의 키프레임 인덱스 {moved}개를 {keyframe_index_dir}로 이동했습니다.")
+
+
+def remove_keyframe_index(video_db_id):
+    """동영상 삭제 시 키프레임 인덱스 제거"""
+    keyframe_index_cache.pop(int(video_db_id), None)
+    try:
+        _keyframe_index_path(video_db_id).unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"키프레임 인덱스 삭제 실패 (ID: {video_db_id}): {e}")
+
+# ============================================================================
+# 클립 인코딩 풀 (모든 요청 공유)
+# ============================================================================
+# 동시에 실행할 FFmpeg 인코딩 프로세스 수
+CLIP_ENCODER_WORKERS = int(os.getenv("CLIP_ENCODER_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# 실행 슬롯을 기다릴 수 있는 최대 작업 수 (초과 시 503 반환)
+CLIP_ENCODER_QUEUE_DEPTH = int(os.getenv("CLIP_ENCODER_QUEUE_DEPTH", "64"))
+
+
+class ClipEncoderPool:
+    """
+    클립 인코딩 작업 풀 (이벤트 루프 밖에서 실행)
+
+    실제 인코딩은 FFmpeg 자식 프로세스가 수행하므로, 워커는 프로세스 하나를 실행하고
+    종료를 기다리기만 합니다. 워커 수가 동시에 실행되는 FFmpeg 프로세스 수의 상한이 됩니다.
+    """
+    def __init__(self, max_workers, max_queue, thread_name_prefix="clip-encoder",
+                 busy_detail="클립 인코딩 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요."):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.busy_detail = busy_detail
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.pending = 0  # 실행 중 + 대기 중인 작업 수 (이벤트 루프에서만 변경)
+
+    async def submit(self, func, *args, **kwargs):
+        """작업을 풀에 넣고 완료될 때까지 비동기로 대기"""
+        if self.pending >= self.max_workers + self.max_queue:
+            raise HTTPException(
+                status_code=503,
+                detail=self.busy_detail,
+                headers={"Retry-After": "10"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+clip_encoder_pool = ClipEncoderPool(CLIP_ENCODER_WORKERS, CLIP_ENCODER_QUEUE_DEPTH)
+
+# ============================================================================
+# 클립 캐시 (콘텐츠 주소 기반, 용량 제한 LRU)
+# ============================================================================
+# 클립 디렉토리 최대 사용량 (바이트, 기본 10GB)
+CLIP_CACHE_MAX_BYTES = int(os.getenv("CLIP_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+# 마지막 사용 후 이 시간이 지난 클립은 정리 작업이 삭제 (0이면 용량 기준만 적용)
+CLIP_CACHE_TTL_SECONDS = int(os.getenv("CLIP_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+# 정리 작업 실행 주기 (용량 초과 시에는 즉시 실행)
+CLIP_JANITOR_INTERVAL_SECONDS = int(os.getenv("CLIP_JANITOR_INTERVAL_SECONDS", "600"))
+# 인코딩 방식이 바뀌면 올려서 기존 캐시를 무효화
+CLIP_CACHE_PROFILE_VERSION = "v1"
+CLIP_CACHE_KEY_LENGTH = 20
+
+# 파일 내용 해시 메모이제이션: {(실제 경로, 크기, mtime_ns): sha256}
+_content_hash_cache = OrderedDict()
+_CONTENT_HASH_CACHE_SIZE = 256
+
+
+def file_content_hash(file_path):
+    """파일 내용의 SHA-256 (경로/크기/수정 시간이 같으면 재계산하지 않음)"""
+    stat = os.stat(file_path)
+    memo_key = (os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns)
+    cached = _content_hash_cache.get(memo_key)
+    if cached:
+        return cached
+
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    _remember_content_hash(memo_key, digest)
+    return digest
+
+
+def _remember_content_hash(memo_key, digest):
+    _content_hash_cache[memo_key] = digest
+    while len(_content_hash_cache) > _CONTENT_HASH_CACHE_SIZE:
+        _content_hash_cache.popitem(last=False)
+
+
+def remember_file_content_hash(file_path, digest):
+    """저장하면서 계산한 해시를 등록해 다시 읽지 않도록 함"""
+    stat = os.stat(file_path)
+    _remember_content_hash((os.path.realpath(file_path), stat.st_size, stat.st_mtime_ns), digest)
+
+
+class ClipCache:
+    """
+    (원본 내용 해시, 시작, 끝, 인코딩 프로파일)로 식별되는 클립 파일 캐시
+
+    파일명은 clip_{키}.mp4 형식입니다 (키에 원본 내용이 반영되므로 요청자 파일명은 넣지 않음). 삭제는 요청 경로가 아닌
+    백그라운드 정리 작업(sweep)에서 수행하며, 마지막 사용 후 ttl이 지난 클립과
+    총 용량이 max_bytes를 넘는 만큼의 가장 오래 사용되지 않은 클립을 지웁니다.
+    """
+    # 이전 형식(clip_{원본 파일명}_{키}.mp4)도 같은 키로 인식
+    _filename_pattern = re.compile(rf"^clip_(?:.+_)?(?P<key>[0-9a-f]{{{CLIP_CACHE_KEY_LENGTH}}})\.mp4$")
+
+    def __init__(self, directory, max_bytes, ttl=0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # {키: {"path": Path, "size": int, "start_time": float | None, "end_time": float | None, "accessed": float}}
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        # 만료 힙 [(만료 시각, 키)]: 생성 시 등록, 사용 시각 갱신은 정리할 때 확인 후 재등록
+        self.expiry = []
+        self.inflight = {}  # {키: asyncio.Task} 동일 클립 동시 생성 방지
+        self.wakeup = asyncio.Event()  # 용량 초과 시 정리 작업을 바로 깨움
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.expirations = 0
+        self.expired_bytes = 0
+        self.sweeps = 0
+        self.last_sweep = None
+        self.removed_files = []  # 정리 작업이 지운 파일명 (vss_clips 기록 정리용)
+
+    @staticmethod
+    def make_key(content_hash, start_time, end_time, profile):
+        raw = f"{content_hash}|{start_time:.3f}|{end_time:.3f}|{profile}|{CLIP_CACHE_PROFILE_VERSION}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:CLIP_CACHE_KEY_LENGTH]
+
+    def scan(self):
+        """시작 시 클립 디렉토리를 한 번 읽어 인덱스 복원 (생성 시각 오래된 순으로 LRU 순서 근사)"""
+        self.entries.clear()
+        self.expiry.clear()
+        self.total_bytes = 0
+        if not self.directory.exists():
+            return
+        files = []
+        for clip_file in self.directory.iterdir():
+            if not clip_file.is_file():
+                continue
+            if clip_file.name.startswith("."):
+                if clip_file.name.endswith(".partial.mp4"):
+                    # 이전 실행에서 중단된 인코딩 결과
+                    try:
+                        clip_file.unlink()
+                    except OSError:
+                        pass
+                continue
+            try:
+                stat = clip_file.stat()
+            except OSError:
+                continue
+            match = self._filename_pattern.match(clip_file.name)
+            # 이전 형식의 클립도 용량 계산과 LRU 삭제 대상에 포함
+            key = match.group("key") if match else f"legacy:{clip_file.name}"
+            files.append((stat.st_mtime, key, clip_file, stat.st_size))
+        for mtime, key, clip_file, size in sorted(files):
+            self.entries[key] = {"path": clip_file, "size": size, "start_time": None, "end_time": None, "accessed": mtime}
+            self.total_bytes += size
+            self._schedule_expiry(key, mtime)
+        logger.info(f"클립 캐시 인덱스 복원: {len(self.entries)}개, {self.total_bytes / (1024 * 1024):.1f} MB")
+
+    def _schedule_expiry(self, key, accessed):
+        if self.ttl > 0:
+            heapq.heappush(self.expiry, (accessed + self.ttl, key))
+
+    def contains(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and entry["path"].exists()
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if not entry["path"].exists():
+            # 외부에서 삭제된 파일
+            self._drop(key)
+            return None
+        # 사용 시각은 인덱스에만 기록 (파일 수정 시간은 미리보기 최신 여부 판단에 쓰이므로 건드리지 않음)
+        self.entries.move_to_end(key)
+        entry["accessed"] = time.time()
+        return entry
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry["size"]
+        return entry
+
+    def discard_path(self, path):
+        """클립 파일이 다른 경로(삭제 API 등)로 지워졌을 때 인덱스에서 제거"""
+        name = Path(path).name
+        match = self._filename_pattern.match(name)
+        self._drop(match.group("key") if match else f"legacy:{name}")
+        remove_previews(path)
+
+    async def get_or_create(self, key, create):
+        """
+        캐시된 클립을 반환하거나, 없으면 create(출력 경로)로 생성 후 등록합니다.
+        create는 (실제 시작 시간, 실제 끝 시간)을 반환하는 코루틴 함수입니다.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        task = self.inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._create(key, create))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            # 같은 클립을 생성 중인 요청이 있으면 그 결과를 공유
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    async def _create(self, key, create):
+        self.directory.mkdir(exist_ok=True)
+        clip_path = self.directory / f"clip_{key}.mp4"
+        partial_path = self.directory / f".{clip_path.stem}.partial.mp4"
+        try:
+            clip_start, clip_end = await create(str(partial_path))
+            os.replace(partial_path, clip_path)
+        except BaseException:
+            try:
+                partial_path.unlink()
+            except OSError:
+                pass
+            raise
+
+        size = clip_path.stat().st_size
+        now = time.time()
+        self._drop(key)
+        entry = {"path": clip_path, "size": size, "start_time": clip_start, "end_time": clip_end, "accessed": now}
+        self.entries[key] = entry
+        self.total_bytes += size
+        self._schedule_expiry(key, now)
+        if self.total_bytes > self.max_bytes:
+            self.wakeup.set()
+        return entry
+
+    def _remove_file(self, entry):
+        """클립 파일과 미리보기 삭제 후 실제로 회수한 바이트 수 반환"""
+        self.removed_files.append(entry["path"].name)
+        reclaimed = 0
+        try:
+            entry["path"].unlink()
+            reclaimed = entry["size"]
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"클립 캐시 파일 삭제 실패 {entry['path']}: {e}")
+        remove_previews(entry["path"])
+        return reclaimed
+
+    def expire(self, now=None):
+        """마지막 사용 후 ttl이 지난 클립 삭제"""
+        now = now or time.time()
+        reclaimed = 0
+        while self.expiry and self.expiry[0][0] <= now:
+            _, key = heapq.heappop(self.expiry)
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            expires_at = entry["accessed"] + self.ttl
+            if expires_at > now:
+                # 그 사이 다시 사용된 클립: 새 만료 시각으로 재등록
+                heapq.heappush(self.expiry, (expires_at, key))
+                continue
+            self._drop(key)
+            freed = self._remove_file(entry)
+            reclaimed += freed
+            self.expirations += 1
+            logger.info(f"만료된 클립 삭제: {entry['path'].name}")
+        self.expired_bytes += reclaimed
+        return reclaimed
+
+    def evict(self):
+        """총 용량이 예산 이하가 될 때까지 가장 오래 사용되지 않은 클립 삭제"""
+        reclaimed = 0
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry["size"]
+            reclaimed += self._remove_file(entry)
+            self.evictions += 1
+            logger.info(f"클립 캐시에서 삭제: {entry['path'].name}")
+        self.evicted_bytes += reclaimed
+        return reclaimed
+
+    def sweep(self):
+        """정리 작업 1회 실행 (TTL 만료 → 용량 예산 순)"""
+        expired = self.expire() if self.ttl > 0 else 0
+        evicted = self.evict()
+        self.sweeps += 1
+        self.last_sweep = time.time()
+        if expired or evicted:
+            logger.info(f"클립 정리 완료: 만료 {expired / (1024 * 1024):.1f} MB, 용량 초과 {evicted / (1024 * 1024):.1f} MB 회수")
+        return expired + evicted
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / (self.hits + self.misses) if (self.hits + self.misses) else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "expirations": self.expirations,
+            "expired_bytes": self.expired_bytes,
+            "reclaimed_bytes": self.evicted_bytes + self.expired_bytes,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "sweeps": self.sweeps,
+            "last_sweep": datetime.fromtimestamp(self.last_sweep).isoformat() if self.last_sweep else None,
+        }
+
+
+clip_cache = ClipCache(clips_dir, CLIP_CACHE_MAX_BYTES, CLIP_CACHE_TTL_SECONDS)
+clip_janitor_task = None
+
+
+async def clip_janitor():
+    """클립 캐시 정리 백그라운드 작업 (주기 실행, 용량 초과 시 즉시 실행)"""
+    while True:
+        try:
+            await asyncio.wait_for(clip_cache.wakeup.wait(), CLIP_JANITOR_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        clip_cache.wakeup.clear()
+        try:
+            clip_cache.sweep()
+        except Exception as e:
+            logger.error(f"클립 정리 작업 실패: {e}", exc_info=True)
+
+        removed_files, clip_cache.removed_files = clip_cache.removed_files, []
+        if removed_files:
+            try:
+                delete_clip_records_by_files(removed_files)
+            except Exception as e:
+                logger.warning(f"삭제된 클립 기록 정리 실패: {e}")
+
+
+# ============================================================================
+# 클립 기록 (vss_clips): 사용자/동영상별 클립 조회·삭제용 인덱스
+# ============================================================================
+def clip_path_from_url(clip_url):
+    """클립 URL에서 호스트를 제외한 경로 (/clips/... 또는 /virtual-clips/...?start=&end=)"""
+    parsed = urlsplit(clip_url)
+    return parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+
+def _placeholders(values):
+    return ", ".join("?" for _ in values)
+
+
+def record_clips(user_id, video_db_id, clip_records):
+    """
+    생성된 클립을 vss_clips에 기록합니다.
+
+    Args:
+        clip_records: [(클립 dict, 클립 파일명 또는 None(가상 클립)), ...]
+    """
+    rows = [
+        (
+            user_id,
+            video_db_id,
+            clip["title"],
+            file_name,
+            clip_path_from_url(clip["url"]),
+            clip["start_time"],
+            clip["end_time"],
+            clip.get("search_query"),
+        )
+        for clip, file_name in clip_records
+    ]
+    if not rows:
+        return
+    cursor.executemany(
+        """INSERT INTO vss_clips
+           (USER_ID, VIDEO_DB_ID, TITLE, FILE_NAME, CLIP_PATH, START_TIME, END_TIME, SEARCH_QUERY)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+           ON DUPLICATE KEY UPDATE
+           SEARCH_QUERY = VALUES(SEARCH_QUERY),
+           UPDATED_AT = CURRENT_TIMESTAMP""",
+        rows
+    )
+
+
+def delete_clip_records(where, params):
+    """조건에 맞는 클립 기록을 삭제하고 해당 클립 파일명 목록을 반환"""
+    cursor.execute(f"SELECT FILE_NAME FROM vss_clips WHERE {where} AND FILE_NAME IS NOT NULL", params)
+    file_names = [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"DELETE FROM vss_clips WHERE {where}", params)
+    return file_names, cursor.rowcount
+
+
+def delete_clip_records_by_files(file_names):
+    """정리 작업으로 삭제된 클립 파일의 기록 제거"""
+    file_names = list(dict.fromkeys(file_names))
+    cursor.execute(f"DELETE FROM vss_clips WHERE FILE_NAME IN ({_placeholders(file_names)})", file_names)
+    return cursor.rowcount
+
+
+def remove_unreferenced_clip_files(file_names):
+    """다른 기록이 참조하지 않는 클립 파일만 삭제 (같은 내용의 클립은 캐시 파일을 공유)"""
+    file_names = sorted({Path(name).name for name in file_names if name})
+    if not file_names:
+        return 0
+    cursor.execute(
+        f"SELECT DISTINCT FILE_NAME FROM vss_clips WHERE FILE_NAME IN ({_placeholders(file_names)})",
+        file_names
+    )
+    referenced = {row[0] for row in cursor.fetchall()}
+
+    deleted = 0
+    for file_name in file_names:
+        if file_name in referenced:
+            continue
+        clip_file = clips_dir / file_name
+        try:
+            clip_file.unlink()
+            deleted += 1
+            logger.info(f"클립 파일 삭제 성공: {file_name}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"클립 파일 삭제 중 파일 시스템 오류: {file_name}, 오류: {e}")
+        clip_cache.discard_path(clip_file)
+    return deleted
+
+# ============================================================================
+# 미리보기 (포스터 / 탐색용 스프라이트 시트)
+# ============================================================================
+# 목록 화면이 MP4 전체를 내려받지 않도록 동영상/클립마다 포스터 한 장과
+# 스프라이트 시트를 만들어 원본 옆의 .previews 디렉토리에 저장합니다.
+# 둘 다 키프레임만 디코딩하는 FFmpeg 1회 실행으로 생성합니다.
+PREVIEW_DIR_NAME = ".previews"
+PREVIEW_POSTER_WIDTH = 640
+PREVIEW_THUMB_WIDTH = 160
+PREVIEW_THUMB_HEIGHT = 90
+PREVIEW_SPRITE_COLUMNS = 10
+PREVIEW_SPRITE_MAX_TILES = 100
+PREVIEW_MIN_INTERVAL = 1.0
+# 미디어 파일명이 고유하므로(타임스탬프/내용 해시) 미리보기는 변하지 않음
+PREVIEW_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PREVIEW_ASSETS = {
+    "poster.jpg": ("poster", "image/jpeg"),
+    "sprite.jpg": ("sprite", "image/jpeg"),
+    "sprite.json": ("sprite_meta", "application/json"),
+}
+# 미리보기/포스터 생성 전용 풀 (목록 화면의 포스터 요청이 클립 인코딩 대기열을 채우지 않도록 분리)
+PREVIEW_ENCODER_WORKERS = int(os.getenv("PREVIEW_ENCODER_WORKERS", "1"))
+PREVIEW_ENCODER_QUEUE_DEPTH = int(os.getenv("PREVIEW_ENCODER_QUEUE_DEPTH", "256"))
+preview_encoder_pool = ClipEncoderPool(
+    PREVIEW_ENCODER_WORKERS,
+    PREVIEW_ENCODER_QUEUE_DEPTH,
+    thread_name_prefix="preview-encoder",
+    busy_detail="미리보기 생성 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.",
+)
+preview_media_dirs = {"videos": videos_dir, "clips": clips_dir}
+preview_inflight = {}
+
+
+def _preview_paths(media_path):
+    media_path = Path(media_path)
+    preview_dir = media_path.parent / PREVIEW_DIR_NAME
+    return {
+        "poster": preview_dir / f"{media_path.name}.poster.jpg",
+        "sprite": preview_dir / f"{media_path.name}.sprite.jpg",
+        "sprite_meta": preview_dir / f"{media_path.name}.sprite.json",
+    }
+
+
+def previews_ready(media_path):
+    """미리보기가 모두 있고 생성 당시의 원본(크기·수정 시간)과 같은 파일인지 확인"""
+    paths = _preview_paths(media_path)
+    try:
+        stat = os.stat(media_path)
+        if not all(path.exists() for path in paths.values()):
+            return False
+        with open(paths["sprite_meta"], "r", encoding="utf-8") as f:
+            source = json.load(f).get("source") or {}
+    except (OSError, ValueError):
+        return False
+    return source.get("size") == stat.st_size and source.get("mtime_ns") == stat.st_mtime_ns
+
+
+def generate_previews(media_path, duration=None):
+    """
+    포스터와 스프라이트 시트를 한 번의 디코딩으로 생성합니다. (미리보기 풀 스레드에서 실행)
+
+    Returns:
+        dict: 스프라이트 메타데이터 (타일 간격, 행/열 수, 타일 크기)
+    """
+    media_path = str(media_path)
+    paths = _preview_paths(media_path)
+    paths["poster"].parent.mkdir(exist_ok=True)
+    # 원본 교체 여부 판단용 (previews_ready에서 비교)
+    source_stat = os.stat(media_path)
+    if duration is None:
+        duration = probe_media_info(media_path)["duration"]
+
+    interval = max(duration / PREVIEW_SPRITE_MAX_TILES, PREVIEW_MIN_INTERVAL)
+    count = max(1, min(PREVIEW_SPRITE_MAX_TILES, math.ceil(duration / interval)))
+    columns = min(PREVIEW_SPRITE_COLUMNS, count)
+    rows = math.ceil(count / columns)
+
+    w, h = PREVIEW_THUMB_WIDTH, PREVIEW_THUMB_HEIGHT
+    filter_graph = (
+        f"[0:v]split=2[p][s];"
+        f"[p]scale='min({PREVIEW_POSTER_WIDTH},iw)':-2[poster];"
+        f"[s]fps=1/{interval:.3f},"
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+        f"tile={columns}x{rows}[sprite]"
+    )
+    partial_poster = paths["poster"].with_name(f".{paths['poster'].stem}.partial.jpg")
+    partial_sprite = paths["sprite"].with_name(f".{paths['sprite'].stem}.partial.jpg")
+    try:
+        _run_media_command([
+            FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+            "-skip_frame", "nokey",  # 키프레임만 디코딩
+            "-i", media_path,
+            "-filter_complex", filter_graph,
+            "-map", "[poster]", "-frames:v", "1", "-q:v", "3", str(partial_poster),
+            "-map", "[sprite]", "-frames:v", "1", "-q:v", "5", str(partial_sprite),
+        ])
+        os.replace(partial_poster, paths["poster"])
+        os.replace(partial_sprite, paths["sprite"])
+    finally:
+        for partial_path in (partial_poster, partial_sprite):
+            try:
+                partial_path.unlink()
+            except OSError:
+                pass
+
+    meta = {
+        "interval": interval,
+        "count": count,
+        "columns": columns,
+        "rows": rows,
+        "thumb_width": w,
+        "thumb_height": h,
+        "duration": duration,
+        "source": {"size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns},
+    }
+    tmp_meta_path = paths["sprite_meta"].with_suffix(".json.tmp")
+    with open(tmp_meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta_path, paths["sprite_meta"])
+    return meta
+
+
+async def ensure_previews(media_path, duration=None):
+    """미리보기가 없으면 미리보기 풀에서 생성 (같은 파일에 대한 동시 요청은 한 번만 생성)"""
+    media_path = str(media_path)
+    if previews_ready(media_path):
+        return _preview_paths(media_path)
+    task = preview_inflight.get(media_path)
+    if task is None:
+        task = asyncio.create_task(preview_encoder_pool.submit(generate_previews, media_path, duration))
+        preview_inflight[media_path] = task
+        task.add_done_callback(lambda _: preview_inflight.pop(media_path, None))
+    await asyncio.shield(task)
+    return _preview_paths(media_path)
+
+
+async def build_video_previews(file_path):
+    """동영상 업로드 후 백그라운드에서 미리보기 생성"""
+    try:
+        await ensure_previews(file_path)
+        logger.info(f"미리보기 생성 완료: {Path(file_path).name}")
+    except Exception as e:
+        logger.warning(f"미리보기 생성 실패 ({file_path}): {e}")
+
+
+def remove_previews(media_path):
+    """원본 삭제 시 미리보기 파일 제거 (가상 클립 포스터 포함)"""
+    media_path = Path(media_path)
+    preview_dir = media_path.parent / PREVIEW_DIR_NAME
+    if not preview_dir.is_dir():
+        return
+    prefix = f"{media_path.name}."
+    for path in preview_dir.iterdir():
+        if not path.name.startswith(prefix):
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"미리보기 삭제 실패 {path}: {e}")
+
+
+def preview_urls(base_url, media_type, media_name):
+    """미리보기 URL (포스터, 스프라이트, 스프라이트 메타데이터)"""
+    prefix = f"{base_url}/previews/{media_type}/{quote(media_name)}"
+    return {
+        "poster_url": f"{prefix}/poster.jpg",
+        "sprite_url": f"{prefix}/sprite.jpg",
+        "sprite_meta_url": f"{prefix}/sprite.json",
+    }
+
+# ============================================================================
+# 가상 클립 (원본에서 바로 스트리밍)
+# ============================================================================
+# 저장된 동영상(videos_dir)의 클립은 파일로 만들지 않고 (원본, 시작, 끝)을 URL에 담아
+# 요청 시 키프레임 경계부터 스트림 복사한 fragmented MP4로 전송합니다.
+# 다운로드(?download=1)할 때만 클립 캐시에 실제 파일을 만듭니다.
+CLIP_DELIVERY_MODE = os.getenv("CLIP_DELIVERY_MODE", "virtual").lower()  # "virtual" 또는 "file"
+VIRTUAL_CLIP_MAX_STREAMS = int(os.getenv("VIRTUAL_CLIP_MAX_STREAMS", "16"))
+VIRTUAL_CLIP_CHUNK_SIZE = 256 * 1024
+# 가상 클립 포스터 시각 간격 (초): 임의의 at 값마다 파일이 생기지 않도록 이 간격으로 맞춤
+VIRTUAL_POSTER_GRID_SECONDS = max(0.1, float(os.getenv("VIRTUAL_POSTER_GRID_SECONDS", "1")))
+virtual_clip_streams = 0
+
+
+def is_virtual_clip_source(video_path):
+    """가상 클립으로 제공할 수 있는 원본인지 확인 (./tmp 업로드 파일은 덮어써질 수 있어 제외)"""
+    if CLIP_DELIVERY_MODE != "virtual":
+        return False
+    try:
+        return Path(video_path).resolve().parent == videos_dir.resolve()
+    except OSError:
+        return False
+
+
+def virtual_clip_urls(base_url, media_name, start_time, end_time):
+    """가상 클립 재생/다운로드/포스터 URL"""
+    url = f"{base_url}/virtual-clips/{quote(media_name)}?start={start_time:.3f}&end={end_time:.3f}"
+    return {
+        "url": url,
+        "download_url": f"{url}&download=1",
+        "poster_url": f"{base_url}/virtual-clips/{quote(media_name)}/poster.jpg?at={start_time:.3f}&start={start_time:.3f}&end={end_time:.3f}",
+    }
+
+
+def _resolve_virtual_clip_source(media_name):
+    if Path(media_name).name != media_name or media_name.startswith("."):
+        raise HTTPException(status_code=400, detail="잘못된 파일명입니다.")
+    video_path = videos_dir / media_name
+    if not video_path.is_file():
+        raise HTTPException(status_code=404, detail="동영상 파일을 찾을 수 없습니다.")
+    return video_path
+
+
+def _reserve_virtual_clip_stream():
+    """
+    재생 스트림 자리 하나를 예약합니다. (가득 찼으면 503)
+
+    Returns:
+        반납 함수 (여러 번 호출해도 한 번만 반납)
+    """
+    global virtual_clip_streams
+    if virtual_clip_streams >= VIRTUAL_CLIP_MAX_STREAMS:
+        raise HTTPException(
+            status_code=503,
+            detail="재생 중인 클립이 너무 많습니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": "5"},
+        )
+    virtual_clip_streams += 1
+    released = False
+
+    def release():
+        global virtual_clip_streams
+        nonlocal released
+        if not released:
+            released = True
+            virtual_clip_streams -= 1
+
+    return release
+
+
+async def _stream_virtual_clip(video_path, start_time, end_time, release):
+    """원본의 [start, end] 구간을 스트림 복사하여 fragmented MP4로 전송 (끝나면 예약한 자리 반납)"""
+    process = None
+    try:
+        process = await asyncio.create_subprocess_exec(
+            FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+            "-ss", f"{start_time:.3f}",  # 시작점은 키프레임이므로 입력 탐색으로 정확히 맞음
+            "-i", str(video_path),
+            "-t", f"{end_time - start_time:.3f}",
+            # 다운로드용 클립 파일(_stream_copy_args)과 같이 영상 트랙만 전송
+            "-map", "0:v:0", "-c", "copy", "-an",
+            "-avoid_negative_ts", "make_zero",
+            "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+            "-f", "mp4", "pipe:1",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        while True:
+            chunk = await process.stdout.read(VIRTUAL_CLIP_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        await process.wait()
+    finally:
+        # 클라이언트가 중간에 끊으면 FFmpeg 종료
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+        release()
+
+
+async def materialize_virtual_clip(video_path, start_time, end_time):
+    """가상 클립을 클립 캐시에 실제 파일로 생성 (다운로드용)"""
+    video_path = str(video_path)
+    keyframes = []
+    try:
+        media_info = await asyncio.to_thread(probe_media_info, video_path)
+        keyframes = await asyncio.to_thread(probe_keyframes, video_path, [(start_time, end_time)])
+    except Exception as e:
+        logger.warning(f"가상 클립 원본 조회 실패 ({video_path}): {e}")
+        raise HTTPException(status_code=500, detail=f"동영상 정보를 조회할 수 없습니다: {str(e)}")
+
+    content_hash = await asyncio.to_thread(file_content_hash, video_path)
+    key = ClipCache.make_key(content_hash, start_time, end_time, CLIP_EXTRACT_MODE)
+
+    async def _create(output_path):
+        return await clip_encoder_pool.submit(
+            extract_clip,
+            video_path,
+            output_path,
+            start_time,
+            end_time,
+            keyframes,
+            media_info["duration"],
+            codec=media_info["codec"],
+        )
+
+    return await clip_cache.get_or_create(key, _create)
+
+
+def snap_virtual_poster_time(at, start=None, end=None, duration=None):
+    """포스터 시각을 클립 구간·동영상 길이 안으로 제한하고 VIRTUAL_POSTER_GRID_SECONDS 간격에 맞춤"""
+    if start is not None:
+        at = max(at, start)
+    if end is not None:
+        at = min(at, end)
+    if duration is not None:
+        at = min(at, max(duration - VIRTUAL_POSTER_GRID_SECONDS, 0.0))
+    return math.floor(max(at, 0.0) / VIRTUAL_POSTER_GRID_SECONDS) * VIRTUAL_POSTER_GRID_SECONDS
+
+
+def _virtual_poster_path(video_path, at):
+    return _preview_paths(video_path)["poster"].with_name(f"{Path(video_path).name}.{int(round(at * 1000))}.poster.jpg")
+
+
+def generate_virtual_poster(video_path, at):
+    """가상 클립 시작 키프레임 한 장만 디코딩하여 포스터 생성"""
+    poster_path = _virtual_poster_path(video_path, at)
+    poster_path.parent.mkdir(exist_ok=True)
+    partial_path = poster_path.with_name(f".{poster_path.stem}.partial.jpg")
+    try:
+        _run_media_command([
+            FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{at:.3f}", "-skip_frame", "nokey",
+            "-i", str(video_path),
+            "-frames:v", "1",
+            "-vf", f"scale='min({PREVIEW_POSTER_WIDTH},iw)':-2",
+            "-q:v", "3",
+            str(partial_path),
+        ])
+        os.replace(partial_path, poster_path)
+    finally:
+        try:
+            partial_path.unlink()
+        except OSError:
+            pass
+    return poster_path
+
+
+# ============================================================================
+# 요청/응답 모델 정의
+# ============================================================================
+class RecommendedChunkSizeRequest(BaseModel):
+    video_length: float
+
+# ============================================================================
+# 헬스체크 엔드포인트 (Railway 헬스체크용)
+# ============================================================================
+@app.get("/")
+async def root():
+    """루트 엔드포인트 - Railway 헬스체크용"""
+    return {"status": "ok", "message": "VSS API is running"}
+
+@app.get("/health")
+async def health_check():
+    """헬스체크 엔드포인트"""
+    try:
+        # 데이터베이스 연결 확인
+        test_conn = db_pool.get_connection(timeout=2)
+        test_conn.ping()
+        db_pool.return_connection(test_conn)
+        db_status = "connected"
+    except Exception as e:
+        db_status = f"disconnected: {str(e)}"
+    
+    return {
+        "status": "ok",
+        "database": db_status,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/via-model")
+async def via_model_stats():
+    """VIA 모델 레지스트리 상태 조회"""
+    return via_model_registry.stats()
+
+@app.get("/via-admission")
+async def via_admission_stats():
+    """VIA summarize/query 실행 수 및 대기열 상태 조회"""
+    return via_admission.stats()
+
+@app.get("/via-inflight")
+async def via_inflight_stats():
+    """진행 중인 VIA 호출 및 동일 요청 합치기 현황 조회"""
+    return via_inflight.stats()
+
+@app.get("/upstreams")
+async def upstream_stats():
+    """VIA / Ollama 서킷 브레이커 상태 조회"""
+    return {"via": via_breaker.stats(), "ollama": ollama_breaker.stats()}
+
+@app.get("/http-pools")
+async def http_pools_stats():
+    """업스트림별 HTTP 연결 풀 설정 및 포화 지표 조회"""
+    return http_pool_stats()
+
+@app.get("/chunk-size-advisor")
+async def chunk_size_advisor_stats():
+    """추천 chunk_size 캐시 및 구간당 처리 시간 추정 모델 상태 조회"""
+    return chunk_size_advisor.stats()
+
+@app.get("/clip-cache/stats")
+async def clip_cache_stats():
+    """클립 캐시 적중/미적중 및 사용량 조회"""
+    return clip_cache.stats()
+
+@app.get("/previews/{media_type}/{media_name}/{asset}")
+async def get_preview(media_type: str, media_name: str, asset: str):
+    """
+    동영상/클립 미리보기 (poster.jpg, sprite.jpg, sprite.json)
+    없으면 처음 요청될 때 생성하며, 장기 캐시 헤더와 함께 반환합니다.
+    """
+    media_dir = preview_media_dirs.get(media_type)
+    if media_dir is None or asset not in PREVIEW_ASSETS:
+        raise HTTPException(status_code=404, detail="미리보기를 찾을 수 없습니다.")
+    if Path(media_name).name != media_name or media_name.startswith("."):
+        raise HTTPException(status_code=400, detail="잘못된 파일명입니다.")
+    media_path = media_dir / media_name
+    if not media_path.is_file():
+        raise HTTPException(status_code=404, detail="미디어 파일을 찾을 수 없습니다.")
+
+    try:
+        paths = await ensure_previews(media_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"미리보기 생성 실패 ({media_path}): {e}")
+        raise HTTPException(status_code=500, detail=f"미리보기 생성 중 오류가 발생했습니다: {str(e)}")
+
+    path_key, media_type_header = PREVIEW_ASSETS[asset]
+    return FileResponse(
+        paths[path_key],
+        media_type=media_type_header,
+        headers={"Cache-Control": PREVIEW_CACHE_CONTROL},
+    )
+
+@app.get("/virtual-clips/{media_name}")
+async def get_virtual_clip(
+    media_name: str,
+    start: float = Query(..., ge=0),
+    end: float = Query(..., gt=0),
+    download: bool = Query(False)
+):
+    """
+    가상 클립 재생 (원본에서 fragmented MP4로 스트리밍)
+
+    download=1일 때만 클립 파일을 생성(캐시)하여 첨부 파일로 반환합니다.
+    재생 스트림은 바이트 구간을 지원하지 않으므로 Range 헤더(<video>의 bytes=0- 등)는
+    무시하고 Accept-Ranges: none과 함께 전체 스트림을 200으로 보냅니다.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="끝 시간은 시작 시간보다 커야 합니다.")
+    video_path = _resolve_virtual_clip_source(media_name)
+    clip_name = f"clip_{video_path.stem}_{start:.3f}-{end:.3f}.mp4"
+
+    if download:
+        try:
+            entry = await materialize_virtual_clip(video_path, start, end)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"가상 클립 생성 실패 ({media_name} {start}-{end}): {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"클립 생성 중 오류가 발생했습니다: {str(e)}")
+        return FileResponse(entry["path"], media_type="video/mp4", filename=clip_name)
 
-            # video_ids에서 내부 DB ID 가져오기 (VIA 서버의 video_id로 변환 필요)
-            video_id = None
-            db_internal_id = None
-            if user_id and video_id_map:
-                # 파일명으로 내부 DB ID 찾기
-                db_internal_id = video_id_map.get(file_path) or video_id_map.get(upfile.filename)
-                if db_internal_id:
-                    try:
-                        # 내부 DB ID로 vss_videos 테이블에서 VIDEO_ID (VIA 서버의 video_id) 조회
-                        cursor.execute(
-                            "SELECT VIDEO_ID FROM vss_videos WHERE ID = ? AND USER_ID = ?",
-                            (db_internal_id, user_id)
-                        )
-                        video_row = cursor.fetchone()
-                        if video_row and video_row[0]:
-                            video_id = video_row[0]  # VIA 서버의 video_id
-                            logger.info(f"video_ids에서 내부 DB ID {db_internal_id}로 VIDEO_ID {video_id} 조회 성공 (파일명: {file_path})")
-                        else:
-                            logger.warning(f"내부 DB ID {db_internal_id}에 해당하는 VIDEO_ID를 찾을 수 없습니다.")
-                    except Exception as e:
-                        logger.warning(f"VIDEO_ID 조회 중 오류: {e}")
-            
-            # video_id가 없으면 VIA 서버에 업로드하여 video_id 얻기
-            if not video_id:
-                try:
-                    video_id = await vss_client.upload_video(tmp_path)
-                    logger.info(f"VIA 서버에 업로드하여 video_id 획득: {video_id}")
-                except aiohttp.ClientError as e:
-                    logger.error(f"VIA 서버 업로드 연결 오류: {e}")
-                    raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
-                except Exception as e:
-                    logger.error(f"VIA 서버 업로드 실패: {e}")
-                    raise HTTPException(status_code=500, detail=f"VIA 서버에 파일 업로드 중 오류가 발생했습니다: {str(e)}")
+    # 응답을 반환하기 전에 자리를 예약해야 동시 요청이 상한을 넘지 않음
+    # (스트림이 시작되지 못하고 끝난 경우는 응답 후 백그라운드 작업이 반납)
+    release = _reserve_virtual_clip_stream()
+    return StreamingResponse(
+        _stream_virtual_clip(video_path, start, end, release),
+        media_type="video/mp4",
+        headers={
+            "Accept-Ranges": "none",
+            "Cache-Control": "no-cache",
+            "Content-Disposition": f"inline; filename=\"{clip_name}\"",
+        },
+        background=BackgroundTask(release),
+    )
+
+@app.get("/virtual-clips/{media_name}/poster.jpg")
+async def get_virtual_clip_poster(
+    media_name: str,
+    at: float = Query(0.0, ge=0),
+    start: Optional[float] = Query(None, ge=0),
+    end: Optional[float] = Query(None, gt=0),
+):
+    """
+    가상 클립 포스터 (시작 키프레임 한 장)
+
+    at은 클립 구간(start~end)과 동영상 길이 안으로 제한하고 일정 간격에 맞추므로
+    동영상당 포스터 파일 수는 길이 / VIRTUAL_POSTER_GRID_SECONDS를 넘지 않습니다.
+    """
+    video_path = _resolve_virtual_clip_source(media_name)
+    at = snap_virtual_poster_time(at, start, end)
+    poster_path = _virtual_poster_path(video_path, at)
+    if not poster_path.exists():
+        try:
+            duration = (await asyncio.to_thread(probe_media_info, str(video_path)))["duration"]
+            at = snap_virtual_poster_time(at, duration=duration)
+            poster_path = _virtual_poster_path(video_path, at)
+            if not poster_path.exists():
+                poster_path = await preview_encoder_pool.submit(generate_virtual_poster, video_path, at)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"가상 클립 포스터 생성 실패 ({media_name} @ {at}): {e}")
+            raise HTTPException(status_code=500, detail=f"미리보기 생성 중 오류가 발생했습니다: {str(e)}")
+    return FileResponse(poster_path, media_type="image/jpeg", headers={"Cache-Control": PREVIEW_CACHE_CONTROL})
+
+@app.post("/get-recommended-chunk-size")
+async def get_recommended_chunk_size_endpoint(request: RecommendedChunkSizeRequest):
+    """
+    동영상 길이를 받아서 추천 chunk_size를 반환하는 엔드포인트
+    """
+    try:
+        # 입력 검증
+        if request.video_length <= 0:
+            raise HTTPException(status_code=400, detail="동영상 길이는 0보다 커야 합니다.")
+        if request.video_length > 86400:  # 24시간 초과
+            raise HTTPException(status_code=400, detail="동영상 길이는 24시간(86400초)을 초과할 수 없습니다.")
+        
+        recommended_chunk_size = await get_recommended_chunk_size(request.video_length)
+        return {"recommended_chunk_size": recommended_chunk_size, "video_length": request.video_length}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"입력 값 오류: {e}")
+        raise HTTPException(status_code=400, detail=f"잘못된 입력 값입니다: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error getting recommended chunk size: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"추천 chunk size 조회 중 오류가 발생했습니다: {str(e)}")
+
+# VIA 파일 삭제 동시 요청 수 (via_api 풀의 호스트당 연결 수 안에서 사용)
+VIA_DELETE_CONCURRENCY = int(os.getenv("VIA_DELETE_CONCURRENCY", "8"))
+
+
+async def remove_all_media(session: aiohttp.ClientSession, media_ids, concurrency=VIA_DELETE_CONCURRENCY):
+    """
+    VIA 서버에서 여러 미디어 파일을 동시에(최대 concurrency개) 삭제하는 함수
+    vss-summarize.py의 remove_all_media 함수를 참고하여 구현
+
+    Returns:
+        list: 미디어 ID별 결과 [{"media_id", "status": deleted | not_found | failed, "http_status", "error"}, ...]
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
 
-            video_clips = []
-            video = None
-            # MoviePy에 파일 경로(문자열)로 전달
+    async def remove(media_id):
+        async def delete():
+            async with session.delete(VIA_SERVER_URL + "/files/" + media_id, timeout=VIA_TIMEOUTS["delete_file"]) as resp:
+                if resp.status in UPSTREAM_FAILURE_STATUSES:
+                    raise HTTPException(status_code=resp.status, detail=f"VIA 파일 삭제 실패: {media_id}")
+                return resp.status
+
+        result = {"media_id": media_id, "status": "deleted", "http_status": None, "error": None}
+        async with semaphore:
             try:
-                if not os.path.exists(tmp_path):
-                    raise HTTPException(status_code=404, detail=f"임시 파일을 찾을 수 없습니다: {tmp_path}")
-                
-                video = VideoFileClip(tmp_path)
-                duration = video.duration or 0
-                if duration <= 0:
-                    raise HTTPException(status_code=400, detail="동영상 길이가 유효하지 않습니다.")
-                logger.info(f"Video duration: {duration} seconds for {tmp_path}")
-            except FileNotFoundError as e:
-                logger.error(f"동영상 파일을 찾을 수 없음: {tmp_path}, 오류: {e}")
-                raise HTTPException(status_code=404, detail=f"동영상 파일을 찾을 수 없습니다: {str(e)}")
+                # 삭제는 멱등이므로 일시적 오류는 재시도
+                status = await call_upstream(via_breaker, "delete_file", delete, retries=2)
             except Exception as e:
-                logger.error(f"동영상 파일 로드 실패: {tmp_path}, 오류: {e}")
-                raise HTTPException(status_code=500, detail=f"동영상 파일을 로드할 수 없습니다: {str(e)}")
-            
-            # chunk_duration 계산: 동영상 길이의 1/10을 가장 가까운 값으로 반올림
+                logger.error(f"Error deleting media {media_id}: {e}")
+                result.update(status="failed", http_status=getattr(e, "status_code", None), error=str(getattr(e, "detail", e)))
+                return result
+        result["http_status"] = status
+        if status == 404:
+            # 이미 삭제된 파일
+            result["status"] = "not_found"
+        elif status >= 400:
+            logger.warning(f"Failed to delete media {media_id}: HTTP {status}")
+            result.update(status="failed", error=f"HTTP {status}")
+        else:
+            logger.info(f"Successfully deleted media {media_id}")
+        return result
+
+    return await asyncio.gather(*(remove(media_id) for media_id in dict.fromkeys(media_ids)))
+
+
+def summarize_media_removal(results):
+    """미디어 삭제 결과 집계 후 삭제(또는 이미 없던) 파일은 중복 제거 맵에서 제거"""
+    counts = {"total": len(results), "deleted": 0, "not_found": 0, "failed": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    forget_via_file_ids([result["media_id"] for result in results if result["status"] != "failed"])
+    return counts
+
+
+media_removal_jobs = {}
+
+
+async def _run_media_removal_job(job, media_ids):
+    job.status = "running"
+    job.emit("started", total=len(media_ids))
+    try:
+        results = await remove_all_media(await get_session(), media_ids)
+        job.result = {"counts": summarize_media_removal(results), "results": results}
+        job.status = "completed"
+        job.finished_at = time.time()
+        job.emit("completed", **job.result["counts"])
+    except Exception as e:
+        logger.error(f"미디어 삭제 작업 실패 ({job.job_id}): {e}", exc_info=True)
+        job.status = "failed"
+        job.error = {"status_code": 500, "detail": f"미디어 삭제 중 오류가 발생했습니다: {str(e)}"}
+        job.finished_at = time.time()
+        job.emit("failed", **job.error)
+
+
+class RemoveMediaRequest(BaseModel):
+    media_ids: List[str]
+    background: bool = False  # True면 작업으로 등록하고 즉시 job_id 반환 (정리 작업용)
+
+@app.post("/remove-media")
+async def remove_media_endpoint(request: RemoveMediaRequest):
+    """
+    VIA 서버에서 미디어 파일들을 삭제하는 엔드포인트 (미디어 ID별 결과 반환)
+    """
+    try:
+        # 입력 검증
+        if not request.media_ids or len(request.media_ids) == 0:
+            raise HTTPException(status_code=400, detail="삭제할 미디어 ID 목록이 필요합니다.")
+        
+        # 중복 제거로 다른 동영상 기록과 공유 중인 VIA 파일은 삭제하지 않음
+        shared_ids = set()
+        try:
+            cursor.execute(
+                f"""SELECT VIDEO_ID FROM vss_videos
+                    WHERE VIDEO_ID IN ({", ".join("?" for _ in request.media_ids)})
+                    GROUP BY VIDEO_ID HAVING COUNT(*) > 1""",
+                request.media_ids
+            )
+            shared_ids = {row[0] for row in cursor.fetchall()}
+        except mariadb.Error as e:
+            logger.warning(f"공유 중인 VIA 파일 확인 중 데이터베이스 오류: {e}")
+        media_ids = [media_id for media_id in dict.fromkeys(request.media_ids) if media_id not in shared_ids]
+        if shared_ids:
+            logger.info(f"다른 동영상이 사용 중인 VIA 파일은 유지합니다: {sorted(shared_ids)}")
+
+        if request.background:
+            _purge_clip_jobs(media_removal_jobs)
+            job = ClipJob(uuid.uuid4().hex)
+            media_removal_jobs[job.job_id] = job
+            job.emit("queued", total=len(media_ids))
+            job.task = asyncio.create_task(_run_media_removal_job(job, media_ids))
+            logger.info(f"미디어 삭제 작업 등록: {job.job_id} ({len(media_ids)}개)")
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "success": True,
+                    "job_id": job.job_id,
+                    "status": job.status,
+                    "status_url": f"/remove-media/jobs/{job.job_id}",
+                    "skipped_shared": sorted(shared_ids),
+                },
+            )
+
+        session = await get_session()
+        results = await remove_all_media(session, media_ids)
+        counts = summarize_media_removal(results)
+        return {
+            "success": counts["failed"] == 0,
+            "message": f"Deleted {counts['deleted']} media file(s)",
+            "counts": counts,
+            "results": results,
+            "skipped_shared": sorted(shared_ids)
+        }
+    except HTTPException:
+        raise
+    except aiohttp.ClientError as e:
+        logger.error(f"VIA 서버 연결 오류: {e}")
+        raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error removing media: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"미디어 삭제 중 오류가 발생했습니다: {str(e)}")
+
+
+@app.get("/remove-media/jobs/{job_id}")
+async def get_media_removal_job(job_id: str):
+    """
+    미디어 삭제 작업 상태 조회 (완료 시 counts / results 포함)
+    """
+    return _get_clip_job(job_id, media_removal_jobs).to_dict()
+
+async def _save_clip_uploads(files):
+    """
+    업로드된 파일들을 ./tmp에 저장합니다.
+
+    Returns:
+        List[tuple]: [(파일명, 임시 파일 경로, 원본 파일명), ...]
+    """
+    # 임시 디렉토리 생성
+    try:
+        os.makedirs("./tmp", exist_ok=True)
+    except OSError as e:
+        logger.error(f"임시 디렉토리 생성 실패: {e}")
+        raise HTTPException(status_code=500, detail="임시 디렉토리를 생성할 수 없습니다.")
+
+    def _save_upload(source, path):
+        # 저장하면서 내용 해시를 함께 계산 (클립 캐시 키용, 파일을 다시 읽지 않음)
+        sha256 = hashlib.sha256()
+        with open(path, "wb") as buffer:
+            for chunk in iter(lambda: source.read(8 * 1024 * 1024), b""):
+                sha256.update(chunk)
+                buffer.write(chunk)
+        remember_file_content_hash(path, sha256.hexdigest())
+
+    sources = []
+    for upfile in files:
+        file_path = os.path.basename(upfile.filename)
+        tmp_path = f"./tmp/{file_path}"
+        # 업로드용 임시 파일 실제 저장 (기존 누락으로 인해 FileNotFoundError / 빈 처리 발생 가능)
+        try:
+            await asyncio.to_thread(_save_upload, upfile.file, tmp_path)
+        except OSError as e:
+            logger.error(f"임시 파일 저장 실패: {tmp_path}, 오류: {e}")
+            raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
+        except Exception as e:
+            logger.error(f"파일 저장 중 예상치 못한 오류: {e}")
+            raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
+        logger.info(f"Uploaded video saved to {tmp_path}")
+        sources.append((file_path, tmp_path, upfile.filename))
+    return sources
+
+
+def _parse_generate_clips_form(prompt, user_id, video_ids):
+    """generate-clips 폼 입력 검증 후 (prompt, video_id_map) 반환"""
+    if not prompt or not prompt.strip():
+        raise HTTPException(status_code=400, detail="검색어(prompt)를 입력해주세요.")
+
+    # 클립 저장 디렉토리 생성
+    try:
+        os.makedirs("./clips", exist_ok=True)
+    except OSError as e:
+        logger.error(f"클립 디렉토리 생성 실패: {e}")
+        raise HTTPException(status_code=500, detail="클립 저장 디렉토리를 생성할 수 없습니다.")
+
+    # video_ids 파싱 (JSON 문자열): [내부 DB ID, ...] 또는 기존 {"파일명": 내부 DB ID} 형식
+    video_id_map = {}
+    if video_ids and user_id:
+        try:
+            video_id_map = json.loads(video_ids) if isinstance(video_ids, str) else video_ids
+        except:
+            video_id_map = {}
+    return prompt.strip(), video_id_map
+
+
+def _resolve_stored_videos(db_ids, user_id):
+    """
+    vss_videos.ID 목록으로 서버에 저장된 동영상 파일을 직접 찾습니다.
+
+    Returns:
+        tuple: ([(파일명, 저장 경로, 원본 파일명), ...], {파일명: 내부 DB ID})
+    """
+    try:
+        db_ids = list(dict.fromkeys(int(db_id) for db_id in db_ids))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="video_ids는 동영상 ID 목록이어야 합니다.")
+    if not db_ids:
+        raise HTTPException(status_code=400, detail="No file provided")
+
+    placeholders = ", ".join("?" for _ in db_ids)
+    try:
+        cursor.execute(
+            f"SELECT ID, FILE_NAME, FILE_PATH FROM vss_videos WHERE USER_ID = ? AND ID IN ({placeholders})",
+            (user_id, *db_ids)
+        )
+        rows = {row[0]: row for row in cursor.fetchall()}
+    except mariadb.Error as e:
+        logger.error(f"동영상 조회 중 데이터베이스 오류: {e}")
+        raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
+
+    missing = [db_id for db_id in db_ids if db_id not in rows]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"동영상을 찾을 수 없습니다: {missing}")
+
+    sources = []
+    video_id_map = {}
+    for db_id in db_ids:
+        _, file_name, stored_path = rows[db_id]
+        # FILE_PATH는 videos_dir 아래 파일이므로 파일명만 사용 (경로 조작 방지)
+        file_path = Path(stored_path).name
+        video_path = videos_dir / file_path
+        if not video_path.exists():
+            raise HTTPException(status_code=404, detail=f"동영상 파일을 찾을 수 없습니다: {file_name}")
+        sources.append((file_path, str(video_path), file_name))
+        video_id_map[file_path] = db_id
+    return sources, video_id_map
+
+
+async def _prepare_clip_sources(files, user_id, video_id_map):
+    """
+    generate-clips 입력 동영상 준비
+
+    업로드 파일이 없으면 video_ids(vss_videos.ID)로 저장된 동영상을 그대로 사용하고,
+    파일이 함께 온 경우(기존 클라이언트)에는 ./tmp에 저장해 사용합니다.
+    """
+    if files:
+        sources = await _save_clip_uploads(files)
+        return sources, video_id_map if isinstance(video_id_map, dict) else {}
+    if user_id and video_id_map:
+        db_ids = list(video_id_map.values()) if isinstance(video_id_map, dict) else video_id_map
+        if not isinstance(db_ids, list):
+            db_ids = [db_ids]
+        return _resolve_stored_videos(db_ids, user_id)
+    raise HTTPException(status_code=400, detail="No file provided")
+
+
+async def _generate_clips_for_source(file_path, tmp_path, original_filename, prompt, user_id, video_id_map, base_url, report):
+    """
+    동영상 하나에 대해 VIA 업로드 → 요약 → 질의 → 타임스탬프 추출 → 클립 생성을 수행합니다.
+
+    Returns:
+        dict: {"video": 파일명, "clips": [...]}
+    """
+    global vss_client
+
+    # VIA 서버 클라이언트 초기화 및 모델 조회
+    if vss_client is None:
+        vss_client = VSS(VIA_SERVER_URL)
+
+    def on_via_queue(position, eta_seconds):
+        # VIA 실행 대기열 순번/예상 대기 시간 보고
+        report("via_queued", video=file_path, position=position, eta_seconds=eta_seconds)
+    
+    try:
+        model = vss_client.model = await vss_client.get_model()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to contact VIA server: {e}")
+
+    # video_ids에서 내부 DB ID 가져오기 (VIA 서버의 video_id로 변환 필요)
+    video_id = None
+    db_internal_id = None
+    if user_id and video_id_map:
+        # 파일명으로 내부 DB ID 찾기
+        db_internal_id = video_id_map.get(file_path) or video_id_map.get(original_filename)
+        if db_internal_id:
             try:
-                chunk_duration = await get_recommended_chunk_size(duration)
+                # 내부 DB ID로 vss_videos 테이블에서 VIDEO_ID (VIA 서버의 video_id) 조회
+                cursor.execute(
+                    "SELECT VIDEO_ID FROM vss_videos WHERE ID = ? AND USER_ID = ?",
+                    (db_internal_id, user_id)
+                )
+                video_row = cursor.fetchone()
+                if video_row and video_row[0]:
+                    video_id = video_row[0]  # VIA 서버의 video_id
+                    logger.info(f"video_ids에서 내부 DB ID {db_internal_id}로 VIDEO_ID {video_id} 조회 성공 (파일명: {file_path})")
+                else:
+                    logger.warning(f"내부 DB ID {db_internal_id}에 해당하는 VIDEO_ID를 찾을 수 없습니다.")
             except Exception as e:
-                logger.warning(f"추천 chunk_size 조회 실패, 기본값 사용: {e}")
-                chunk_duration = duration  # 기본값으로 동영상 전체 길이 사용
+                logger.warning(f"VIDEO_ID 조회 중 오류: {e}")
+    
+    # video_id가 없으면 VIA 서버에 업로드하여 video_id 얻기
+    if not video_id:
+        report("via_upload", video=file_path)
+        try:
+            video_id = await vss_client.upload_video(tmp_path)
+            logger.info(f"VIA 서버에 업로드하여 video_id 획득: {video_id}")
+        except HTTPException:
+            raise
+        except aiohttp.ClientError as e:
+            logger.error(f"VIA 서버 업로드 연결 오류: {e}")
+            raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
+        except Exception as e:
+            logger.error(f"VIA 서버 업로드 실패: {e}")
+            raise HTTPException(status_code=500, detail=f"VIA 서버에 파일 업로드 중 오류가 발생했습니다: {str(e)}")
 
-            # DB에서 요약 결과 확인 (user_id와 video_id가 있는 경우)
-            has_stored_summary = False
-            if user_id and video_id:
-                try:
-                    # VIDEO_ID (VIA 서버의 video_id)로 요약 결과 확인
-                    cursor.execute(
-                        """SELECT ID FROM vss_summaries 
-                           WHERE VIDEO_ID = ? AND USER_ID = ?""",
-                        (video_id, user_id)
-                    )
-                    if cursor.fetchone():
-                        has_stored_summary = True
-                        logger.info(f"저장된 요약 결과 발견: VIDEO_ID {video_id}, summarize_video 건너뛰기")
-                except mariadb.Error as e:
-                    logger.warning(f"요약 결과 확인 중 데이터베이스 오류: {e}")
-                except Exception as e:
-                    logger.warning(f"요약 결과 확인 중 오류: {e}")
-
-            # 저장된 요약이 있으면 summarize_video 건너뛰기
-            if not has_stored_summary:
-                result = await vss_client.summarize_video(
-                    video_id,
-                    "You are a crime CCTV detection system. Please analyze and explain various crimes, including criminal activity, weapon possession, and escape attempts. Please also output timestamps in the form of start and end times.",
-                    "You will be given captions from sequential clips of a video. Aggregate captions in the format start_time:end_time:caption based on whether captions are related to one another or create a continuous scene.",
-                    "Based on the available information, generate a summary that captures the important events in the video. The summary should be organized chronologically and in logical sections. This should be a concise, yet descriptive summary of all the important events. The format should be intuitive and easy for a user to read and understand what happened. Format the output in Markdown so it can be displayed nicely. Timestamps are in seconds so please format them as SS.SSS",
-                    chunk_duration,
-                    model,
-                    chunk_duration // 3,
-                    0,
-                    0,
-                    100,
-                    1.0,
-                    0.4,
-                    512,
-                    1,
-                    6,
-                    1,
-                    5,
-                    0.7,
-                    0.2,
-                    2048,
-                    0.7,
-                    0.2,
-                    2048,
-                    0.7,
-                    0.2,
-                    2048,
-                    True  # enable_audio
+        # 저장된 동영상이면 다음 검색부터 재업로드하지 않도록 VIDEO_ID 기록
+        if db_internal_id:
+            try:
+                cursor.execute(
+                    "UPDATE vss_videos SET VIDEO_ID = ? WHERE ID = ? AND USER_ID = ? AND VIDEO_ID IS NULL",
+                    (video_id, db_internal_id, user_id)
                 )
-                
-                # 요약 결과를 DB에 저장
-                if user_id and video_id and result:
-                    try:
-                        # 요약 텍스트 추출 (result가 문자열인 경우 그대로 사용, dict인 경우 content 추출)
-                        summary_text = result
-                        if isinstance(result, dict):
-                            summary_text = result.get("content", str(result))
-                        elif not isinstance(result, str):
-                            summary_text = str(result)
-                        
-                        # vss_summaries 테이블에 저장 또는 업데이트
-                        cursor.execute(
-                            """INSERT INTO vss_summaries (VIDEO_ID, USER_ID, SUMMARY_TEXT) 
-                               VALUES (?, ?, ?)
-                               ON DUPLICATE KEY UPDATE 
-                               SUMMARY_TEXT = VALUES(SUMMARY_TEXT),
-                               UPDATED_AT = CURRENT_TIMESTAMP""",
-                            (video_id, user_id, summary_text)
-                        )
-                        conn.commit()
-                        logger.info(f"요약 결과 DB 저장 완료: VIDEO_ID={video_id}, USER_ID={user_id}")
-                    except mariadb.Error as e:
-                        logger.error(f"요약 결과 DB 저장 중 데이터베이스 오류: {e}")
-                        # DB 저장 실패해도 요약은 계속 진행
-                    except Exception as e:
-                        logger.error(f"요약 결과 DB 저장 실패: {e}")
-                        # DB 저장 실패해도 요약은 계속 진행
-            else:
-                logger.info(f"저장된 요약 결과가 있어 summarize_video를 건너뜁니다. 바로 query_video로 진행합니다.")
+            except mariadb.Error as e:
+                logger.warning(f"VIDEO_ID 저장 중 데이터베이스 오류: {e}")
+
+    video_clips = []
+    clip_records = []
+    # FFprobe로 길이와 코덱만 조회 (디코더를 열지 않음)
+    try:
+        if not os.path.exists(tmp_path):
+            raise HTTPException(status_code=404, detail=f"동영상 파일을 찾을 수 없습니다: {original_filename}")
+        
+        # 업로드 시 생성된 키프레임 인덱스가 있으면 FFprobe 호출 없이 사용
+        keyframe_index = load_keyframe_index(db_internal_id, tmp_path)
+        if keyframe_index:
+            media_info = {"duration": keyframe_index["duration"], "codec": keyframe_index["codec"]}
+        else:
+            media_info = await asyncio.to_thread(probe_media_info, tmp_path)
+        duration = media_info["duration"]
+        if duration <= 0:
+            raise HTTPException(status_code=400, detail="동영상 길이가 유효하지 않습니다.")
+        logger.info(f"Video duration: {duration} seconds for {tmp_path}")
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        logger.error(f"동영상 파일을 찾을 수 없음: {tmp_path}, 오류: {e}")
+        raise HTTPException(status_code=404, detail=f"동영상 파일을 찾을 수 없습니다: {str(e)}")
+    except Exception as e:
+        logger.error(f"동영상 파일 로드 실패: {tmp_path}, 오류: {e}")
+        raise HTTPException(status_code=500, detail=f"동영상 파일을 로드할 수 없습니다: {str(e)}")
+    
+    # chunk_duration 계산: 동영상 길이의 1/10을 가장 가까운 값으로 반올림
+    try:
+        chunk_duration = await get_recommended_chunk_size(duration)
+    except Exception as e:
+        logger.warning(f"추천 chunk_size 조회 실패, 기본값 사용: {e}")
+        chunk_duration = duration  # 기본값으로 동영상 전체 길이 사용
+
+    # 같은 내용·프롬프트·파라미터의 요약이 캐시에 있으면 summarize_video 건너뛰기
+    report("summarize", video=file_path, chunk_duration=chunk_duration)
+    result, cache_id, cached = await vss_client.summarize_video_cached(
+        video_id,
+        "You are a crime CCTV detection system. Please analyze and explain various crimes, including criminal activity, weapon possession, and escape attempts. Please also output timestamps in the form of start and end times.",
+        "You will be given captions from sequential clips of a video. Aggregate captions in the format start_time:end_time:caption based on whether captions are related to one another or create a continuous scene.",
+        "Based on the available information, generate a summary that captures the important events in the video. The summary should be organized chronologically and in logical sections. This should be a concise, yet descriptive summary of all the important events. The format should be intuitive and easy for a user to read and understand what happened. Format the output in Markdown so it can be displayed nicely. Timestamps are in seconds so please format them as SS.SSS",
+        chunk_duration,
+        model,
+        chunk_duration // 3,
+        0,
+        0,
+        100,
+        1.0,
+        0.4,
+        512,
+        1,
+        6,
+        1,
+        5,
+        0.7,
+        0.2,
+        2048,
+        0.7,
+        0.2,
+        2048,
+        0.7,
+        0.2,
+        2048,
+        True,  # enable_audio
+        on_queue=on_via_queue,
+    )
+    if cached:
+        report("summarize_skipped", video=file_path, cache_id=cache_id)
+        logger.info(f"캐시된 요약을 사용해 summarize_video를 건너뜁니다: cache_id={cache_id}")
+
+    # 사용자별 요약(캐시 항목 참조)을 DB에 저장
+    if user_id and video_id and result:
+        try:
+            # 요약 텍스트 추출 (result가 문자열인 경우 그대로 사용, dict인 경우 content 추출)
+            summary_text = result
+            if isinstance(result, dict):
+                summary_text = result.get("content", str(result))
+            elif not isinstance(result, str):
+                summary_text = str(result)
+            save_user_summary(video_id, user_id, summary_text, cache_id)
+            logger.info(f"요약 결과 DB 저장 완료: VIDEO_ID={video_id}, USER_ID={user_id}, CACHE_ID={cache_id}")
+        except mariadb.Error as e:
+            logger.error(f"요약 결과 DB 저장 중 데이터베이스 오류: {e}")
+            # DB 저장 실패해도 요약은 계속 진행
+        except Exception as e:
+            logger.error(f"요약 결과 DB 저장 실패: {e}")
+            # DB 저장 실패해도 요약은 계속 진행
+    
+    # prompt를 질문으로 처리: VIA 서버의 query_video 사용
+    # 동영상 컨텍스트를 직접 활용하여 질문에 답변
+    try:                
+        # query_video 파라미터 설정
+        query_chunk_size = chunk_duration  # 요약에 사용한 chunk_duration과 동일하게
+        query_temperature = 0.3
+        query_seed = 1
+        query_max_tokens = 512  # VIA 서버는 최대 1024까지만 허용
+        query_top_p = 1
+        query_top_k = 100
+
+        prompt += "이에 해당하는 장면의 시작 시간과 끝 시간의 타임스탬프를 출력해주세요. 타임스탬프만 출력하고 다른 설명은 포함하지 말아야 합니다."
+        
+        # VIA 서버로 질문 전달
+        report("query", video=file_path)
+        query_result = await vss_client.query_video(
+            video_id,
+            model,
+            query_chunk_size,
+            query_temperature,
+            query_seed,
+            query_max_tokens,
+            query_top_p,
+            query_top_k,
+            prompt,  # 사용자가 입력한 prompt를 질문으로 전달
+            on_queue=on_via_queue,
+        )
+        
+        # query_result를 Ollama LLM에 보내서 타임스탬프만 추출
+        extracted_timestamps_text = None
+        report("timestamp_extraction", video=file_path)
+        try:
             
-            # prompt를 질문으로 처리: VIA 서버의 query_video 사용
-            # 동영상 컨텍스트를 직접 활용하여 질문에 답변
-            try:                
-                # query_video 파라미터 설정
-                query_chunk_size = chunk_duration  # 요약에 사용한 chunk_duration과 동일하게
-                query_temperature = 0.3
-                query_seed = 1
-                query_max_tokens = 512  # VIA 서버는 최대 1024까지만 허용
-                query_top_p = 1
-                query_top_k = 100
-
-                prompt += "이에 해당하는 장면의 시작 시간과 끝 시간의 타임스탬프를 출력해주세요. 타임스탬프만 출력하고 다른 설명은 포함하지 말아야 합니다."
-                
-                # VIA 서버로 질문 전달
-                query_result = await vss_client.query_video(
-                    video_id,
-                    model,
-                    query_chunk_size,
-                    query_temperature,
-                    query_seed,
-                    query_max_tokens,
-                    query_top_p,
-                    query_top_k,
-                    prompt  # 사용자가 입력한 prompt를 질문으로 전달
-                )
-                
-                # query_result를 Ollama LLM에 보내서 타임스탬프만 추출
-                extracted_timestamps_text = None
-                try:
-                    
-                    # Ollama API 호출을 위한 프롬프트 구성
-                    timestamp_extraction_prompt = f"""다음은 동영상 질의 응답 결과입니다:
+            # Ollama API 호출을 위한 프롬프트 구성
+            timestamp_extraction_prompt = f"""다음은 동영상 질의 응답 결과입니다:
 {query_result}
 
 위 응답에서 타임스탬프만 추출하여 출력해주세요. 타임스탬프 형식은 초 단위(예: 10.5, 120.3) 또는 분:초 형식(예: 1:30, 2:45)일 수 있습니다. 타임스탬프만 출력하고 다른 설명은 포함하지 마세요."""
-                    
-                    # Ollama API 호출 (aiohttp 사용)
-                    session = await get_session()
-                    ollama_url = f"{OLLAMA_BASE_URL}/api/chat"
-                    payload = {
-                        "model": OLLAMA_MODEL,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are an expert at extracting timestamps from video query responses. Extract only timestamps and output them in a clear format."
-                            },
-                            {
-                                "role": "user",
-                                "content": timestamp_extraction_prompt
-                            }
-                        ],
-                        "stream": False,
-                        "options": {
-                            "temperature": 0,  # 타임스탬프 추출은 정확성이 중요하므로 낮은 temperature
-                            "num_predict": 500  # 타임스탬프만 추출하므로 적은 토큰 수
-                        }
+            
+            # Ollama API 호출 (aiohttp 사용)
+            session = await get_session("ollama")
+            ollama_url = f"{OLLAMA_BASE_URL}/api/chat"
+            payload = {
+                "model": OLLAMA_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "You are an expert at extracting timestamps from video query responses. Extract only timestamps and output them in a clear format."
+                    },
+                    {
+                        "role": "user",
+                        "content": timestamp_extraction_prompt
                     }
-                    
-                    async with session.post(
-                        ollama_url,
-                        json=payload,
-                        timeout=aiohttp.ClientTimeout(total=60)
-                    ) as ollama_response:
-                        if ollama_response.status == 200:
-                            ollama_data = await ollama_response.json()
-                            extracted_timestamps_text = ollama_data.get("message", {}).get("content", "")
-                            if extracted_timestamps_text:
-                                extracted_timestamps_text = extracted_timestamps_text.strip()
-                            else:
-                                logger.warning("Ollama 응답에 content가 없습니다.")
-                        else:
-                            error_text = await ollama_response.text()
-                            logger.warning(f"Ollama API 호출 실패 (HTTP {ollama_response.status}): {error_text}")
-                except aiohttp.ClientConnectorError as e:
-                    logger.warning(f"Ollama 서버에 연결할 수 없습니다: {e}")
-                    logger.warning("Ollama가 실행 중인지 확인하세요: ollama serve")
-                except Exception as e:
-                    logger.warning(f"Ollama를 사용한 타임스탬프 추출 중 오류 발생: {e}")
-                
-                logger.debug(f"VIA 서버 답변: {query_result}")
-                
-                # 추출된 타임스탬프를 파싱하여 클립 생성에 사용
-                timestamp_ranges = []
-                if extracted_timestamps_text:
-                    timestamp_ranges = parse_timestamps(extracted_timestamps_text, duration)
-                
-                # 타임스탬프 기반 클립 생성
-                base_name, _ = os.path.splitext(file_path)
-                # 고유한 파일명을 위해 타임스탬프 추가 (중복 방지 및 브라우저 캐시 문제 해결)
-                timestamp_suffix = int(time.time() * 1000)  # 밀리초 단위 타임스탬프
-                
-                if timestamp_ranges:
-                    # 타임스탬프가 있으면 해당 구간의 클립 생성
-                    clip_index = 0
-                    for start_time, end_time in timestamp_ranges:
-                        # 타임스탬프 간격이 0초인 클립은 건너뛰기
-                        if end_time - start_time <= 0:
-                            logger.warning(f"타임스탬프 간격이 0초 이하인 클립을 건너뜁니다: {start_time} - {end_time}")
-                            continue
-                        
-                        clip_filename = f"clip_{base_name}_{timestamp_suffix}_{clip_index+1}.mp4"
-                        clip_path = os.path.join("./clips", clip_filename)
-                        try:
-                            # 타임스탬프 구간의 클립 생성
-                            video.subclip(start_time, end_time).write_videofile(
-                                clip_path,
-                                codec="libx264",
-                                audio=False,
-                                verbose=False
-                            )
-                            base = str(request.base_url).rstrip('/')
-                            clip_url = f"{base}/clips/{clip_filename}"
-                            video_clips.append({
-                                "id": f"{base_name}_{timestamp_suffix}_{clip_index}",
-                                "title": clip_filename,
-                                "url": clip_url,
-                                "start_time": start_time,
-                                "end_time": end_time,
-                                "search_query": prompt
-                            })
-                            clip_index += 1
-                        except OSError as e:
-                            logger.error(f"클립 파일 생성 중 파일 시스템 오류 {clip_filename}: {e}")
-                        except Exception as e:
-                            logger.error(f"Error generating clip {clip_filename}: {e}", exc_info=True)
-                        time.sleep(0.5)
+                ],
+                "stream": False,
+                "options": {
+                    "temperature": 0,  # 타임스탬프 추출은 정확성이 중요하므로 낮은 temperature
+                    "num_predict": 500  # 타임스탬프만 추출하므로 적은 토큰 수
+                }
+            }
+            
+            async def extract():
+                async with session.post(
+                    ollama_url,
+                    json=payload,
+                    timeout=OLLAMA_TIMEOUT
+                ) as ollama_response:
+                    if ollama_response.status == 200:
+                        ollama_data = await ollama_response.json()
+                        return ollama_data.get("message", {}).get("content", "")
+                    error_text = await ollama_response.text()
+                    raise HTTPException(status_code=ollama_response.status, detail=f"Ollama API 호출 실패 (HTTP {ollama_response.status}): {error_text}")
+
+            # temperature 0 추출이므로 재시도해도 안전
+            extracted_timestamps_text = await call_upstream(ollama_breaker, "chat", extract, retries=1)
+            if extracted_timestamps_text:
+                extracted_timestamps_text = extracted_timestamps_text.strip()
+            else:
+                logger.warning("Ollama 응답에 content가 없습니다.")
+        except UpstreamUnavailable as e:
+            logger.warning(f"Ollama 호출 생략: {e.detail}")
+        except HTTPException as e:
+            logger.warning(e.detail)
+        except aiohttp.ClientConnectorError as e:
+            logger.warning(f"Ollama 서버에 연결할 수 없습니다: {e}")
+            logger.warning("Ollama가 실행 중인지 확인하세요: ollama serve")
+        except Exception as e:
+            logger.warning(f"Ollama를 사용한 타임스탬프 추출 중 오류 발생: {e}")
+        
+        logger.debug(f"VIA 서버 답변: {query_result}")
+        
+        # 추출된 타임스탬프를 파싱하여 클립 생성에 사용
+        timestamp_ranges = []
+        if extracted_timestamps_text:
+            timestamp_ranges = parse_timestamps(extracted_timestamps_text, duration)
+        report("timestamps_parsed", video=file_path, range_count=len(timestamp_ranges))
+        
+        # 타임스탬프 기반 클립 생성
+        base_name, _ = os.path.splitext(file_path)
+        # 응답의 클립 id 구분용 타임스탬프 (클립 파일명은 캐시 키로 결정)
+        timestamp_suffix = int(time.time() * 1000)  # 밀리초 단위 타임스탬프
+        
+        if timestamp_ranges:
+            # 타임스탬프가 있으면 해당 구간의 클립 생성
+            valid_ranges = []
+            for start_time, end_time in timestamp_ranges:
+                # 타임스탬프 간격이 0초인 클립은 건너뛰기
+                if end_time - start_time <= 0:
+                    logger.warning(f"타임스탬프 간격이 0초 이하인 클립을 건너뜁니다: {start_time} - {end_time}")
+                    continue
+                valid_ranges.append((start_time, end_time))
+
+            if is_virtual_clip_source(tmp_path):
+                # 저장된 원본이면 파일을 만들지 않고 키프레임 구간을 가리키는 가상 클립 URL 반환
+                if keyframe_index:
+                    keyframes = keyframe_index["times"]
                 else:
-                    # 타임스탬프가 없으면 VIA 서버 답변을 그대로 반환
-                    logger.warning(f"타임스탬프를 찾을 수 없습니다. 검색어: '{prompt}'. VIA 서버 답변을 반환합니다.")
-                    # 클립 없이 VIA 서버 답변만 포함하여 반환
+                    try:
+                        keyframes = await asyncio.to_thread(probe_keyframes, tmp_path, valid_ranges)
+                    except Exception as e:
+                        logger.warning(f"키프레임 조회 실패, 요청 구간 그대로 사용합니다: {e}")
+                        keyframes = []
+                for clip_index, (start_time, end_time) in enumerate(valid_ranges):
+                    clip_start, clip_end = start_time, end_time
+                    if keyframes:
+                        clip_start, clip_end = snap_range_to_keyframes(keyframes, start_time, end_time, duration)
                     video_clips.append({
-                        "id": f"{base_name}_{timestamp_suffix}_no_timestamp",
-                        "title": "VIA 서버 응답",
-                        "url": None,
-                        "start_time": None,
-                        "end_time": None,
+                        "id": f"{base_name}_{timestamp_suffix}_{clip_index}",
+                        "title": f"clip_{base_name}_{clip_start:.3f}-{clip_end:.3f}.mp4",
+                        "start_time": clip_start,
+                        "end_time": clip_end,
                         "search_query": prompt,
-                        "via_response": query_result  # VIA 서버 답변 추가
+                        **virtual_clip_urls(base_url, file_path, clip_start, clip_end),
                     })
-            except HTTPException:
-                # HTTPException은 그대로 전파
-                raise
-            except Exception as via_error:
-                logger.error(f"VIA 서버 query_video 실패: {via_error}")
-                # 검색 실패 에러 반환
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"검색 실패: VIA 서버에서 장면 검색 중 오류가 발생했습니다. ({str(via_error)})"
+                    clip_records.append((video_clips[-1], None))
+                    report("clip_ready", video=file_path, clip=video_clips[-1])
+            else:
+                # 클립 캐시 키: (원본 내용 해시, 시작, 끝, 인코딩 프로파일)
+                content_hash = await asyncio.to_thread(file_content_hash, tmp_path)
+                cache_keys = [
+                    ClipCache.make_key(content_hash, start_time, end_time, CLIP_EXTRACT_MODE)
+                    for start_time, end_time in valid_ranges
+                ]
+
+                if keyframe_index:
+                    keyframes = keyframe_index["times"]
+                elif all(clip_cache.contains(key) for key in cache_keys):
+                    keyframes = []
+                else:
+                    # 인덱스가 없으면 모든 구간 주변의 키프레임을 한 번의 FFprobe 패킷 스캔으로 조회
+                    try:
+                        keyframes = await asyncio.to_thread(probe_keyframes, tmp_path, valid_ranges)
+                    except Exception as e:
+                        logger.warning(f"키프레임 조회 실패, 재인코딩으로 클립을 생성합니다: {e}")
+                        keyframes = []
+
+                def _make_clip_creator(start_time, end_time):
+                    async def _create(output_path):
+                        report("clip_encoding", video=file_path, start_time=start_time, end_time=end_time)
+                        return await clip_encoder_pool.submit(
+                            extract_clip,
+                            tmp_path,
+                            output_path,
+                            start_time,
+                            end_time,
+                            keyframes,
+                            duration,
+                            codec=media_info["codec"],
+                        )
+                    return _create
+
+                # 캐시에 없는 구간만 공유 인코딩 풀에서 병렬로 추출
+                results = await asyncio.gather(
+                    *[
+                        clip_cache.get_or_create(key, _make_clip_creator(start_time, end_time))
+                        for key, (start_time, end_time) in zip(cache_keys, valid_ranges)
+                    ],
+                    return_exceptions=True,
                 )
-            # 리소스 정리
-            if video is not None:
-                try:
-                    video.close()
-                except Exception as e:
-                    logger.warning(f"동영상 리소스 정리 중 오류: {e}")
-                del video
 
-            grouped_clips.append({
-                "video": file_path,
-                "clips": video_clips
+                encoder_error = None
+                for clip_index, ((start_time, end_time), result) in enumerate(zip(valid_ranges, results)):
+                    if isinstance(result, HTTPException):
+                        encoder_error = encoder_error or result
+                        continue
+                    if isinstance(result, OSError):
+                        logger.error(f"클립 파일 생성 중 파일 시스템 오류 ({start_time}-{end_time}): {result}")
+                        continue
+                    if isinstance(result, Exception):
+                        logger.error(f"Error generating clip ({start_time}-{end_time}): {result}", exc_info=result)
+                        continue
+                    clip_filename = result["path"].name
+                    clip_start, clip_end = result["start_time"], result["end_time"]
+                    if clip_start is None:
+                        # 재시작 전에 만들어진 캐시 클립: 키프레임 인덱스로 실제 구간 재계산
+                        clip_start, clip_end = start_time, end_time
+                        if CLIP_EXTRACT_MODE == "fast" and keyframes:
+                            clip_start, clip_end = snap_range_to_keyframes(keyframes, start_time, end_time, duration)
+                    video_clips.append({
+                        "id": f"{base_name}_{timestamp_suffix}_{clip_index}",
+                        # 파일명은 캐시 키라 사용자마다 같으므로 제목은 요청자의 원본 파일명으로 표시
+                        "title": f"clip_{base_name}_{clip_start:.3f}-{clip_end:.3f}.mp4",
+                        "url": f"{base_url}/clips/{clip_filename}",
+                        "start_time": clip_start,
+                        "end_time": clip_end,
+                        "search_query": prompt,
+                        **preview_urls(base_url, "clips", clip_filename),
+                    })
+                    clip_records.append((video_clips[-1], clip_filename))
+                    report("clip_ready", video=file_path, clip=video_clips[-1])
+                if encoder_error:
+                    # 인코딩 대기열 초과는 요청 전체를 503으로 응답 (이미 만든 클립은 아래에서 기록)
+                    raise encoder_error
+        else:
+            # 타임스탬프가 없으면 VIA 서버 답변을 그대로 반환
+            logger.warning(f"타임스탬프를 찾을 수 없습니다. 검색어: '{prompt}'. VIA 서버 답변을 반환합니다.")
+            # 클립 없이 VIA 서버 답변만 포함하여 반환
+            video_clips.append({
+                "id": f"{base_name}_{timestamp_suffix}_no_timestamp",
+                "title": "VIA 서버 응답",
+                "url": None,
+                "start_time": None,
+                "end_time": None,
+                "search_query": prompt,
+                "via_response": query_result  # VIA 서버 답변 추가
             })
-
+            report("clip_ready", video=file_path, clip=video_clips[-1])
     except HTTPException:
+        # HTTPException은 그대로 전파
         raise
-    except aiohttp.ClientError as e:
+    except Exception as via_error:
+        logger.error(f"VIA 서버 query_video 실패: {via_error}")
+        # 검색 실패 에러 반환
+        raise HTTPException(
+            status_code=500,
+            detail=f"검색 실패: VIA 서버에서 장면 검색 중 오류가 발생했습니다. ({str(via_error)})"
+        )
+    finally:
+        # 사용자/동영상별 클립 기록 (삭제·목록 조회용)
+        # 일부 구간이 실패해 오류로 끝나도 이미 인코딩한 클립은 기록해 삭제 API로 지울 수 있게 함
+        # (파일 자체는 생성 시 클립 캐시에 등록되어 TTL/용량 정리 대상)
+        if user_id and clip_records:
+            try:
+                record_clips(user_id, db_internal_id, clip_records)
+            except mariadb.Error as e:
+                logger.warning(f"클립 기록 저장 중 데이터베이스 오류: {e}")
+            except Exception as e:
+                logger.warning(f"클립 기록 저장 실패: {e}")
+    return {
+        "video": file_path,
+        "clips": video_clips
+    }
+
+
+# 동시에 처리할 동영상 파일 수 (VIA 요약/질의와 인코딩이 파일별로 병렬 진행)
+GENERATE_CLIPS_FILE_CONCURRENCY = max(1, int(os.getenv("GENERATE_CLIPS_FILE_CONCURRENCY", "3")))
+
+
+def _to_http_exception(e):
+    """generate-clips 처리 중 발생한 예외를 HTTPException으로 변환"""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, aiohttp.ClientError):
         logger.error(f"VIA 서버 연결 오류: {e}")
-        raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
-    except FileNotFoundError as e:
+        return HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
+    if isinstance(e, asyncio.TimeoutError):
+        logger.error("VIA 서버 응답 시간 초과")
+        return HTTPException(status_code=504, detail="VIA 서버 응답 시간이 초과되었습니다.")
+    if isinstance(e, FileNotFoundError):
         logger.error(f"파일을 찾을 수 없음: {e}")
-        raise HTTPException(status_code=404, detail=f"파일을 찾을 수 없습니다: {str(e)}")
-    except OSError as e:
+        return HTTPException(status_code=404, detail=f"파일을 찾을 수 없습니다: {str(e)}")
+    if isinstance(e, OSError):
         logger.error(f"파일 시스템 오류: {e}")
-        raise HTTPException(status_code=500, detail=f"파일 처리 중 오류가 발생했습니다: {str(e)}")
-    except json.JSONDecodeError as e:
+        return HTTPException(status_code=500, detail=f"파일 처리 중 오류가 발생했습니다: {str(e)}")
+    if isinstance(e, json.JSONDecodeError):
         logger.error(f"JSON 파싱 오류: {e}")
-        raise HTTPException(status_code=400, detail=f"잘못된 JSON 형식입니다: {str(e)}")
-    except mariadb.Error as e:
+        return HTTPException(status_code=400, detail=f"잘못된 JSON 형식입니다: {str(e)}")
+    if isinstance(e, mariadb.Error):
         logger.error(f"데이터베이스 오류: {e}")
-        raise HTTPException(status_code=500, detail=f"데이터베이스 오류가 발생했습니다: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error processing uploaded video(s): {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"동영상 처리 중 오류가 발생했습니다: {str(e)}")
+        return HTTPException(status_code=500, detail=f"데이터베이스 오류가 발생했습니다: {str(e)}")
+    logger.error(f"Error processing uploaded video(s): {e}", exc_info=e)
+    return HTTPException(status_code=500, detail=f"동영상 처리 중 오류가 발생했습니다: {str(e)}")
+
+
+async def run_generate_clips(sources, prompt, user_id, video_id_map, base_url, progress=None):
+    """
+    generate-clips 파이프라인 본체 (동기 응답과 작업 API에서 공용으로 사용)
+
+    파일들은 GENERATE_CLIPS_FILE_CONCURRENCY개까지 동시에 처리되며, 실패한 파일은
+    해당 그룹에 error로 기록됩니다. 모든 파일이 실패한 경우에만 요청 전체가 실패합니다.
+
+    Args:
+        sources: _save_clip_uploads의 반환값
+        progress: 단계별 진행 상황을 받을 콜백 progress(stage, **data) (선택)
+
+    Returns:
+        dict: {"clips": grouped_clips, "clips_extracted": bool}
+    """
+    report = progress or (lambda stage, **data: None)
+    semaphore = asyncio.Semaphore(GENERATE_CLIPS_FILE_CONCURRENCY)
+
+    async def _process(file_path, tmp_path, original_filename):
+        async with semaphore:
+            report("source_started", video=file_path)
+            try:
+                group = await _generate_clips_for_source(
+                    file_path, tmp_path, original_filename, prompt, user_id, video_id_map, base_url, report
+                )
+            except Exception as e:
+                error = _to_http_exception(e)
+                report("source_failed", video=file_path, status_code=error.status_code, detail=error.detail)
+                return {"video": file_path, "clips": [], "error": error}
+            report("source_completed", video=file_path, clip_count=len(group["clips"]))
+            return group
+
+    # 결과는 업로드 순서대로 파일별로 묶어서 반환
+    grouped_clips = await asyncio.gather(
+        *[_process(file_path, tmp_path, original_filename) for file_path, tmp_path, original_filename in sources]
+    )
+
+    failed = [group for group in grouped_clips if "error" in group]
+    if failed and len(failed) == len(grouped_clips):
+        # 단일 파일 요청 등 전부 실패하면 기존처럼 해당 상태 코드로 응답
+        raise failed[0]["error"]
+    for group in failed:
+        error = group["error"]
+        group["error"] = {"status_code": error.status_code, "detail": error.detail}
 
     # 클립 추출 여부 확인 (실제 URL이 있는 클립이 있는지 확인)
     clips_extracted = False
@@ -1064,122 +3861,874 @@ async def generate_clips(
                 break
     except Exception as e:
         logger.warning(f"클립 추출 여부 확인 중 오류: {e}")
-    
-    logger.info("All clips generated successfully.")
+
+    if failed:
+        logger.warning(f"클립 생성 완료 (실패한 파일 {len(failed)}/{len(grouped_clips)}개)")
+    else:
+        logger.info("All clips generated successfully.")
     logger.debug(f"Returned clips payload: {json.dumps({'clips': grouped_clips, 'clips_extracted': clips_extracted}, ensure_ascii=False)}")
-    return JSONResponse(content={"clips": grouped_clips, "clips_extracted": clips_extracted})
+    return {"clips": grouped_clips, "clips_extracted": clips_extracted}
+
+
+@app.post("/generate-clips")
+async def generate_clips(
+    request: Request,
+    files: List[UploadFile] = File(None),
+    prompt: str = Form(...),
+    user_id: Optional[str] = Form(None),
+    video_ids: Optional[str] = Form(None)  # JSON 문자열로 전달: [id1, id2] (files 없이) 또는 {"filename1": video_id1, ...}
+):
+    """
+    동영상에서 클립 생성 엔드포인트
+
+    user_id와 video_ids(vss_videos.ID 목록)만 보내면 서버에 저장된 동영상을 바로 사용합니다.
+    """
+    prompt, video_id_map = _parse_generate_clips_form(prompt, user_id, video_ids)
+    sources, video_id_map = await _prepare_clip_sources(files, user_id, video_id_map)
+    payload = await run_generate_clips(
+        sources, prompt, user_id, video_id_map, str(request.base_url).rstrip('/')
+    )
+    return JSONResponse(content=payload)
+
+
+@app.post("/generate-clips/stream")
+async def generate_clips_stream(
+    request: Request,
+    files: List[UploadFile] = File(None),
+    prompt: str = Form(...),
+    user_id: Optional[str] = Form(None),
+    video_ids: Optional[str] = Form(None)
+):
+    """
+    클립이 만들어지는 즉시 한 줄씩 전달하는 generate-clips (NDJSON)
+
+    레코드 형식:
+        {"type": "clip", "video": ..., "id": ..., "url": ..., "start_time": ..., "end_time": ..., "search_query": ...}
+        {"type": "error", "video": ..., "status_code": ..., "detail": ...}   # 파일별 실패
+        {"type": "done", "clips_extracted": bool}                            # 마지막 레코드
+    """
+    prompt, video_id_map = _parse_generate_clips_form(prompt, user_id, video_ids)
+    sources, video_id_map = await _prepare_clip_sources(files, user_id, video_id_map)
+    records = asyncio.Queue()
+
+    def _on_progress(stage, **data):
+        if stage == "clip_ready":
+            record = {"type": "clip", "video": data["video"]}
+            record.update(data["clip"])
+            records.put_nowait(record)
+        elif stage == "source_failed":
+            records.put_nowait({"type": "error", **data})
+
+    async def _run():
+        try:
+            payload = await run_generate_clips(
+                sources, prompt, user_id, video_id_map, str(request.base_url).rstrip('/'), progress=_on_progress
+            )
+            records.put_nowait({"type": "done", "clips_extracted": payload["clips_extracted"]})
+        except HTTPException as e:
+            records.put_nowait({"type": "done", "clips_extracted": False, "status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"Error streaming clips: {e}", exc_info=True)
+            records.put_nowait({"type": "done", "clips_extracted": False, "status_code": 500, "detail": str(e)})
+
+    task = asyncio.create_task(_run())
+
+    async def record_stream():
+        try:
+            while True:
+                record = await records.get()
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+                if record["type"] == "done":
+                    return
+        finally:
+            # 클라이언트가 연결을 끊으면 남은 처리 중단 (진행 중인 인코딩은 캐시에 그대로 저장됨)
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        record_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================================
+# 클립 생성 작업(Job) API
+# ============================================================================
+# 긴 동영상은 VIA 요약/질의와 인코딩이 프록시 타임아웃(Railway)을 넘기므로
+# 작업을 백그라운드에서 실행하고 진행 상황은 SSE로, 결과는 GET으로 조회합니다.
+# 작업 상태는 프로세스 메모리에 보관되어 클라이언트가 재연결해도 유지됩니다.
+CLIP_JOB_TTL_SECONDS = int(os.getenv("CLIP_JOB_TTL_SECONDS", str(60 * 60)))
+CLIP_JOB_KEEPALIVE_SECONDS = 15
+
+
+class ClipJob:
+    """클립 생성 작업 하나의 상태와 진행 이벤트 기록"""
+
+    def __init__(self, job_id, user_id=None):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.status = "queued"  # queued → running → completed | failed
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def emit(self, stage, **data):
+        """진행 이벤트 기록 후 대기 중인 SSE 구독자를 깨움"""
+        event = {"id": len(self.events) + 1, "stage": stage, "timestamp": time.time()}
+        event.update(data)
+        self.events.append(event)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, timeout):
+        """새 이벤트가 생기거나 timeout이 지날 때까지 대기"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed")
+
+    def to_dict(self):
+        payload = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": datetime.fromtimestamp(self.created_at).isoformat(),
+            "finished_at": datetime.fromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+            "last_event": self.events[-1] if self.events else None,
+        }
+        if self.status == "completed":
+            payload.update(self.result)
+        elif self.status == "failed":
+            payload["error"] = self.error
+        return payload
+
+
+clip_jobs = {}
+
+
+def _purge_clip_jobs(jobs=clip_jobs):
+    """완료 후 TTL이 지난 작업 제거"""
+    now = time.time()
+    expired = [
+        job_id for job_id, job in jobs.items()
+        if job.done and now - job.finished_at > CLIP_JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        del jobs[job_id]
+
+
+def _get_clip_job(job_id, jobs=clip_jobs):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+
+async def _run_clip_job(job, sources, prompt, user_id, video_id_map, base_url):
+    job.status = "running"
+    job.emit("started", sources=[file_path for file_path, _, _ in sources])
+    try:
+        job.result = await run_generate_clips(
+            sources, prompt, user_id, video_id_map, base_url, progress=job.emit
+        )
+        job.status = "completed"
+        job.finished_at = time.time()
+        job.emit("completed", clips_extracted=job.result["clips_extracted"])
+    except HTTPException as e:
+        job.status = "failed"
+        job.error = {"status_code": e.status_code, "detail": e.detail}
+        job.finished_at = time.time()
+        job.emit("failed", **job.error)
+    except Exception as e:
+        logger.error(f"클립 생성 작업 실패 ({job.job_id}): {e}", exc_info=True)
+        job.status = "failed"
+        job.error = {"status_code": 500, "detail": f"동영상 처리 중 오류가 발생했습니다: {str(e)}"}
+        job.finished_at = time.time()
+        job.emit("failed", **job.error)
+
+
+@app.post("/generate-clips/jobs", status_code=202)
+async def create_generate_clips_job(
+    request: Request,
+    files: List[UploadFile] = File(None),
+    prompt: str = Form(...),
+    user_id: Optional[str] = Form(None),
+    video_ids: Optional[str] = Form(None)
+):
+    """
+    클립 생성 작업 등록 엔드포인트 (업로드 저장 후 즉시 job_id 반환)
+    """
+    prompt, video_id_map = _parse_generate_clips_form(prompt, user_id, video_ids)
+    # 요청 본문은 응답 후 닫히므로 업로드 파일은 먼저 디스크에 저장
+    sources, video_id_map = await _prepare_clip_sources(files, user_id, video_id_map)
+
+    _purge_clip_jobs()
+    job = ClipJob(uuid.uuid4().hex, user_id)
+    clip_jobs[job.job_id] = job
+    job.emit("queued")
+    job.task = asyncio.create_task(
+        _run_clip_job(job, sources, prompt, user_id, video_id_map, str(request.base_url).rstrip('/'))
+    )
+    logger.info(f"클립 생성 작업 등록: {job.job_id}")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.job_id,
+            "status": job.status,
+            "status_url": f"/generate-clips/jobs/{job.job_id}",
+            "events_url": f"/generate-clips/jobs/{job.job_id}/events",
+        },
+    )
+
+
+@app.get("/generate-clips/jobs/{job_id}")
+async def get_generate_clips_job(job_id: str):
+    """
+    클립 생성 작업 상태 조회 (완료 시 clips / clips_extracted 포함)
+    """
+    return _get_clip_job(job_id).to_dict()
+
+
+@app.get("/generate-clips/jobs/{job_id}/events")
+async def stream_generate_clips_job_events(
+    job_id: str,
+    request: Request,
+    last_event_id: Optional[int] = Query(None)
+):
+    """
+    클립 생성 작업 진행 이벤트 스트림 (SSE)
+
+    재연결 시 Last-Event-ID 헤더(또는 last_event_id 쿼리)부터 이어서 전송합니다.
+    """
+    job = _get_clip_job(job_id)
+    if last_event_id is None:
+        try:
+            last_event_id = int(request.headers.get("last-event-id", 0))
+        except ValueError:
+            last_event_id = 0
+
+    async def event_stream():
+        sent = max(last_event_id, 0)
+        while True:
+            while sent < len(job.events):
+                event = job.events[sent]
+                sent += 1
+                yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if job.done:
+                return
+            if await request.is_disconnected():
+                return
+            await job.wait_for_change(CLIP_JOB_KEEPALIVE_SECONDS)
+            if sent >= len(job.events) and not job.done:
+                # 프록시 유휴 타임아웃 방지용 주석 라인
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ============================================================================
+# 요약 스트리밍 (SSE)
+# ============================================================================
+# VIA 이벤트가 없는 동안에도 진행 이벤트를 보내는 간격 (초)
+SUMMARIZE_STREAM_HEARTBEAT_SECONDS = 5
+
+
+def parse_alert_tools(alerts: Optional[str]):
+    """
+    "이름: 이벤트1, 이벤트2; 이름2: 이벤트3" 형식의 알림 정의를 VIA tools 목록으로 변환
+    """
+    tools = []
+    for alert in (alerts or "").split(";"):
+        alert = alert.strip()
+        if not alert:
+            continue
+        name, _, events = alert.partition(":")
+        name = name.strip()
+        parsed_events = [ev.strip() for ev in events.split(",") if ev.strip()]
+        if not name or not parsed_events:
+            raise HTTPException(status_code=400, detail=f"알림 형식이 올바르지 않습니다: '{alert}' (예: 화재: fire, smoke)")
+        tools.append({"type": "alert", "alert": {"name": name, "events": parsed_events}})
+    return tools
+
+
+def _format_offset(seconds):
+    if not isinstance(seconds, (int, float)):
+        return "?"
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def aggregate_summary_captions(captions):
+    """
+    구간 요약 목록을 최종 요약 텍스트로 합침 (구간이 하나면 그대로 반환)
+    """
+    if not captions:
+        return ""
+    if len(captions) == 1:
+        return captions[0]["content"]
+    return "\n\n".join(
+        f"**{_format_offset(caption['start_offset'])} -> {_format_offset(caption['end_offset'])}**\n\n{caption['content']}"
+        for caption in captions
+    )
+
+
+def _summarize_http_exception(e):
+    # 요약 중 발생한 예외를 HTTPException으로 변환
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, asyncio.TimeoutError):
+        logger.error("VIA 서버 summarize_video 응답 시간 초과")
+        return HTTPException(status_code=504, detail="VIA 서버 요약 응답 시간이 초과되었습니다.")
+    logger.error(f"vss_summarize 실행 중 오류: {e}")
+    error_msg = str(e)
+    
+    # GStreamer 관련 에러인 경우 더 명확한 메시지 제공
+    if "gst-stream-error" in error_msg or "qtdemux" in error_msg or "not-negotiated" in error_msg:
+        return HTTPException(
+            status_code=500,
+            detail=(
+                "동영상 파일 처리 중 오류가 발생했습니다.\n\n"
+                "가능한 원인:\n"
+                "1. 손상된 동영상 파일 - 파일을 다시 다운로드하거나 다른 파일로 시도해보세요.\n"
+                "2. 지원하지 않는 코덱 또는 포맷 - H.264 코덱의 MP4 파일을 권장합니다.\n"
+                "3. 파일이 완전히 업로드되지 않음 - 네트워크 연결을 확인하고 다시 시도해보세요.\n"
+                "4. 파일 메타데이터 문제 - 동영상 편집 프로그램으로 파일을 다시 저장해보세요.\n\n"
+                f"기술적 오류: {error_msg}"
+            )
+        )
+    return HTTPException(status_code=500, detail=f"요약 생성 중 오류가 발생했습니다: {error_msg}")
+
+
+_RELAY_DONE = object()
+
+
+async def relay_stream(stream, heartbeat_seconds=None):
+    """
+    비동기 스트림을 별도 태스크에서 읽어 순서대로 반환
+
+    heartbeat_seconds 동안 이벤트가 없으면(VIA 대기열 대기, 긴 구간 처리 등) None을 반환합니다.
+    소비자가 중간에 멈추면 스트림(및 VIA 요청)을 취소합니다.
+    """
+    queue = asyncio.Queue()
+    failure = []
+
+    async def pump():
+        try:
+            async for event in stream:
+                await queue.put(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            failure.append(e)
+        finally:
+            queue.put_nowait(_RELAY_DONE)
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if event is _RELAY_DONE:
+                break
+            yield event
+        if failure:
+            raise failure[0]
+    finally:
+        task.cancel()
+
+
+def stream_summarize_events(request: Request, video_id, summarize_args, tools):
+    """
+    VIA 요약 스트림을 SSE로 중계
+
+    이벤트:
+    - queued:   {"position", "eta_seconds"} - VIA 실행 대기열 순번이 바뀔 때 전송 (0이면 실행 시작)
+    - progress: {"chunks", "media_offset", "alerts", "elapsed"} - 구간 완료 시 및 대기 중 주기적으로 전송
+    - caption:  {"content", "start_offset", "end_offset"} - 구간 요약
+    - alert:    {"name", "detected_events", "offset", "details"}
+    - final:    {"summary", "video_id", "usage", "chunks", "elapsed", "cache_id", "cached"}
+    - error:    {"status", "detail"}
+
+    클라이언트가 연결을 끊으면 VIA 요청도 취소합니다.
+    """
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def event_stream():
+        started = time.monotonic()
+        captions = []
+        alert_count = 0
+        usage = None
+        media_offset = None
+        cache = {"cache_id": None, "cached": False}
+
+        def progress():
+            return {
+                "chunks": len(captions),
+                "media_offset": media_offset,
+                "alerts": alert_count,
+                "elapsed": round(time.monotonic() - started, 2),
+            }
+
+        try:
+            yield sse("progress", progress())
+            stream = vss_client.summarize_video_stream_cached(*summarize_args, tools=tools)
+            async for event in relay_stream(stream, SUMMARIZE_STREAM_HEARTBEAT_SECONDS):
+                if event is None:
+                    if await request.is_disconnected():
+                        logger.info(f"vss_summarize 스트림 클라이언트 연결 종료: video_id={video_id}")
+                        return
+                    yield sse("progress", progress())
+                    continue
+                event_type = event.pop("type")
+                if event_type == "queued":
+                    yield sse("queued", event)
+                elif event_type == "caption":
+                    captions.append(event)
+                    media_offset = event.get("end_offset")
+                    yield sse("caption", event)
+                    yield sse("progress", progress())
+                elif event_type == "alert":
+                    alert_count += 1
+                    yield sse("alert", event)
+                elif event_type == "usage":
+                    usage = event["usage"]
+                elif event_type == "cache":
+                    cache = event
+        except Exception as e:
+            error = _summarize_http_exception(e)
+            yield sse("error", {"status": error.status_code, "detail": error.detail, "retry_after": (error.headers or {}).get("Retry-After")})
+            return
+        yield sse("final", {
+            "summary": aggregate_summary_captions(captions),
+            "video_id": video_id,
+            "usage": usage,
+            "chunks": len(captions),
+            "elapsed": round(time.monotonic() - started, 2),
+            "cache_id": cache["cache_id"],
+            "cached": cache["cached"],
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/vss-summarize")
+async def vss_summarize(
+    request: Request,
+    file: UploadFile,
+    prompt: str = Form(...),
+    csprompt: str = Form(...),
+    saprompt: str = Form(...),
+    chunk_duration: int = Form(...),
+    num_frames_per_chunk: int = Form(...),
+    frame_width: int = Form(...),
+    frame_height: int = Form(...),
+    top_k: int = Form(...),
+    top_p: float = Form(...),
+    temperature: float = Form(...),
+    max_tokens: int = Form(...),
+    seed: int = Form(...),
+    batch_size: int = Form(...),
+    rag_batch_size: int = Form(...),
+    rag_top_k: int = Form(...),
+    summary_top_p: float = Form(...),
+    summary_temperature: float = Form(...),
+    summary_max_tokens: int = Form(...),
+    chat_top_p: float = Form(...),
+    chat_temperature: float = Form(...),
+    chat_max_tokens: int = Form(...),
+    alert_top_p: float = Form(...),
+    alert_temperature: float = Form(...),
+    alert_max_tokens: int = Form(...),
+    enable_audio: bool = Form(...),
+    video_id: Optional[str] = Form(None),  # VIA 서버의 video_id (이미 업로드된 경우)
+    stream: bool = Form(False),  # True면 진행 상황을 SSE로 전송
+    alerts: Optional[str] = Form(None),  # 스트림 모드 알림 정의 ("이름: 이벤트1, 이벤트2; ...")
+):
+    global vss_client
+    if vss_client is None:
+        vss_client = VSS(VIA_SERVER_URL)
+
+    # VIA 모델 조회 (레지스트리 캐시)
+    model = vss_client.model = await vss_client.get_model()
+
+    # video_id 검증
+    if not video_id:
+        raise HTTPException(status_code=400, detail="video_id가 필요합니다. 이미 업로드된 동영상의 video_id를 제공해주세요.")
+
+    summarize_args = (
+        video_id,
+        prompt,
+        csprompt,
+        saprompt,
+        chunk_duration,
+        model,
+        num_frames_per_chunk,
+        frame_width,
+        frame_height,
+        top_k,
+        top_p,
+        temperature,
+        max_tokens,
+        seed,
+        batch_size,
+        rag_batch_size,
+        rag_top_k,
+        summary_top_p,
+        summary_temperature,
+        summary_max_tokens,
+        chat_top_p,
+        chat_temperature,
+        chat_max_tokens,
+        alert_top_p,
+        alert_temperature,
+        alert_max_tokens,
+        enable_audio,
+    )
+
+    if stream:
+        # 대기열이 가득 찼으면 스트림을 열지 않고 바로 429
+        via_admission.check()
+        return stream_summarize_events(request, video_id, summarize_args, parse_alert_tools(alerts))
+
+    try:
+        result, cache_id, cached = await vss_client.summarize_video_cached(*summarize_args)
+        return {"summary": result, "video_id": video_id, "cache_id": cache_id, "cached": cached}
+    except Exception as e:
+        raise _summarize_http_exception(e)
+
+
+# ============================================================================
+# 요약 일괄 처리 작업(Job) API
+# ============================================================================
+# vss_videos ID 목록을 같은 파라미터로 요약합니다 (예: 카메라 하루치 재요약).
+# 동시에 VIA로 보내는 요약 수를 제한하고, 완료되는 대로 vss_summaries에 저장합니다.
+# 대기열 한도를 넘지 않도록 기본 동시 실행 수는 VIA 실행 자리 수와 같습니다.
+SUMMARIZE_BATCH_CONCURRENCY = int(os.getenv("SUMMARIZE_BATCH_CONCURRENCY", str(VIA_MAX_INFLIGHT)))
+SUMMARIZE_BATCH_MAX_ITEMS = int(os.getenv("SUMMARIZE_BATCH_MAX_ITEMS", "1000"))
+# 대기열이 가득 차 거절(429)되면 Retry-After만큼 기다렸다가 다시 시도하는 횟수
+SUMMARIZE_BATCH_ADMISSION_RETRIES = int(os.getenv("SUMMARIZE_BATCH_ADMISSION_RETRIES", "10"))
+
+
+class SummarizeBatchRequest(BaseModel):
+    user_id: str
+    video_ids: List[int]  # vss_videos 테이블의 ID 목록 (내부 DB ID)
+    # 이하 /vss-summarize 폼 필드와 같은 파라미터 (모든 동영상에 공통 적용)
+    prompt: str
+    csprompt: str
+    saprompt: str
+    chunk_duration: int
+    num_frames_per_chunk: int
+    frame_width: int
+    frame_height: int
+    top_k: int
+    top_p: float
+    temperature: float
+    max_tokens: int
+    seed: int
+    batch_size: int
+    rag_batch_size: int
+    rag_top_k: int
+    summary_top_p: float
+    summary_temperature: float
+    summary_max_tokens: int
+    chat_top_p: float
+    chat_temperature: float
+    chat_max_tokens: int
+    alert_top_p: float
+    alert_temperature: float
+    alert_max_tokens: int
+    enable_audio: bool
+
+
+class SummarizeBatchJob(ClipJob):
+    """요약 일괄 처리 작업 (동영상별 상태 포함)"""
+
+    def __init__(self, job_id, user_id, items):
+        super().__init__(job_id, user_id)
+        self.items = items
+
+    def counts(self):
+        counts = {"total": len(self.items)}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+
+    def to_dict(self):
+        payload = super().to_dict()
+        payload["counts"] = self.counts()
+        payload["items"] = self.items
+        return payload
+
+
+summarize_batch_jobs = {}
+
+
+def _summarize_batch_args(request: SummarizeBatchRequest, via_video_id, model):
+    # VSS.summarize_video 인자 순서 (/vss-summarize와 같음)
+    return (
+        via_video_id,
+        request.prompt,
+        request.csprompt,
+        request.saprompt,
+        request.chunk_duration,
+        model,
+        request.num_frames_per_chunk,
+        request.frame_width,
+        request.frame_height,
+        request.top_k,
+        request.top_p,
+        request.temperature,
+        request.max_tokens,
+        request.seed,
+        request.batch_size,
+        request.rag_batch_size,
+        request.rag_top_k,
+        request.summary_top_p,
+        request.summary_temperature,
+        request.summary_max_tokens,
+        request.chat_top_p,
+        request.chat_temperature,
+        request.chat_max_tokens,
+        request.alert_top_p,
+        request.alert_temperature,
+        request.alert_max_tokens,
+        request.enable_audio,
+    )
+
+
+def _resolve_summarize_batch_items(db_ids, user_id):
+    """vss_videos.ID 목록을 동영상별 작업 항목으로 변환 (없거나 VIA에 없는 동영상은 바로 실패 처리)"""
+    db_ids = list(dict.fromkeys(db_ids))
+    if not db_ids:
+        raise HTTPException(status_code=400, detail="video_ids가 비어 있습니다.")
+    if len(db_ids) > SUMMARIZE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {SUMMARIZE_BATCH_MAX_ITEMS}개까지 요약할 수 있습니다.")
+
+    placeholders = ", ".join("?" for _ in db_ids)
+    try:
+        cursor.execute(
+            f"SELECT ID, FILE_NAME, VIDEO_ID FROM vss_videos WHERE USER_ID = ? AND ID IN ({placeholders})",
+            (user_id, *db_ids)
+        )
+        rows = {row[0]: row for row in cursor.fetchall()}
+    except mariadb.Error as e:
+        logger.error(f"동영상 조회 중 데이터베이스 오류: {e}")
+        raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
+
+    items = []
+    for db_id in db_ids:
+        item = {
+            "video_db_id": db_id,
+            "file_name": None,
+            "video_id": None,
+            "status": "queued",  # queued → running → completed | failed
+            "cached": False,
+            "cache_id": None,
+            "elapsed": None,
+            "error": None,
+        }
+        row = rows.get(db_id)
+        if row is None:
+            item["status"] = "failed"
+            item["error"] = {"status_code": 404, "detail": "동영상을 찾을 수 없거나 권한이 없습니다."}
+        else:
+            item["file_name"] = row[1]
+            item["video_id"] = row[2]
+            if not row[2]:
+                item["status"] = "failed"
+                item["error"] = {"status_code": 409, "detail": "VIA 서버에 업로드되지 않은 동영상입니다."}
+        items.append(item)
+    return items
+
+
+async def _summarize_batch_item(job, item, request: SummarizeBatchRequest, model, semaphore):
+    async with semaphore:
+        item["status"] = "running"
+        job.emit("item_started", video_db_id=item["video_db_id"])
+        started = time.monotonic()
+        summarize_args = _summarize_batch_args(request, item["video_id"], model)
+        try:
+            for attempt in range(SUMMARIZE_BATCH_ADMISSION_RETRIES + 1):
+                try:
+                    summary, cache_id, cached = await vss_client.summarize_video_cached(*summarize_args)
+                    break
+                except AdmissionRejected as e:
+                    if attempt == SUMMARIZE_BATCH_ADMISSION_RETRIES:
+                        raise
+                    await asyncio.sleep(int(e.headers["Retry-After"]))
+            if not isinstance(summary, str) or not summary.strip():
+                raise HTTPException(status_code=502, detail="VIA 서버 응답 형식 오류: 요약 내용이 비어 있습니다.")
+            # 완료되는 대로 사용자별 요약 저장
+            save_user_summary(item["video_id"], job.user_id, summary, cache_id)
+        except mariadb.Error as e:
+            logger.error(f"요약 결과 저장 중 데이터베이스 오류: {e}")
+            error = HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
+        except Exception as e:
+            error = _summarize_http_exception(e)
+        else:
+            item.update(status="completed", cached=cached, cache_id=cache_id, elapsed=round(time.monotonic() - started, 2))
+            job.emit("item_completed", video_db_id=item["video_db_id"], cached=cached, cache_id=cache_id)
+            return
+        item["status"] = "failed"
+        item["error"] = {"status_code": error.status_code, "detail": error.detail}
+        item["elapsed"] = round(time.monotonic() - started, 2)
+        job.emit("item_failed", video_db_id=item["video_db_id"], **item["error"])
+
+
+async def _run_summarize_batch_job(job, request: SummarizeBatchRequest, model):
+    job.status = "running"
+    job.emit("started", total=len(job.items))
+    semaphore = asyncio.Semaphore(max(1, SUMMARIZE_BATCH_CONCURRENCY))
+    try:
+        await asyncio.gather(*(
+            _summarize_batch_item(job, item, request, model, semaphore)
+            for item in job.items
+            if item["status"] == "queued"
+        ))
+        job.result = {}
+        job.status = "completed"
+    except Exception as e:
+        logger.error(f"요약 일괄 처리 작업 실패 ({job.job_id}): {e}", exc_info=True)
+        job.status = "failed"
+        job.error = {"status_code": 500, "detail": f"요약 일괄 처리 중 오류가 발생했습니다: {str(e)}"}
+    job.finished_at = time.time()
+    job.emit(job.status, **job.counts())
+
+
+@app.post("/vss-summarize/batch", status_code=202)
+async def create_summarize_batch_job(request: SummarizeBatchRequest):
+    """
+    vss_videos ID 목록을 같은 파라미터로 요약하는 작업 등록 (즉시 job_id 반환)
+
+    진행 상황과 동영상별 결과는 GET /vss-summarize/batch/{job_id}로 조회합니다.
+    """
+    global vss_client
+    if vss_client is None:
+        vss_client = VSS(VIA_SERVER_URL)
+
+    user_id = request.user_id.strip()
+    if not user_id:
+        raise HTTPException(status_code=400, detail="사용자 ID를 입력해주세요.")
+    items = _resolve_summarize_batch_items(request.video_ids, user_id)
+    model = vss_client.model = await vss_client.get_model()
+
+    _purge_clip_jobs(summarize_batch_jobs)
+    job = SummarizeBatchJob(uuid.uuid4().hex, user_id, items)
+    summarize_batch_jobs[job.job_id] = job
+    job.emit("queued", total=len(items))
+    job.task = asyncio.create_task(_run_summarize_batch_job(job, request, model))
+    logger.info(f"요약 일괄 처리 작업 등록: {job.job_id} ({len(items)}개, 사용자: {user_id})")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.job_id,
+            "status": job.status,
+            "counts": job.counts(),
+            "status_url": f"/vss-summarize/batch/{job.job_id}",
+        },
+    )
 
 
-@app.post("/vss-summarize")
-async def vss_summarize(
-    file: UploadFile,
-    prompt: str = Form(...),
-    csprompt: str = Form(...),
-    saprompt: str = Form(...),
-    chunk_duration: int = Form(...),
-    num_frames_per_chunk: int = Form(...),
-    frame_width: int = Form(...),
-    frame_height: int = Form(...),
-    top_k: int = Form(...),
-    top_p: float = Form(...),
-    temperature: float = Form(...),
-    max_tokens: int = Form(...),
-    seed: int = Form(...),
-    batch_size: int = Form(...),
-    rag_batch_size: int = Form(...),
-    rag_top_k: int = Form(...),
-    summary_top_p: float = Form(...),
-    summary_temperature: float = Form(...),
-    summary_max_tokens: int = Form(...),
-    chat_top_p: float = Form(...),
-    chat_temperature: float = Form(...),
-    chat_max_tokens: int = Form(...),
-    alert_top_p: float = Form(...),
-    alert_temperature: float = Form(...),
-    alert_max_tokens: int = Form(...),
-    enable_audio: bool = Form(...),
-    video_id: Optional[str] = Form(None),  # VIA 서버의 video_id (이미 업로드된 경우)
-):
+@app.get("/vss-summarize/batch/{job_id}")
+async def get_summarize_batch_job(job_id: str):
+    """
+    요약 일괄 처리 작업 상태 조회 (동영상별 status / cached / cache_id / error 포함)
+    """
+    return _get_clip_job(job_id, summarize_batch_jobs).to_dict()
+
+
+async def _prepare_vss_query(video_id, file, chunk_size, temperature, max_new_tokens, top_p, top_k, query):
+    """
+    질의 입력 검증, 모델 조회, 필요 시 파일 업로드 후 (video_id, model, query) 반환
+    """
+    # 입력 검증
+    if not query or not query.strip():
+        raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
+    
+    query = query.strip()
+    
+    if chunk_size < 0:
+        raise HTTPException(status_code=400, detail="chunk_size는 0 이상이어야 합니다.")
+    if not (0 <= temperature <= 2):
+        raise HTTPException(status_code=400, detail="temperature는 0과 2 사이의 값이어야 합니다.")
+    if max_new_tokens <= 0:
+        raise HTTPException(status_code=400, detail="max_new_tokens는 0보다 커야 합니다.")
+    if not (0 <= top_p <= 1):
+        raise HTTPException(status_code=400, detail="top_p는 0과 1 사이의 값이어야 합니다.")
+    if top_k < 0:
+        raise HTTPException(status_code=400, detail="top_k는 0 이상이어야 합니다.")
+    
+    # video_id 또는 file 중 하나는 필요
+    if not video_id and not file:
+        raise HTTPException(status_code=400, detail="video_id 또는 file 중 하나는 필요합니다.")
+    
+    # 전역 vss_client 사용 선언 (누락 시 UnboundLocalError 발생)
     global vss_client
+    
     if vss_client is None:
         vss_client = VSS(VIA_SERVER_URL)
-        vss_client.model = await vss_client.get_model()
-
-    # GET models from VIA server (async aiohttp)
-    session = await get_session()
-    try:
-        async with session.get(VIA_SERVER_URL + "/models", timeout=aiohttp.ClientTimeout(total=10)) as resp:
-            if resp.status >= 400:
-                raise HTTPException(status_code=502, detail=f"VIA /models returned status {resp.status}")
+    
+    # VIA 서버 모델 조회 (레지스트리 캐시)
+    model = vss_client.model = await vss_client.get_model()
+    
+    # 파일이 제공된 경우 업로드
+    if file and not video_id:
+        try:
+            if not file.filename:
+                raise HTTPException(status_code=400, detail="파일명이 없습니다.")
+            
+            os.makedirs("./tmp", exist_ok=True)
+            file_path = f"./tmp/{file.filename}"
             try:
-                resp_json = await resp.json()
-            except Exception:
-                raise HTTPException(status_code=502, detail=f"VIA /models returned invalid JSON")
-            model = resp_json["data"][0]["id"]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Failed to contact VIA server: {e}")
-
-    # video_id 검증
+                with open(file_path, "wb") as buffer:
+                    shutil.copyfileobj(file.file, buffer)
+            except OSError as e:
+                logger.error(f"임시 파일 저장 실패: {e}")
+                raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
+            
+            try:
+                video_id = await vss_client.upload_video(file_path)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"VIA 서버 업로드 실패: {e}")
+                raise HTTPException(status_code=500, detail=f"VIA 서버에 파일 업로드 중 오류가 발생했습니다: {str(e)}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"파일 처리 중 오류: {e}")
+            raise HTTPException(status_code=500, detail=f"파일 처리 중 오류가 발생했습니다: {str(e)}")
+    
     if not video_id:
-        raise HTTPException(status_code=400, detail="video_id가 필요합니다. 이미 업로드된 동영상의 video_id를 제공해주세요.")
+        raise HTTPException(status_code=400, detail="video_id가 필요합니다.")
+
+    query += " 이에 해당하는 장면의 시작 시간과 끝 시간의 타임스탬프를 출력해주세요. "
+    return video_id, model, query
 
-    try:
-        result = await vss_client.summarize_video(
-            video_id,
-            prompt,
-            csprompt,
-            saprompt,
-            chunk_duration,
-            model,
-            num_frames_per_chunk,
-            frame_width,
-            frame_height,
-            top_k,
-            top_p,
-            temperature,
-            max_tokens,
-            seed,
-            batch_size,
-            rag_batch_size,
-            rag_top_k,
-            summary_top_p,
-            summary_temperature,
-            summary_max_tokens,
-            chat_top_p,
-            chat_temperature,
-            chat_max_tokens,
-            alert_top_p,
-            alert_temperature,
-            alert_max_tokens,
-            enable_audio,
-        )
-        return {"summary": result, "video_id": video_id}
-    except HTTPException:
-        # HTTPException은 그대로 전파
-        raise
-    except Exception as e:
-        # 기타 예외 처리
-        logger.error(f"vss_summarize 실행 중 오류: {e}")
-        error_msg = str(e)
-        
-        # GStreamer 관련 에러인 경우 더 명확한 메시지 제공
-        if "gst-stream-error" in error_msg or "qtdemux" in error_msg or "not-negotiated" in error_msg:
-            raise HTTPException(
-                status_code=500,
-                detail=(
-                    "동영상 파일 처리 중 오류가 발생했습니다.\n\n"
-                    "가능한 원인:\n"
-                    "1. 손상된 동영상 파일 - 파일을 다시 다운로드하거나 다른 파일로 시도해보세요.\n"
-                    "2. 지원하지 않는 코덱 또는 포맷 - H.264 코덱의 MP4 파일을 권장합니다.\n"
-                    "3. 파일이 완전히 업로드되지 않음 - 네트워크 연결을 확인하고 다시 시도해보세요.\n"
-                    "4. 파일 메타데이터 문제 - 동영상 편집 프로그램으로 파일을 다시 저장해보세요.\n\n"
-                    f"기술적 오류: {error_msg}"
-                )
-            )
-        else:
-            raise HTTPException(status_code=500, detail=f"요약 생성 중 오류가 발생했습니다: {error_msg}")
 
 @app.post("/vss-query")
 async def vss_query(
@@ -1197,86 +4746,9 @@ async def vss_query(
     동영상 질의 응답 엔드포인트
     """
     try:
-        # 입력 검증
-        if not query or not query.strip():
-            raise HTTPException(status_code=400, detail="질문을 입력해주세요.")
-        
-        query = query.strip()
-        
-        if chunk_size < 0:
-            raise HTTPException(status_code=400, detail="chunk_size는 0 이상이어야 합니다.")
-        if not (0 <= temperature <= 2):
-            raise HTTPException(status_code=400, detail="temperature는 0과 2 사이의 값이어야 합니다.")
-        if max_new_tokens <= 0:
-            raise HTTPException(status_code=400, detail="max_new_tokens는 0보다 커야 합니다.")
-        if not (0 <= top_p <= 1):
-            raise HTTPException(status_code=400, detail="top_p는 0과 1 사이의 값이어야 합니다.")
-        if top_k < 0:
-            raise HTTPException(status_code=400, detail="top_k는 0 이상이어야 합니다.")
-        
-        # video_id 또는 file 중 하나는 필요
-        if not video_id and not file:
-            raise HTTPException(status_code=400, detail="video_id 또는 file 중 하나는 필요합니다.")
-        
-        # 전역 vss_client 사용 선언 (누락 시 UnboundLocalError 발생)
-        global vss_client
-        
-        if vss_client is None:
-            vss_client = VSS(VIA_SERVER_URL)
-            vss_client.model = await vss_client.get_model()
-        
-        # VIA 서버 모델 조회
-        session = await get_session()
-        try:
-            async with session.get(VIA_SERVER_URL + "/models", timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                if resp.status >= 400:
-                    raise HTTPException(status_code=502, detail=f"VIA /models returned status {resp.status}")
-                try:
-                    resp_json = await resp.json()
-                except Exception as e:
-                    raise HTTPException(status_code=502, detail=f"VIA /models returned invalid JSON: {str(e)}")
-                if not resp_json.get("data") or len(resp_json["data"]) == 0:
-                    raise HTTPException(status_code=502, detail="VIA 서버에서 모델을 찾을 수 없습니다.")
-                model = resp_json["data"][0]["id"]
-        except HTTPException:
-            raise
-        except aiohttp.ClientError as e:
-            logger.error(f"VIA 서버 연결 오류: {e}")
-            raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
-        except Exception as e:
-            logger.error(f"VIA 서버 모델 조회 중 오류: {e}")
-            raise HTTPException(status_code=502, detail=f"VIA 서버 모델 조회 중 오류가 발생했습니다: {str(e)}")
-        
-        # 파일이 제공된 경우 업로드
-        if file and not video_id:
-            try:
-                if not file.filename:
-                    raise HTTPException(status_code=400, detail="파일명이 없습니다.")
-                
-                os.makedirs("./tmp", exist_ok=True)
-                file_path = f"./tmp/{file.filename}"
-                try:
-                    with open(file_path, "wb") as buffer:
-                        shutil.copyfileobj(file.file, buffer)
-                except OSError as e:
-                    logger.error(f"임시 파일 저장 실패: {e}")
-                    raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
-                
-                try:
-                    video_id = await vss_client.upload_video(file_path)
-                except Exception as e:
-                    logger.error(f"VIA 서버 업로드 실패: {e}")
-                    raise HTTPException(status_code=500, detail=f"VIA 서버에 파일 업로드 중 오류가 발생했습니다: {str(e)}")
-            except HTTPException:
-                raise
-            except Exception as e:
-                logger.error(f"파일 처리 중 오류: {e}")
-                raise HTTPException(status_code=500, detail=f"파일 처리 중 오류가 발생했습니다: {str(e)}")
-        
-        if not video_id:
-            raise HTTPException(status_code=400, detail="video_id가 필요합니다.")
-
-        query += " 이에 해당하는 장면의 시작 시간과 끝 시간의 타임스탬프를 출력해주세요. "
+        video_id, model, query = await _prepare_vss_query(
+            video_id, file, chunk_size, temperature, max_new_tokens, top_p, top_k, query
+        )
         
         try:
             result = await vss_client.query_video(video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query)
@@ -1285,6 +4757,9 @@ async def vss_query(
         except aiohttp.ClientError as e:
             logger.error(f"VIA 서버 query_video 연결 오류: {e}")
             raise HTTPException(status_code=502, detail=f"VIA 서버에 연결할 수 없습니다: {str(e)}")
+        except asyncio.TimeoutError:
+            logger.error("VIA 서버 query_video 응답 시간 초과")
+            raise HTTPException(status_code=504, detail="VIA 서버 응답 시간이 초과되었습니다.")
         except Exception as e:
             logger.error(f"VIA 서버 query_video 실행 중 오류: {e}")
             raise HTTPException(status_code=500, detail=f"동영상 질의 처리 중 오류가 발생했습니다: {str(e)}")
@@ -1297,6 +4772,80 @@ async def vss_query(
         raise HTTPException(status_code=500, detail=f"동영상 질의 처리 중 오류가 발생했습니다: {str(e)}")
 
 
+@app.post("/vss-query/stream")
+async def vss_query_stream(
+    request: Request,
+    video_id: Optional[str] = Form(None),
+    file: Optional[UploadFile] = None,
+    chunk_size: int = Form(...),
+    temperature: float = Form(...),
+    seed: int = Form(...),
+    max_new_tokens: int = Form(...),
+    top_p: float = Form(...),
+    top_k: int = Form(...),
+    query: str = Form(...)
+    ):
+    """
+    동영상 질의 응답 스트리밍 엔드포인트 (SSE)
+
+    이벤트:
+    - queued: {"position", "eta_seconds"} - VIA 실행 대기 중일 때 순번/예상 대기 시간 (0이면 실행 시작)
+    - token: {"content": 토큰} - VIA 서버에서 토큰이 도착하는 즉시 전송
+    - done:  {"summary": 전체 답변, "video_id": ..., "usage": ...}
+    - error: {"status": HTTP 상태 코드, "detail": 오류 메시지}
+    """
+    # 검증/업로드/대기열 초과 오류는 스트림 시작 전에 일반 HTTP 오류로 반환
+    via_admission.check()
+    video_id, model, query = await _prepare_vss_query(
+        video_id, file, chunk_size, temperature, max_new_tokens, top_p, top_k, query
+    )
+
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    async def event_stream():
+        parts = []
+        usage = None
+        try:
+            stream = vss_client.query_video_stream(video_id, model, chunk_size, temperature, seed, max_new_tokens, top_p, top_k, query)
+            async for event in relay_stream(stream, SUMMARIZE_STREAM_HEARTBEAT_SECONDS):
+                if event is None:
+                    if await request.is_disconnected():
+                        # 클라이언트 연결 종료 시 VIA 스트림도 닫음
+                        logger.info(f"vss_query_stream 클라이언트 연결 종료: video_id={video_id}")
+                        return
+                    # 프록시 유휴 타임아웃 방지용 주석 라인
+                    yield ": keep-alive\n\n"
+                    continue
+                if event.get("type") == "queued":
+                    event.pop("type")
+                    yield sse("queued", event)
+                    continue
+                if "usage" in event:
+                    usage = event["usage"]
+                    continue
+                parts.append(event["content"])
+                yield sse("token", {"content": event["content"]})
+            yield sse("done", {"summary": "".join(parts), "video_id": video_id, "usage": usage})
+        except HTTPException as e:
+            yield sse("error", {"status": e.status_code, "detail": e.detail, "retry_after": (e.headers or {}).get("Retry-After")})
+        except asyncio.TimeoutError:
+            logger.error("VIA 서버 query_video 응답 시간 초과")
+            yield sse("error", {"status": 504, "detail": "VIA 서버 응답 시간이 초과되었습니다."})
+        except aiohttp.ClientError as e:
+            logger.error(f"VIA 서버 query_video 연결 오류: {e}")
+            yield sse("error", {"status": 502, "detail": f"VIA 서버에 연결할 수 없습니다: {str(e)}"})
+        except Exception as e:
+            logger.error(f"VIA 서버 query_video 스트리밍 중 오류: {e}", exc_info=True)
+            yield sse("error", {"status": 500, "detail": f"동영상 질의 처리 중 오류가 발생했습니다: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 
 # ============================================================================
 # 요청/응답 모델 정의
@@ -2264,6 +5813,124 @@ def extract_video_metadata(file_path: str, video_id: int, filename: str):
                 pass
 
 # 동영상 업로드 및 조회 API
+# ============================================================================
+# 업로드 파이프라인 (디스크 저장 + 해시 + VIA 업로드 동시 진행)
+# ============================================================================
+TEE_INGEST_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+# VIA 전송이 디스크보다 느릴 때 먼저 읽어 둘 수 있는 최대 청크 수 (초과 시 읽기 대기)
+TEE_INGEST_QUEUE_CHUNKS = int(os.getenv("TEE_INGEST_QUEUE_CHUNKS", "4"))
+
+
+async def _get_via_client_for_ingest():
+    """업로드용 VIA 클라이언트 (모델 조회에 실패하면 None을 반환하고 VIA 없이 저장)"""
+    global vss_client
+    try:
+        if vss_client is None:
+            vss_client = VSS(VIA_SERVER_URL)
+        vss_client.model = await vss_client.get_model()
+        return vss_client
+    except HTTPException as e:
+        logger.warning(f"VIA 서버 모델 조회 실패: {e.detail}")
+    except aiohttp.ClientError as e:
+        logger.warning(f"VIA 서버 연결 실패 (모델 조회): {e}")
+    except Exception as e:
+        logger.warning(f"VIA 서버 모델 조회 중 예상치 못한 오류: {e}")
+    logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
+    return None
+
+
+async def tee_ingest(upload_file, file_path, via_client=None):
+    """
+    업로드 파일을 한 번 읽으면서 디스크 저장, SHA-256 계산, VIA 업로드를 동시에 진행합니다.
+
+    디스크 쓰기/해시는 스레드에서, VIA 전송은 이벤트 루프에서 청크 단위로 겹쳐 실행됩니다.
+    VIA 전송이 밀리면 크기가 제한된 큐가 가득 차 다음 청크 읽기가 대기합니다.
+    해시는 마지막 청크를 읽어야 알 수 있으므로 그때까지 업로드 본문을 끝내지 않고,
+    같은 내용이 이미 VIA에 있으면 업로드를 중단해 VIA에 파일이 생기지 않게 합니다.
+    (전송한 대역폭은 되돌릴 수 없지만 VIA 쪽 저장/삭제 호출은 발생하지 않음)
+    VIA 업로드에 실패해도 파일 저장은 계속하며 VIA 파일 ID는 None이 됩니다.
+
+    Returns:
+        tuple: (파일 크기, SHA-256, VIA 파일 ID 또는 None)
+    """
+    sha256 = hashlib.sha256()
+    file_size = 0
+    queue = asyncio.Queue(maxsize=TEE_INGEST_QUEUE_CHUNKS)
+    upload_task = None
+
+    async def _chunks():
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    async def _feed(chunk):
+        # 업로드가 실패해 더 이상 읽지 않으면 큐 대기에서 빠져나옴
+        if upload_task is None or upload_task.done():
+            return
+        put = asyncio.ensure_future(queue.put(chunk))
+        await asyncio.wait({put, upload_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+
+    if via_client is not None:
+        upload_task = asyncio.create_task(via_client.upload_stream(_chunks()))
+
+    try:
+        with open(file_path, "wb") as buffer:
+            def _write(chunk):
+                buffer.write(chunk)
+                sha256.update(chunk)  # 큰 버퍼는 GIL을 놓고 계산됨
+
+            while True:
+                chunk = await upload_file.read(TEE_INGEST_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                await asyncio.gather(asyncio.to_thread(_write, chunk), _feed(chunk))
+
+        # 본문 끝(None)을 보내기 전이므로 VIA는 아직 업로드를 확정하지 않은 상태
+        content_hash = sha256.hexdigest()
+        existing_id = lookup_via_file_id(content_hash) if upload_task is not None else None
+        if not existing_id:
+            await _feed(None)
+    except BaseException:
+        if upload_task is not None:
+            upload_task.cancel()
+        raise
+
+    remember_file_content_hash(file_path, content_hash)
+
+    via_file_id = None
+    if existing_id:
+        logger.info(f"동일한 내용이 이미 VIA에 있어 업로드를 중단합니다: video_id={existing_id}")
+        upload_task.cancel()
+        await asyncio.wait({upload_task})
+        if not upload_task.cancelled():
+            upload_task.exception()  # 취소 전에 이미 실패한 경우 예외를 회수
+        return file_size, content_hash, existing_id
+
+    if upload_task is not None:
+        try:
+            via_file_id = await upload_task
+            logger.info(f"VIA 서버 업로드 성공: video_id={via_file_id}")
+        except Exception as e:
+            # VIA 업로드 실패 시에도 DB에는 저장하되 VIDEO_ID는 None으로 저장 (나중에 재시도)
+            logger.warning(f"VIA 서버 업로드 실패: {e}")
+
+    if via_file_id:
+        # 같은 내용이 동시에 업로드되어 둘 다 확정된 경우 먼저 기록된 ID로 합침
+        existing_id = lookup_via_file_id(content_hash)
+        if existing_id and existing_id != via_file_id:
+            logger.info(f"동일한 내용이 이미 VIA에 있어 새 업로드를 삭제합니다: {via_file_id} → {existing_id}")
+            await remove_all_media(await get_session(), [via_file_id])
+            via_file_id = existing_id
+        else:
+            via_file_ids_by_hash[content_hash] = via_file_id
+    return file_size, content_hash, via_file_id
+
+
 @app.post("/upload-video")
 async def upload_video_to_db(
     background_tasks: BackgroundTasks,
@@ -2319,14 +5986,12 @@ async def upload_video_to_db(
         file_path = videos_dir / unique_filename
         file_url = f"/video-files/{unique_filename}"
         
-        # 4. 파일 저장 (최적화된 버퍼 크기 사용)
-        # 버퍼 크기를 8MB로 설정하여 대용량 파일 처리 성능 향상
-        BUFFER_SIZE = 8 * 1024 * 1024  # 8MB
-        file_size = 0
+        # 4. VIA 서버 클라이언트 준비 (실패해도 업로드는 계속 진행, VIDEO_ID는 None으로 저장)
+        via_client = await _get_via_client_for_ingest()
+        
+        # 5. 파일 저장 + SHA-256 계산 + VIA 업로드를 한 번의 읽기로 동시에 진행
         try:
-            with open(file_path, "wb", buffering=BUFFER_SIZE) as buffer:
-                shutil.copyfileobj(file.file, buffer, length=BUFFER_SIZE)
-                file_size = buffer.tell()
+            file_size, content_hash, via_video_id = await tee_ingest(file, file_path, via_client)
         except OSError as e:
             logger.error(f"파일 저장 중 파일 시스템 오류: {e}")
             raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
@@ -2334,71 +5999,13 @@ async def upload_video_to_db(
             logger.error(f"파일 저장 중 예상치 못한 오류: {e}")
             raise HTTPException(status_code=500, detail=f"파일 저장 중 오류가 발생했습니다: {str(e)}")
         
-        # 5. VIA 서버에 업로드하여 video_id 얻기
-        global vss_client
-        via_video_id = None
-        
-        # VIA 서버 초기화 시도
-        try:
-            if vss_client is None:
-                vss_client = VSS(VIA_SERVER_URL)
-                try:
-                    vss_client.model = await vss_client.get_model()
-                except HTTPException as e:
-                    # VIA 서버 모델 조회 실패 (502 에러 등)
-                    logger.warning(f"VIA 서버 모델 조회 실패: {e.detail}")
-                    logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
-                    # vss_client는 초기화했지만 model은 None으로 유지
-                    vss_client = None  # 다음 요청에서 다시 시도할 수 있도록
-                except aiohttp.ClientError as e:
-                    logger.warning(f"VIA 서버 연결 실패 (모델 조회): {e}")
-                    logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
-                    vss_client = None
-                except Exception as e:
-                    logger.warning(f"VIA 서버 모델 조회 중 예상치 못한 오류: {e}")
-                    logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
-                    vss_client = None
-            
-            # VIA 서버가 초기화되었고 model이 있는 경우에만 업로드 시도
-            if vss_client is not None and hasattr(vss_client, 'model') and vss_client.model:
-                try:
-                    via_video_id = await vss_client.upload_video(str(file_path))
-                    logger.info(f"VIA 서버 업로드 성공: video_id={via_video_id}")
-                except aiohttp.ClientError as e:
-                    logger.warning(f"VIA 서버 업로드 연결 실패: {e}")
-                    # VIA 업로드 실패 시에도 DB에는 저장하되 VIDEO_ID는 None으로 저장
-                    # 나중에 재시도할 수 있도록
-                except Exception as e:
-                    logger.warning(f"VIA 서버 업로드 실패: {e}")
-                    # VIA 업로드 실패 시에도 DB에는 저장하되 VIDEO_ID는 None으로 저장
-                    # 나중에 재시도할 수 있도록
-            else:
-                logger.warning("VIA 서버가 초기화되지 않아 업로드를 건너뜁니다. VIDEO_ID는 None으로 저장됩니다.")
-        except HTTPException as e:
-            # 예상치 못한 HTTPException 발생 시
-            logger.warning(f"VIA 서버 초기화 중 HTTPException 발생: {e.detail}")
-            logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
-            via_video_id = None
-            # vss_client를 None으로 설정하여 다음 요청에서 다시 시도할 수 있도록
-            vss_client = None
-        except aiohttp.ClientError as e:
-            logger.warning(f"VIA 서버 연결 실패: {e}")
-            logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
-            via_video_id = None
-            vss_client = None
-        except Exception as e:
-            logger.warning(f"VIA 서버 초기화 실패: {e}")
-            logger.warning("VIA 서버 없이 동영상 업로드를 진행합니다. VIDEO_ID는 None으로 저장됩니다.")
-            via_video_id = None
-            vss_client = None
-        
         # 6. DB 저장 (VIA 서버의 video_id 포함)
         try:
             cursor.execute(
                 """INSERT INTO vss_videos 
-                   (USER_ID, FILE_NAME, FILE_PATH, FILE_SIZE, FILE_URL, WIDTH, HEIGHT, DURATION, VIDEO_ID) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (user_id, file.filename, str(file_path), file_size, file_url, None, None, None, via_video_id)
+                   (USER_ID, FILE_NAME, FILE_PATH, FILE_SIZE, FILE_URL, WIDTH, HEIGHT, DURATION, VIDEO_ID, CONTENT_HASH) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, file.filename, str(file_path), file_size, file_url, None, None, None, via_video_id, content_hash)
             )
             # autocommit이 활성화되어 있으므로 명시적 커밋 불필요
             video_id = cursor.lastrowid
@@ -2412,8 +6019,10 @@ async def upload_video_to_db(
                     pass
             raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
         
-        # 7. 백그라운드 작업 설정 (메타데이터 추출)
+        # 7. 백그라운드 작업 설정 (메타데이터 추출, 키프레임 인덱스 및 미리보기 생성)
         background_tasks.add_task(extract_video_metadata, str(file_path), video_id, file.filename)
+        background_tasks.add_task(build_keyframe_index, str(file_path), video_id)
+        background_tasks.add_task(build_video_previews, str(file_path))
         
         return {
             "success": True,
@@ -2478,7 +6087,8 @@ async def get_videos(user_id: str):
                     "height": row[5],
                     "duration": row[6],
                     "date": row[7].strftime("%Y-%m-%d") if row[7] else None,
-                    "video_id": row[8]  # VIA 서버의 video_id
+                    "video_id": row[8],  # VIA 서버의 video_id
+                    **preview_urls("http://localhost:8001", "videos", Path(row[2]).name),
                 })
             except Exception as e:
                 logger.warning(f"동영상 데이터 변환 중 오류 (ID: {row[0]}): {e}")
@@ -2524,13 +6134,24 @@ async def delete_video(video_id: int, user_id: str = Query(...)):
         via_video_id = row[2]  # VIA 서버의 video_id (vss_summaries 테이블의 VIDEO_ID)
         
         # vss_summaries 테이블에서 요약 결과 삭제 (VIDEO_ID는 VIA 서버의 video_id)
+        # 같은 내용의 동영상은 VIA 파일 ID를 공유하므로, 이 사용자의 다른 동영상이
+        # 같은 VIDEO_ID를 쓰고 있으면 그 동영상의 요약이므로 남겨둠
         if via_video_id:
             try:
                 cursor.execute(
-                    "DELETE FROM vss_summaries WHERE VIDEO_ID = ? AND USER_ID = ?",
-                    (via_video_id, user_id)
+                    "SELECT COUNT(*) FROM vss_videos WHERE VIDEO_ID = ? AND USER_ID = ? AND ID <> ?",
+                    (via_video_id, user_id, video_id)
                 )
-                deleted_summaries = cursor.rowcount
+                shared = cursor.fetchone()[0]
+                if shared:
+                    logger.info(f"같은 VIDEO_ID를 쓰는 동영상이 남아 있어 요약을 유지합니다: VIDEO_ID={via_video_id}")
+                    deleted_summaries = 0
+                else:
+                    cursor.execute(
+                        "DELETE FROM vss_summaries WHERE VIDEO_ID = ? AND USER_ID = ?",
+                        (via_video_id, user_id)
+                    )
+                    deleted_summaries = cursor.rowcount
                 if deleted_summaries > 0:
                     logger.info(f"요약 결과 삭제 완료: VIDEO_ID={via_video_id}, 삭제된 요약 수={deleted_summaries}")
                 else:
@@ -2586,45 +6207,23 @@ async def delete_video(video_id: int, user_id: str = Query(...)):
         else:
             logger.warning(f"동영상 파일 경로를 확인할 수 없음: FILE_PATH={db_file_path}, FILE_URL={file_url}")
         
-        # 클립 삭제: 동영상 파일명으로 시작하는 모든 클립 파일 삭제
-        clips_dir = Path("./clips")
-        if clips_dir.exists():
-            try:
-                # 동영상 파일명에서 확장자 제거하여 base_name 추출
-                if file_path:
-                    base_name = file_path.stem  # 확장자 제거
-                elif file_url:
-                    # FILE_URL에서 파일명 추출 후 확장자 제거
-                    filename = file_url.replace("/video-files/", "").lstrip("/")
-                    if filename:
-                        base_name = Path(filename).stem
-                    else:
-                        base_name = None
-                else:
-                    base_name = None
-                
-                if base_name:
-                    deleted_clips = 0
-                    # clips 디렉토리의 모든 파일 확인
-                    for clip_file in clips_dir.iterdir():
-                        if clip_file.is_file() and clip_file.name.startswith(f"clip_{base_name}_"):
-                            try:
-                                clip_file.unlink()
-                                deleted_clips += 1
-                                logger.info(f"클립 파일 삭제 성공: {clip_file.name}")
-                            except OSError as e:
-                                logger.warning(f"클립 파일 삭제 중 파일 시스템 오류: {clip_file.name}, 오류: {e}")
-                            except Exception as e:
-                                logger.warning(f"클립 파일 삭제 실패: {clip_file.name}, 오류: {e}")
-                    
-                    if deleted_clips > 0:
-                        logger.info(f"총 {deleted_clips}개의 클립 파일이 삭제되었습니다.")
-                    else:
-                        logger.info(f"삭제할 클립 파일이 없습니다. (base_name: {base_name})")
-            except OSError as e:
-                logger.warning(f"클립 디렉토리 접근 중 파일 시스템 오류: {e}")
-            except Exception as e:
-                logger.warning(f"클립 삭제 중 오류 발생: {e}")
+        # 키프레임 인덱스 및 미리보기 삭제
+        remove_keyframe_index(video_id)
+        if file_path:
+            remove_previews(file_path)
+        
+        # 클립 삭제: vss_clips에서 이 동영상의 클립만 조회 (다른 기록이 공유 중인 캐시 파일은 유지)
+        try:
+            clip_files, deleted_records = delete_clip_records("VIDEO_DB_ID = ? AND USER_ID = ?", (video_id, user_id))
+            deleted_clips = remove_unreferenced_clip_files(clip_files)
+            if deleted_records > 0:
+                logger.info(f"클립 기록 {deleted_records}개, 클립 파일 {deleted_clips}개가 삭제되었습니다.")
+            else:
+                logger.info(f"삭제할 클립이 없습니다. (video_id: {video_id})")
+        except mariadb.Error as e:
+            logger.warning(f"클립 삭제 중 데이터베이스 오류: {e}")
+        except Exception as e:
+            logger.warning(f"클립 삭제 중 오류 발생: {e}")
         
         return {"success": True, "message": "동영상이 삭제되었습니다."}
     except HTTPException:
@@ -2635,6 +6234,7 @@ async def delete_video(video_id: int, user_id: str = Query(...)):
 
 class DeleteClipsRequest(BaseModel):
     clip_urls: List[str]
+    user_id: str  # 해당 사용자의 클립 기록만 삭제
 
 @app.post("/delete-clips")
 async def delete_clips(request: DeleteClipsRequest):
@@ -2643,55 +6243,41 @@ async def delete_clips(request: DeleteClipsRequest):
         # 입력 검증
         if not request.clip_urls or len(request.clip_urls) == 0:
             raise HTTPException(status_code=400, detail="삭제할 클립 URL 목록이 필요합니다.")
+        if not request.user_id or not request.user_id.strip():
+            raise HTTPException(status_code=400, detail="사용자 ID를 입력해주세요.")
+        user_id = request.user_id.strip()
         
-        clips_dir = Path("./clips")
-        if not clips_dir.exists():
-            return {"success": True, "message": "클립 디렉토리가 없습니다.", "deleted_count": 0}
-        
-        deleted_count = 0
+        # URL에서 경로와 파일명 추출
+        # 예: http://localhost:8001/clips/clip_filename.mp4 -> /clips/clip_filename.mp4, clip_filename.mp4
+        clip_paths = []
         failed_count = 0
-        
         for clip_url in request.clip_urls:
-            try:
-                if not clip_url or not clip_url.strip():
-                    logger.warning(f"빈 클립 URL이 포함되어 있습니다.")
-                    failed_count += 1
-                    continue
-                
-                # URL에서 파일명 추출
-                # 예: http://localhost:8001/clips/clip_filename.mp4 -> clip_filename.mp4
-                if "/clips/" in clip_url:
-                    filename = clip_url.split("/clips/")[-1].split("?")[0]  # 쿼리 파라미터 제거
-                else:
-                    # 상대 경로인 경우
-                    filename = clip_url.replace("/clips/", "").split("?")[0]
-                
-                if not filename:
-                    logger.warning(f"클립 파일명을 추출할 수 없습니다: {clip_url}")
-                    failed_count += 1
-                    continue
-                
-                clip_file_path = clips_dir / filename
-                
-                if clip_file_path.exists() and clip_file_path.is_file():
-                    try:
-                        clip_file_path.unlink()
-                        deleted_count += 1
-                        logger.info(f"클립 파일 삭제 성공: {filename}")
-                    except OSError as e:
-                        logger.error(f"클립 파일 삭제 중 파일 시스템 오류 ({filename}): {e}")
-                        failed_count += 1
-                else:
-                    logger.warning(f"클립 파일을 찾을 수 없습니다: {filename}")
-                    failed_count += 1
-            except Exception as e:
-                logger.error(f"클립 삭제 중 오류 발생 ({clip_url}): {e}", exc_info=True)
+            if not clip_url or not clip_url.strip():
+                logger.warning(f"빈 클립 URL이 포함되어 있습니다.")
                 failed_count += 1
+                continue
+            clip_paths.append(clip_path_from_url(clip_url.strip()))
+        
+        try:
+            # 요청한 사용자의 클립 기록만 한 번의 쿼리로 삭제
+            # 파일은 그 기록이 가리키던 것 중 다른 사용자의 기록이 남아 있지 않을 때만 삭제
+            # (가상 클립은 원본에서 스트리밍하므로 기록에 파일명이 없음)
+            owned_files, deleted_records = [], 0
+            if clip_paths:
+                owned_files, deleted_records = delete_clip_records(
+                    f"USER_ID = ? AND CLIP_PATH IN ({_placeholders(clip_paths)})",
+                    (user_id, *clip_paths)
+                )
+            deleted_count = remove_unreferenced_clip_files(owned_files)
+        except mariadb.Error as e:
+            logger.error(f"클립 삭제 중 데이터베이스 오류: {e}")
+            raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
         
         return {
             "success": True,
             "message": f"{deleted_count}개의 클립이 삭제되었습니다.",
             "deleted_count": deleted_count,
+            "deleted_records": deleted_records,
             "failed_count": failed_count
         }
     except HTTPException:
@@ -2700,11 +6286,54 @@ async def delete_clips(request: DeleteClipsRequest):
         logger.error(f"클립 삭제 실패: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"클립 삭제 중 오류가 발생했습니다: {str(e)}")
 
+@app.get("/user-clips")
+async def get_user_clips(request: Request, user_id: str, video_id: Optional[int] = None):
+    """사용자의 클립 목록 조회 (video_id를 주면 해당 동영상의 클립만)"""
+    if not user_id or not user_id.strip():
+        raise HTTPException(status_code=400, detail="사용자 ID를 입력해주세요.")
+    
+    query = """SELECT ID, VIDEO_DB_ID, TITLE, FILE_NAME, CLIP_PATH, START_TIME, END_TIME, SEARCH_QUERY, CREATED_AT
+               FROM vss_clips WHERE USER_ID = ?"""
+    params = [user_id.strip()]
+    if video_id is not None:
+        query += " AND VIDEO_DB_ID = ?"
+        params.append(video_id)
+    query += " ORDER BY CREATED_AT DESC"
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    except mariadb.Error as e:
+        logger.error(f"클립 목록 조회 중 데이터베이스 오류: {e}")
+        raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
+    
+    base_url = str(request.base_url).rstrip('/')
+    clips = []
+    for row in rows:
+        clip = {
+            "id": row[0],
+            "video_id": row[1],
+            "title": row[2],
+            "url": f"{base_url}{row[4]}",
+            "start_time": row[5],
+            "end_time": row[6],
+            "search_query": row[7],
+            "date": row[8].strftime("%Y-%m-%d") if row[8] else None,
+        }
+        if row[3]:
+            clip.update(preview_urls(base_url, "clips", row[3]))
+        elif row[4].startswith("/virtual-clips/") and row[5] is not None:
+            media_name = unquote(row[4][len("/virtual-clips/"):].split("?")[0])
+            urls = virtual_clip_urls(base_url, media_name, row[5], row[6])
+            clip.update(download_url=urls["download_url"], poster_url=urls["poster_url"])
+        clips.append(clip)
+    return {"success": True, "clips": clips}
+
 class SaveSummaryRequest(BaseModel):
     video_id: str  # VIA 서버의 video_id (vss_videos.VIDEO_ID 컬럼 값)
     user_id: str
     summary_text: str
     via_video_id: Optional[str] = None  # 하위 호환성을 위해 유지
+    cache_id: Optional[int] = None  # /vss-summarize 응답의 요약 캐시 ID
 
 @app.post("/save-summary")
 async def save_summary(request: SaveSummaryRequest):
@@ -2743,23 +6372,28 @@ async def save_summary(request: SaveSummaryRequest):
             logger.error(f"동영상 확인 중 데이터베이스 오류: {e}")
             raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
         
+        # 캐시 항목은 같은 VIA 파일의 요약일 때만 연결
+        cache_id = request.cache_id
+        if cache_id is not None:
+            try:
+                cursor.execute("SELECT VIA_VIDEO_ID FROM vss_summary_cache WHERE ID = ?", (cache_id,))
+                row = cursor.fetchone()
+            except mariadb.Error as e:
+                logger.warning(f"요약 캐시 확인 중 데이터베이스 오류: {e}")
+                row = None
+            if not row or row[0] != video_id:
+                cache_id = None
+        
         # 요약 결과 저장 또는 업데이트 (UNIQUE KEY로 중복 방지)
         # vss_summaries 테이블 구조:
         # - VIDEO_ID (VARCHAR): VIA 서버의 video_id (vss_videos.VIDEO_ID 컬럼 값)
         # - USER_ID (VARCHAR): 사용자 ID
         # - SUMMARY_TEXT (LONGTEXT): 요약 텍스트
+        # - CACHE_ID (INT): 공유 요약 캐시(vss_summary_cache) 항목
         # - CREATED_AT (TIMESTAMP): 자동 설정
         # - UPDATED_AT (TIMESTAMP): 자동 설정
         try:
-            cursor.execute(
-                """INSERT INTO vss_summaries (VIDEO_ID, USER_ID, SUMMARY_TEXT) 
-                   VALUES (?, ?, ?)
-                   ON DUPLICATE KEY UPDATE 
-                   SUMMARY_TEXT = VALUES(SUMMARY_TEXT),
-                   UPDATED_AT = CURRENT_TIMESTAMP""",
-                (video_id, user_id, summary_text)
-            )
-            conn.commit()
+            save_user_summary(video_id, user_id, summary_text, cache_id)
         except mariadb.Error as e:
             logger.error(f"요약 결과 저장 중 데이터베이스 오류: {e}")
             raise HTTPException(status_code=500, detail="데이터베이스 오류가 발생했습니다.")
@@ -2818,7 +6452,8 @@ async def get_summary(video_id: str, user_id: str = Query(...)):
                 """SELECT s.ID, s.SUMMARY_TEXT, s.CREATED_AT, s.UPDATED_AT
                    FROM vss_summaries s
                    INNER JOIN vss_videos v ON s.VIDEO_ID = v.VIDEO_ID
-                   WHERE s.VIDEO_ID = ? AND s.USER_ID = ? AND v.USER_ID = ?""",
+                   WHERE s.VIDEO_ID = ? AND s.USER_ID = ? AND v.USER_ID = ?
+                   LIMIT 1""",
                 (video_id, user_id, user_id)
             )
             row = cursor.fetchone()
@@ -2872,12 +6507,19 @@ async def get_user_summaries(user_id: str = Query(...)):
         
         # 사용자의 모든 요약 결과 조회
         # VIDEO_ID는 VIA 서버의 video_id이므로 vss_videos.VIDEO_ID와 조인
+        # (같은 내용의 동영상 여러 개가 VIDEO_ID를 공유하면 가장 최근 동영상 하나만 조인)
         try:
             cursor.execute(
                 """SELECT s.ID, s.VIDEO_ID, s.SUMMARY_TEXT, s.CREATED_AT, s.UPDATED_AT, v.FILE_NAME
                    FROM vss_summaries s
-                   INNER JOIN vss_videos v ON s.VIDEO_ID = v.VIDEO_ID
-                   WHERE s.USER_ID = ? AND v.USER_ID = ?
+                   INNER JOIN (
+                       SELECT VIDEO_ID, MAX(ID) AS ID
+                       FROM vss_videos
+                       WHERE USER_ID = ? AND VIDEO_ID IS NOT NULL
+                       GROUP BY VIDEO_ID
+                   ) latest ON s.VIDEO_ID = latest.VIDEO_ID
+                   INNER JOIN vss_videos v ON v.ID = latest.ID
+                   WHERE s.USER_ID = ?
                    ORDER BY s.CREATED_AT DESC""",
                 (user_id, user_id)
             )
@@ -3004,7 +6646,8 @@ async def delete_summaries(request: DeleteSummaryRequest):
 @app.on_event("startup")
 async def startup_event():
     """애플리케이션 시작 시 aiohttp 세션 생성 및 DB 연결 확인"""
-    await get_session()
+    for pool in HTTP_POOL_DEFAULTS:
+        await get_session(pool)
     
     # 필요한 디렉토리 생성 (권한 오류 시 재시도)
     try:
@@ -3014,6 +6657,20 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ 클립 디렉토리 생성 실패: {e}")
     
+    # 클립 캐시 인덱스 복원 (시작 시 1회만 디렉토리 스캔) 후 정리 작업 시작
+    global clip_janitor_task
+    try:
+        clip_cache.scan()
+        clip_cache.sweep()
+    except Exception as e:
+        logger.error(f"❌ 클립 캐시 인덱스 복원 실패: {e}")
+    clip_janitor_task = asyncio.create_task(clip_janitor())
+    
+    # VIA 모델 백그라운드 갱신 시작
+    global via_model_refresh_task
+    if VIA_MODEL_REFRESH_INTERVAL_SECONDS > 0:
+        via_model_refresh_task = asyncio.create_task(via_model_refresher())
+    
     try:
         videos_dir = Path("./videos")
         videos_dir.mkdir(exist_ok=True)
@@ -3021,6 +6678,11 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ 동영상 디렉토리 생성 실패: {e}")
     
+    try:
+        migrate_legacy_keyframe_indexes()
+    except Exception as e:
+        logger.error(f"❌ 키프레임 인덱스 이동 실패: {e}")
+    
     try:
         tmp_dir = Path("./tmp")
         tmp_dir.mkdir(exist_ok=True)
@@ -3044,7 +6706,14 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """애플리케이션 종료 시 aiohttp 세션 종료"""
-    global http_session
-    if http_session and not http_session.closed:
-        await http_session.close()
+    """애플리케이션 종료 시 aiohttp 세션 및 클립 인코딩 풀 종료"""
+    await close_sessions()
+
+    if clip_janitor_task is not None:
+        clip_janitor_task.cancel()
+    if via_model_refresh_task is not None:
+        via_model_refresh_task.cancel()
+
+    # 진행 중이지 않은 클립 인코딩/미리보기 작업 취소
+    clip_encoder_pool.shutdown()
+    preview_encoder_pool.shutdown()
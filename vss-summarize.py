@@ -10,6 +10,7 @@
 # its affiliates is strictly prohibited.
 ######################################################################################################
 
+import asyncio
 import atexit
 import json
 import os
@@ -37,6 +38,7 @@ appConfig = {}
 DEFAULT_CHUNK_SIZE = 0
 DEFAULT_VIA_TARGET_RESPONSE_TIME = 2 * 60  # in seconds
 DEFAULT_VIA_TARGET_USECASE_EVENT_DURATION = 10  # in seconds
+REMOVE_MEDIA_CONCURRENCY = 8
 
 dummy_mr = """
 #### just to create the space
@@ -108,9 +110,18 @@ atexit.register(remove_icon_files)
 
 
 async def remove_all_media(session: aiohttp.ClientSession, media_ids):
-    for media_id in media_ids:
-        async with session.delete(appConfig["backend"] + "/files/" + media_id):
-            pass
+    semaphore = asyncio.Semaphore(REMOVE_MEDIA_CONCURRENCY)
+
+    async def remove(media_id):
+        async with semaphore:
+            try:
+                async with session.delete(appConfig["backend"] + "/files/" + media_id) as resp:
+                    return media_id, resp.status
+            except aiohttp.ClientError as ex:
+                logger.error(f"Failed to delete media {media_id}: {ex}")
+                return media_id, None
+
+    return await asyncio.gather(*[remove(media_id) for media_id in media_ids])
 
 
 async def add_assets(